@@ -6,6 +6,10 @@ import logging
 from django.db.models import Count
 
 from accounts.models import Account, Family
+from bakgomong.admin_perf import PaginatedInlineMixin
+from bakgomong.cache import bump_version
+from bakgomong.search import IndexedSearchAdminMixin
+from accounts.utils.thumbnails import thumbnail_url
 from accounts.utils.abstracts import Role
 
 logger = logging.getLogger("accounts")
@@ -19,12 +23,18 @@ def approve_members(modeladmin, request, queryset):
     queryset.update(
         is_approved=True,
     )
+    bump_version(queryset.model)
+
+    # update() sends no signals: give the newly approved members their contributions
+    from contributions.utils.backfill import queue_backfill
+    members = queryset if queryset.model is Account else Account.objects.filter(family__in=queryset)
+    queue_backfill(members.filter(is_approved=True, is_active=True).values_list("pk", flat=True))
     messages.success(request, f"{queryset.count()} member(s) or families approved successfully.")
 
 # ------------------------------------------------------------
-# Inline display: show all members under a family
+# Inline display: members under a family, a page at a time
 # ------------------------------------------------------------
-class AccountInline(admin.TabularInline):
+class AccountInline(PaginatedInlineMixin, admin.TabularInline):
     model = Account
     fields = ("first_name", "email", "phone", "role", "is_active", "is_approved")
     extra = 0
@@ -37,7 +47,7 @@ class AccountInline(admin.TabularInline):
 # Family Admin
 # ------------------------------------------------------------
 @admin.register(Family)
-class FamilyAdmin(admin.ModelAdmin):
+class FamilyAdmin(IndexedSearchAdminMixin, admin.ModelAdmin):
     def leader_display(self, obj):
         return obj.leader.first_name if obj.leader else "—"
     leader_display.short_description = _("Leader")
@@ -48,7 +58,9 @@ class FamilyAdmin(admin.ModelAdmin):
     member_count.short_description = _("Members")
     
     list_display = ("name", "leader_display", "member_count", "created", "is_approved")
+    list_select_related = ("leader",)
     search_fields = ("name", "leader__first_name", "leader__email")
+    indexed_search_fields = ("leader__first_name", "leader__email")
     list_filter = ("created", "is_approved",)
     prepopulated_fields = {"slug": ("name",)}
     inlines = [AccountInline]
@@ -66,16 +78,17 @@ class FamilyAdmin(admin.ModelAdmin):
 # Account Admin
 # ------------------------------------------------------------
 @admin.register(Account)
-class AccountAdmin(UserAdmin):
+class AccountAdmin(IndexedSearchAdminMixin, UserAdmin):
     def profile_image_preview(self, obj):
         if obj.profile_image:
-            return format_html('<img src="{}" width="50" height="50" style="border-radius:50%;" />', obj.profile_image.url)
+            return format_html('<img src="{}" width="50" height="50" style="border-radius:50%;" />', thumbnail_url(obj.profile_image, "sm"))
         return "—"
     profile_image_preview.short_description = _("Profile Image Preview")
     
     list_display = ("profile_image_preview", "username", "first_name", "email", "family", "role", "is_active", "is_approved")
     list_filter = ("role", "is_active", "gender",)
     search_fields = ("username", "first_name", "email", "phone", "family__name")
+    indexed_search_fields = ("family__name",)
     list_select_related = ("family",)
     autocomplete_fields = ("family",)
     ordering = ("-created",)
@@ -0,0 +1,35 @@
+import hashlib
+
+from accounts.models import Family
+from bakgomong.cache import cached_query
+
+
+def member_shell(request):
+    """
+    Family and role data for the navigation shell (aside and header), loaded once per
+    request. `shell_cache_key` changes whenever anything those cached fragments show
+    changes: the user's own row (via `updated`), their role/staff flag or their family.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+
+    family = None
+    if user.family_id:
+        family = cached_query(
+            f"shell-family:{user.family_id}",
+            lambda: Family.objects.filter(pk=user.family_id).only("id", "name", "slug").first(),
+            deps=["accounts.Family"],
+        )
+        # prime the relation so views and templates reading user.family skip the query
+        user.family = family
+
+    parts = [
+        user.pk, user.role, user.is_staff, user.updated.timestamp() if user.updated else "",
+        family.pk if family else "", family.name if family else "", family.slug if family else "",
+    ]
+    return {
+        "shell_family": family,
+        "shell_role": user.get_role_display(),
+        "shell_cache_key": hashlib.md5("|".join(map(str, parts)).encode("utf-8")).hexdigest(),
+    }
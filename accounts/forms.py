@@ -278,3 +278,25 @@ class AddFamilyForm(forms.ModelForm):
         if getattr(self.instance, "pk", None):
             User = get_user_model()
             self.fields["leader"].queryset = User.objects.filter(role_in=[Role.MEMBER, Role.DEP_SECRETARY, Role.CLAN_CHAIRPERSON, Role.DEP_CHAIRPERSON, Role.TREASURER])
+
+
+class MemberImportForm(forms.Form):
+    """Upload form for bulk importing families and members from CSV."""
+    families_file = forms.FileField(
+        required=False,
+        help_text=_("CSV with a 'name' column"),
+        widget=forms.FileInput(attrs={"class": "form-control rounded-lg", "accept": ".csv"}),
+    )
+    members_file = forms.FileField(
+        required=False,
+        help_text=_("CSV with family, username, email, first_name, last_name, title, gender, role, phone, address, password, is_leader"),
+        widget=forms.FileInput(attrs={"class": "form-control rounded-lg", "accept": ".csv"}),
+    )
+    approve = forms.BooleanField(required=False, help_text=_("Mark imported members as approved"))
+    dry_run = forms.BooleanField(required=False, initial=True, help_text=_("Only validate, do not write anything"))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get("families_file") and not cleaned_data.get("members_file"):
+            raise forms.ValidationError(_("Upload a families file, a members file or both."))
+        return cleaned_data
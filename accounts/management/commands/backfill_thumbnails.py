@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django_q.tasks import async_task
+
+from accounts.models import Account
+from accounts.utils.thumbnails import generate_thumbnails, needs_thumbnails
+from contributions.models import Payment
+
+SOURCES = [
+    (Account, "profile_image"),
+    (Payment, "proof_of_payment"),
+]
+
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnails for existing profile images and proof-of-payment uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sync", action="store_true", help="Generate here instead of queueing background tasks")
+        parser.add_argument("--force", action="store_true", help="Regenerate thumbnails that already exist")
+
+    def handle(self, *args, **options):
+        for model, field_name in SOURCES:
+            queued = written = 0
+            rows = (
+                model._default_manager.exclude(**{field_name: ""}).exclude(**{f"{field_name}__isnull": True})
+                .only("pk", field_name).iterator(chunk_size=500)
+            )
+            for instance in rows:
+                field_file = getattr(instance, field_name)
+                if not options["force"] and not needs_thumbnails(field_file):
+                    continue
+                if options["sync"]:
+                    written += len(generate_thumbnails(field_file, force=options["force"]))
+                else:
+                    async_task(
+                        "accounts.tasks.generate_thumbnails_task",
+                        model._meta.label, instance.pk, field_name, options["force"],
+                    )
+                queued += 1
+            action = f"{written} files written" if options["sync"] else "tasks queued"
+            self.stdout.write(f"{model._meta.label}.{field_name}: {queued} uploads, {action}")
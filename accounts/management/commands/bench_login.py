@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from accounts.utils.backends import login_lookup
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput through EmailBackend against a temporary set of accounts. "
+        "Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accounts", type=int, default=5000, help="Temporary accounts to create")
+        parser.add_argument("--logins", type=int, default=500, help="Login attempts to time")
+        parser.add_argument(
+            "--real-hasher", action="store_true",
+            help="Keep the configured password hasher (default swaps in MD5 so the lookup dominates)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options["real_hasher"]:
+                    self.run(options)
+                else:
+                    with override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]):
+                        self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        User = get_user_model()
+        password = "bench-login-pass"
+        hashed = make_password(password)
+        users = [
+            User(username=f"bench_login_{i}", email=f"bench.login.{i}@example.com", password=hashed, is_active=True)
+            for i in range(options["accounts"])
+        ]
+        User.objects.bulk_create(users, batch_size=1000)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {User._meta.db_table}")
+
+        # mix of username / email logins, varied case, plus some misses and wrong passwords
+        attempts = []
+        for i in range(options["logins"]):
+            n = random.randrange(options["accounts"])
+            kind = i % 5
+            if kind == 0:
+                attempts.append((f"BENCH_LOGIN_{n}", password))
+            elif kind == 1:
+                attempts.append((f"Bench.Login.{n}@Example.com", password))
+            elif kind == 2:
+                attempts.append((f"bench_login_{n}", "wrong-password"))
+            elif kind == 3:
+                attempts.append((f"nobody_{n}@example.com", password))
+            else:
+                attempts.append((f"bench.login.{n}@example.com", password))
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            succeeded = sum(1 for username, pw in attempts if authenticate(username=username, password=pw))
+            elapsed = time.perf_counter() - started
+
+        count = len(attempts) or 1
+        self.stdout.write(f"accounts:        {options['accounts']}")
+        self.stdout.write(f"attempts:        {len(attempts)} ({succeeded} succeeded)")
+        self.stdout.write(f"queries/attempt: {len(queries) / count:.2f}")
+        self.stdout.write(f"avg latency:     {elapsed / count * 1000:.2f} ms")
+        self.stdout.write(self.style.SUCCESS(f"throughput:      {count / elapsed:.0f} logins/s"))
+
+        if connection.vendor == "postgresql":
+            sql, params = login_lookup("bench_login_1").query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN {sql} LIMIT 1", params)
+                self.stdout.write("\nquery plan:")
+                for (line,) in cursor.fetchall():
+                    self.stdout.write(f"  {line}")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.utils.bulk_import import import_clan
+
+
+class Command(BaseCommand):
+    help = "Bulk import families and members from CSV files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--families", help="CSV file with a 'name' column")
+        parser.add_argument("--members", help="CSV file with member rows")
+        parser.add_argument("--dry-run", action="store_true", help="Validate only and print the report")
+        parser.add_argument("--approve", action="store_true", help="Mark imported members as approved")
+        parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: CPU count)")
+
+    def handle(self, *args, **options):
+        if not options["families"] and not options["members"]:
+            raise CommandError("Pass --families, --members or both.")
+
+        report = import_clan(
+            families_csv=options["families"],
+            members_csv=options["members"],
+            dry_run=options["dry_run"],
+            approve=options["approve"],
+            workers=options["workers"],
+        )
+        for error in report.errors:
+            self.stderr.write(f"{error['source']}:{error['line']}: {error['message']}")
+        if report.errors and not options["dry_run"]:
+            raise CommandError(f"Import aborted, nothing written. {report.summary()}")
+        self.stdout.write(self.style.SUCCESS(report.summary()))
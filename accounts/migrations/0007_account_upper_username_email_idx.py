@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:18
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_alter_account_role_alter_family_id_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(django.db.models.functions.text.Upper('username'), name='account_username_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='account_email_upper_idx'),
+        ),
+    ]
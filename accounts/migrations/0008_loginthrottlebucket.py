@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:20
+
+from django.db import migrations, models
+
+
+def set_unlogged(apps, schema_editor):
+    # throttle counters are disposable: skip WAL for them on PostgreSQL
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("ALTER TABLE accounts_loginthrottlebucket SET UNLOGGED")
+
+
+def set_logged(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("ALTER TABLE accounts_loginthrottlebucket SET LOGGED")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_account_upper_username_email_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginThrottleBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=80)),
+                ('bucket', models.BigIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Login Throttle Bucket',
+                'verbose_name_plural': 'Login Throttle Buckets',
+                'indexes': [models.Index(fields=['bucket'], name='accounts_lo_bucket_a82c8d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('key', 'bucket'), name='login_throttle_key_bucket_uniq')],
+            },
+        ),
+        migrations.RunPython(set_unlogged, set_logged),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:10
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from bakgomong.search import search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_loginthrottlebucket'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='account',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='family',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(*search_triggers('accounts_account', 'accounts_family')),
+    ]
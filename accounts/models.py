@@ -6,16 +6,20 @@ from django.template.defaultfilters import slugify
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext as _
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models.signals import pre_delete, post_save
 from accounts.utils.abstracts import AbstractCreate, AbstractProfile, Gender, Title, Role, PaymentStatus
 from accounts.utils.file_handlers import handle_profile_upload
 from django.db.models import Sum
+from django.db.models.functions import Upper
 
 class Family(AbstractCreate):
     name = models.CharField(max_length=300, help_text=_('Enter family name e.g Dladla Family'), unique=True)
     slug = models.SlugField(max_length=400, unique=True, db_index=True)
     leader = models.OneToOneField('Account', related_name='family_leader', on_delete=models.SET_NULL, null=True, blank=True)
     is_approved = models.BooleanField(default=False, help_text=_("Should be approved by executives"))
+    # filled by a database trigger on PostgreSQL (bakgomong/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         verbose_name = _("Family")
@@ -103,6 +107,8 @@ class Account(AbstractUser, AbstractProfile):
     is_approved = models.BooleanField(default=False, help_text=_("Should be approved by executives"))
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    # filled by a database trigger on PostgreSQL (bakgomong/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         verbose_name = _("Account")
@@ -111,11 +117,28 @@ class Account(AbstractUser, AbstractProfile):
         indexes = [
             models.Index(fields=["is_approved"]),
             models.Index(fields=["family"]),
+            # case-insensitive login lookups (EmailBackend)
+            models.Index(Upper("username"), name="account_username_upper_idx"),
+            models.Index(Upper("email"), name="account_email_upper_idx"),
         ]
 
     def __str__(self):
         full = self.get_full_name() or ""
         return full.strip() or self.username
+
+    # fields deciding which contribution types apply (contributions.utils.backfill)
+    MEMBERSHIP_FIELDS = ("is_active", "is_approved", "family_id", "role")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # None when fields are deferred
+        loaded = set(cls.MEMBERSHIP_FIELDS) <= set(instance.__dict__)
+        instance._loaded_membership = instance.membership() if loaded else None
+        return instance
+
+    def membership(self):
+        return tuple(getattr(self, field) for field in self.MEMBERSHIP_FIELDS)
     
     def get_absolute_url():
         pass
@@ -133,3 +156,26 @@ class Account(AbstractUser, AbstractProfile):
         return result["total"] or 0
 
 
+
+
+class LoginThrottleBucket(models.Model):
+    """
+    Failed-login counter for one throttle key in one time window. Only used when the
+    login throttle has no shared cache to keep its counters in (see accounts.utils.throttle).
+    """
+    key = models.CharField(max_length=80)
+    bucket = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Login Throttle Bucket")
+        verbose_name_plural = _("Login Throttle Buckets")
+        constraints = [
+            models.UniqueConstraint(fields=["key", "bucket"], name="login_throttle_key_bucket_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["bucket"]),
+        ]
+
+    def __str__(self):
+        return f"{self.key} @ {self.bucket}: {self.count}"
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from accounts.models import Account
+from accounts.utils.thumbnails import queue_thumbnails, track_file_names
+
+track_file_names(Account, "profile_image")
+
+
+@receiver(post_save, sender=Account)
+def account_profile_thumbnails(sender, instance, created, **kwargs):
+    queue_thumbnails(instance, "profile_image", created)
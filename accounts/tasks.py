@@ -1,5 +1,6 @@
 import logging
 from django.contrib.auth import get_user_model
+from django.core.mail import get_connection
 from accounts.utils import custom_mail
 
 logger = logging.getLogger("tasks")
@@ -24,6 +25,61 @@ def send_verification_email_task(user_pk):
         return False
 
 
+def send_verification_emails_task(user_pks):
+    """
+    Batch variant of send_verification_email_task used by bulk imports:
+    all emails in the batch go over a single SMTP connection.
+    Returns the number of emails sent.
+    """
+    User = get_user_model()
+    sent = 0
+    connection = get_connection()
+    try:
+        connection.open()
+        for user in User.objects.filter(pk__in=user_pks):
+            if custom_mail.send_verification_email(user, None, connection=connection):
+                sent += 1
+    except Exception:
+        logger.exception("send_verification_emails_task failed for batch of %d", len(user_pks))
+    finally:
+        connection.close()
+
+    logger.info("send_verification_emails_task: sent %d of %d", sent, len(user_pks))
+    return sent
+
+
+def import_members_task(families_path, members_path, approve=False):
+    """
+    Background task: run a bulk family/member import from files saved in private storage
+    by the upload view (they hold passwords), then remove the files.
+    """
+    from accounts.utils.bulk_import import import_clan
+    from bakgomong.storage import get_private_storage
+
+    storage = get_private_storage()
+
+    files = {}
+    try:
+        for key, path in (("families_csv", families_path), ("members_csv", members_path)):
+            if path:
+                files[key] = storage.open(path, "rb")
+        # hashes serially: django-q workers are daemonic and cannot start a process pool
+        report = import_clan(dry_run=False, approve=approve, workers=1, **files)
+        logger.info("import_members_task: %s", report.summary())
+        for error in report.errors:
+            logger.warning("import_members_task: %s line %s: %s", error["source"], error["line"], error["message"])
+        return report.ok
+    except Exception:
+        logger.exception("import_members_task failed for %s / %s", families_path, members_path)
+        return False
+    finally:
+        for fh in files.values():
+            fh.close()
+        for path in (families_path, members_path):
+            if path:
+                storage.delete(path)
+
+
 def send_password_reset_email_task(user_pk):
     User = get_user_model()
     try:
@@ -69,4 +125,23 @@ def send_html_email_task(subject, to_email, template_name, context, attachments=
         )
     except Exception:
         logger.exception("send_html_email_task failed for %s", to_email)
-        return False
\ No newline at end of file
+        return False
+
+def generate_thumbnails_task(model_label, pk, field_name, force=False):
+    """
+    Background task: write the thumbnails of <model_label>(pk).<field_name>
+    (e.g. "accounts.Account", 5, "profile_image"). Returns the number of files written.
+    """
+    from django.apps import apps
+    from accounts.utils.thumbnails import generate_thumbnails
+
+    model = apps.get_model(model_label)
+    instance = model._default_manager.filter(pk=pk).only("pk", field_name).first()
+    if instance is None:
+        logger.error("generate_thumbnails_task: %s %s not found", model_label, pk)
+        return 0
+    try:
+        return len(generate_thumbnails(getattr(instance, field_name), force=force))
+    except Exception:
+        logger.exception("generate_thumbnails_task failed for %s %s", model_label, pk)
+        return 0
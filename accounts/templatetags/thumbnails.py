@@ -0,0 +1,15 @@
+from django import template
+
+from accounts.utils.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(field_file, size="sm"):
+    """
+    {{ user.profile_image|thumbnail:"sm" }}  or  {{ payment.proof_of_payment|thumbnail:"lg,jpeg" }}
+    Falls back to the original file's URL until the thumbnail has been generated.
+    """
+    size, _, fmt = size.partition(",")
+    return thumbnail_url(field_file, size, fmt or "webp")
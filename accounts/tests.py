@@ -1,3 +1,73 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Account, Family
+from accounts.tasks import import_members_task
+from accounts.utils.bulk_import import HASH_POOL_THRESHOLD, IMPORT_SECONDS_PER_MEMBER, hash_passwords
+from bakgomong.storage import get_private_storage
+
+MEMBER_HEADER = "family,username,email,first_name,last_name,title,gender,role,phone,address,password,is_leader\n"
+
+
+def members_csv(count, family="Molefe"):
+    rows = [
+        f"{family},member{i},member{i}@example.com,Member,{i},MR,MALE,MEMBER,08{i:08d},,secret-{i},\n"
+        for i in range(count)
+    ]
+    return MEMBER_HEADER + "".join(rows)
+
+
+def daemonic_pool(*args, **kwargs):
+    raise AssertionError("daemonic processes are not allowed to have children")
+
+
+@override_settings(PRIVATE_MEDIA_ROOT=tempfile.mkdtemp())
+class ImportMembersTaskTests(TestCase):
+    def test_task_imports_without_a_process_pool(self):
+        # django-q workers are daemonic: starting the hashing pool there must never happen
+        count = HASH_POOL_THRESHOLD + 5
+        storage = get_private_storage()
+        families = storage.save("imports/families.csv", ContentFile(b"name\nMolefe\n"))
+        members = storage.save("imports/members.csv", ContentFile(members_csv(count).encode()))
+
+        with mock.patch("accounts.utils.bulk_import.process_pool", side_effect=daemonic_pool), \
+                mock.patch("accounts.utils.bulk_import.async_task"):
+            ok = import_members_task(families, members, approve=False)
+
+        self.assertTrue(ok)
+        family = Family.objects.get(name="Molefe")
+        self.assertEqual(Account.objects.filter(family=family).count(), count)
+        self.assertTrue(Account.objects.get(username="member3").check_password("secret-3"))
+        self.assertFalse(storage.exists(members))
+
+    def test_hash_passwords_is_serial_in_daemonic_process(self):
+        passwords = [f"pw-{i}" for i in range(HASH_POOL_THRESHOLD + 1)]
+        with mock.patch("accounts.utils.processes.multiprocessing.current_process") as current, \
+                mock.patch("accounts.utils.bulk_import.process_pool", side_effect=daemonic_pool):
+            current.return_value.daemon = True
+            hashed = hash_passwords(passwords, workers=None)
+        self.assertEqual(len(hashed), len(passwords))
+
+    def test_large_upload_is_queued_with_time_for_every_hash(self):
+        count = 400
+        treasurer = Account.objects.create_user(username="treasurer", password="secret", is_staff=True)
+        self.client.force_login(treasurer)
+        with mock.patch("accounts.views.imports.async_task") as queue:
+            response = self.client.post(reverse("accounts:import-members"), {
+                "families_file": SimpleUploadedFile("families.csv", b"name\nMolefe\n"),
+                "members_file": SimpleUploadedFile("members.csv", members_csv(count).encode()),
+            }, secure=True)
+        self.assertEqual(response.status_code, 302)
+        args, kwargs = queue.call_args
+        # one serial hash per member must fit in the task's timeout (the cluster's is a minute)
+        self.assertGreaterEqual(kwargs["timeout"], count * IMPORT_SECONDS_PER_MEMBER)
+
+        with mock.patch("accounts.utils.bulk_import.async_task"):
+            self.assertTrue(import_members_task(*args[1:]))
+        self.assertEqual(Account.objects.filter(family__name="Molefe").count(), count)
+        self.assertFalse(any(get_private_storage().exists(path) for path in args[1:3]))
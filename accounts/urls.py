@@ -19,6 +19,7 @@ from accounts.views.password import (
 )
 from accounts.views.family import delete_family, get_families, add_family, get_family, update_family
 from accounts.views.members import get_members, add_member, update_member, delete_member
+from accounts.views.imports import import_members
 
 app_name = "accounts"
 urlpatterns = [
@@ -42,6 +43,7 @@ urlpatterns = [
     path('dashboard/update-family/<family_slug>', update_family, name="update-family"),
     path('dashboard/delete-family/<family_slug>', delete_family, name="delete-family"),
     
+    path('dashboard/import-members', import_members, name="import-members"),
     path('dashboard/<family_slug>/members', get_members, name="get-members"),
     path('dashboard/<family_slug>/add-member', add_member, name="add-member"),
     # member management
@@ -1,18 +1,55 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import Q, Value
+from django.db.models.functions import Upper
+
+from accounts.utils.throttle import LoginThrottle
 
 UserModel = get_user_model()
 
+
+def login_lookup(username):
+    """
+    Accounts matching `username` by username or email, case-insensitively.
+    The UPPER() expressions match the functional indexes on Account, so this is an
+    index lookup; ordering by id makes the pick deterministic when both columns match.
+    """
+    wanted = Upper(Value(username))
+    return (
+        UserModel._default_manager
+        .annotate(username_upper=Upper("username"), email_upper=Upper("email"))
+        .filter(Q(username_upper=wanted) | Q(email_upper=wanted))
+        .order_by("id")
+    )
+
+
 class EmailBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            user = get_user_model().objects.get(Q(username__iexact=username) | Q(email__iexact=username))
-        except get_user_model().DoesNotExist:
-            get_user_model()().set_password(password)
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
             return
-        except get_user_model().MultipleObjectsReturned:
-            user = get_user_model().objects.filter(Q(username__iexact=username) | Q(email__iexact=username)).order_by('id').first()
 
-        if user.check_password(password) and self.user_can_authenticate(user):
-            return user
\ No newline at end of file
+        throttle = LoginThrottle(request, username)
+        if throttle.blocked():
+            # rejected before the lookup and the hasher: bursts cost no PBKDF2 time
+            if request is not None:
+                request.login_throttled = True
+            return
+
+        user = login_lookup(username).first()
+        if user is None:
+            # run the hasher anyway so unknown usernames take as long as wrong passwords
+            UserModel().set_password(password)
+            throttle.failed()
+            return
+
+        if not user.check_password(password):
+            throttle.failed()
+            return
+        throttle.succeeded()
+        if self.user_can_authenticate(user):
+            return user
+        if request is not None:
+            # lets the login view offer re-activation without looking the account up again
+            request.inactive_user = user
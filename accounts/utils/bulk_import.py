@@ -0,0 +1,319 @@
+"""
+Bulk onboarding of families and members from CSV files.
+
+families.csv columns: name
+members.csv columns:  family, username, email, first_name, last_name, title, gender,
+                      role, phone, address, password, is_leader
+
+`family` may be a family name or slug, from the families file or already in the database.
+All rows are validated up front; uniqueness against the database is resolved with one
+set-membership query per column instead of a lookup per row. The import is all-or-nothing:
+if any row fails validation nothing is written.
+"""
+import csv
+import logging
+import re
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.template.defaultfilters import slugify
+from django_q.tasks import async_task
+
+from accounts.models import Family
+from accounts.utils.abstracts import Gender, Role, Title
+from accounts.utils.processes import can_start_processes, process_pool
+from bakgomong.cache import bump_version
+
+logger = logging.getLogger("accounts")
+
+BULK_BATCH_SIZE = 500
+EMAIL_BATCH_SIZE = 50
+# below this many passwords the process pool start-up costs more than it saves
+HASH_POOL_THRESHOLD = 20
+HASH_CHUNK_SIZE = 10
+# task queue timeout of a queued import: start-up plus one serial PBKDF2 hash per member,
+# with room to spare (a hash takes about half a second)
+IMPORT_TIMEOUT_BASE = 60
+IMPORT_SECONDS_PER_MEMBER = 1
+TRUTHY = {"1", "true", "yes", "y", "x"}
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool = True
+    families_created: int = 0
+    families_existing: int = 0
+    members_created: int = 0
+    leaders_assigned: int = 0
+    emails_queued: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def error(self, source, line, message):
+        self.errors.append({"source": source, "line": line, "message": message})
+
+    def summary(self):
+        prefix = "[dry run] " if self.dry_run else ""
+        return (
+            f"{prefix}families new: {self.families_created}, existing: {self.families_existing}; "
+            f"members new: {self.members_created}; leaders: {self.leaders_assigned}; "
+            f"emails queued: {self.emails_queued}; errors: {len(self.errors)}"
+        )
+
+
+def read_rows(source):
+    """
+    Yield (line_number, row) from a CSV path, text file or uploaded (bytes) file.
+    Header names are lower-cased and values stripped.
+    """
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8-sig") as fh:
+            yield from _dict_rows(fh)
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    yield from _dict_rows(_decoded_lines(source))
+
+
+def _decoded_lines(source):
+    for line in source:
+        yield line.decode("utf-8-sig") if isinstance(line, bytes) else line
+
+
+def _dict_rows(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        cleaned = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items() if k}
+        if any(cleaned.values()):
+            yield reader.line_num, cleaned
+
+
+def _choice(choices, raw, default=None):
+    """Match a CSV value against a TextChoices enum by value or label (case-insensitive)."""
+    if not raw:
+        return default
+    wanted = raw.strip().lower()
+    for value, label in choices.choices:
+        if wanted in (value.lower(), str(label).lower()):
+            return value
+    return None
+
+
+def hash_passwords(raw_passwords, workers=1):
+    """
+    PBKDF2 is deliberately slow, so with `workers` other than 1 (the import_members
+    command; None means one per CPU) spread the hashing over a process pool. Task queue
+    workers are daemonic and cannot start one, so they always hash serially.
+    Blank passwords become unusable passwords (members then use password reset).
+    """
+    raw_passwords = [p or None for p in raw_passwords]
+    if len(raw_passwords) < HASH_POOL_THRESHOLD or workers == 1 or not can_start_processes():
+        return [make_password(p) for p in raw_passwords]
+    with process_pool(workers) as pool:
+        return list(pool.map(make_password, raw_passwords, chunksize=HASH_CHUNK_SIZE))
+
+
+def import_timeout(member_count):
+    """Seconds a queued import of `member_count` members may run (never below Q_CLUSTER["timeout"])."""
+    return max(
+        settings.Q_CLUSTER.get("timeout") or 0,
+        IMPORT_TIMEOUT_BASE + member_count * IMPORT_SECONDS_PER_MEMBER,
+    )
+
+
+def _resolve_families(family_rows, member_rows, report):
+    """
+    Validate the families file and map every family reference (lower-cased name or slug)
+    to an existing Family or a new unsaved one.
+    """
+    new_names = []
+    seen = set()
+    for line, row in family_rows:
+        name = row.get("name", "")
+        if not name:
+            report.error("families", line, "Family name is required.")
+            continue
+        if name.lower() in seen:
+            report.error("families", line, f"Duplicate family '{name}' in file.")
+            continue
+        seen.add(name.lower())
+        new_names.append(name)
+
+    refs = seen | {row.get("family", "").lower() for _, row in member_rows if row.get("family")}
+    by_key = {}
+    if refs:
+        existing = Family.objects.annotate(name_lower=Lower("name")).filter(
+            Q(name_lower__in=refs) | Q(slug__in=refs)
+        )
+        for family in existing:
+            by_key[family.name_lower] = family
+            by_key[family.slug] = family
+
+    to_create = [name for name in new_names if name.lower() not in by_key]
+    report.families_existing = len(new_names) - len(to_create)
+    if not to_create:
+        return by_key, []
+
+    bases = {slugify(name) or "family" for name in to_create}
+    pattern = r"^(%s)(-[0-9]+)?$" % "|".join(re.escape(b) for b in bases)
+    taken = set(Family.objects.filter(slug__regex=pattern).values_list("slug", flat=True))
+
+    created = []
+    for name in to_create:
+        base = slugify(name) or "family"
+        slug, counter = base, 1
+        while slug in taken:
+            slug = f"{base}-{counter}"
+            counter += 1
+        taken.add(slug)
+        family = Family(name=name, slug=slug, is_approved=True)
+        by_key[name.lower()] = family
+        by_key[slug] = family
+        created.append(family)
+    report.families_created = len(created)
+    return by_key, created
+
+
+def _validate_members(member_rows, families, approve, report):
+    User = get_user_model()
+    valid, leaders = [], {}
+    rows_by_key = {"username": {}, "email": {}, "phone": {}}
+
+    for line, row in member_rows:
+        errors = []
+        family = families.get(row.get("family", "").lower())
+        if family is None:
+            errors.append(f"Unknown family '{row.get('family', '')}'.")
+
+        email = row.get("email", "").lower()
+        if not email:
+            errors.append("Email is required.")
+        username = row.get("username") or email
+        phone = re.sub(r"[\s\-()]", "", row.get("phone", "")) or None
+
+        title = _choice(Title, row.get("title"))
+        gender = _choice(Gender, row.get("gender"))
+        role = _choice(Role, row.get("role"), default=Role.MEMBER)
+        for label, value in (("title", title), ("gender", gender), ("role", role)):
+            if value is None:
+                errors.append(f"Missing or invalid {label} '{row.get(label, '')}'.")
+
+        member = User(
+            username=username,
+            email=email,
+            first_name=row.get("first_name", ""),
+            last_name=row.get("last_name", ""),
+            title=title or "",
+            gender=gender or "",
+            role=role or Role.MEMBER,
+            phone=phone,
+            address=row.get("address") or None,
+            family=family,
+            is_active=False,
+            is_approved=approve,
+        )
+        try:
+            member.clean_fields(exclude=["password", "family", "profile_image", "title", "gender", "role"])
+        except ValidationError as exc:
+            errors.extend(f"{name}: {'; '.join(msgs)}" for name, msgs in exc.message_dict.items())
+
+        for key, value in (("username", username.lower()), ("email", email), ("phone", phone)):
+            if not value:
+                continue
+            if value in rows_by_key[key]:
+                errors.append(f"Duplicate {key} '{value}' (also on line {rows_by_key[key][value]}).")
+            else:
+                rows_by_key[key][value] = line
+
+        is_leader = row.get("is_leader", "").lower() in TRUTHY and family is not None
+        if is_leader and family.slug in leaders:
+            errors.append(f"Family '{family.name}' has more than one leader in file.")
+
+        if errors:
+            for message in errors:
+                report.error("members", line, message)
+            continue
+        if is_leader:
+            leaders[family.slug] = (family, member)
+        valid.append((line, member, row.get("password", "")))
+
+    # resolve clashes with existing accounts: one set-membership query per column
+    clashes = {
+        "username": User.objects.annotate(v=Lower("username")).filter(v__in=rows_by_key["username"]),
+        "email": User.objects.annotate(v=Lower("email")).filter(v__in=rows_by_key["email"]),
+        "phone": User.objects.annotate(v=F("phone")).filter(v__in=rows_by_key["phone"]),
+    }
+    clashing_lines = set()
+    for key, qs in clashes.items():
+        if not rows_by_key[key]:
+            continue
+        for value in qs.values_list("v", flat=True):
+            line = rows_by_key[key][value]
+            clashing_lines.add(line)
+            report.error("members", line, f"{key.capitalize()} '{value}' is already registered.")
+
+    valid = [item for item in valid if item[0] not in clashing_lines]
+    kept = {id(member) for _, member, _ in valid}
+    members = [member for _, member, _ in valid]
+    passwords = [password for _, _, password in valid]
+    return members, passwords, [pair for pair in leaders.values() if id(pair[1]) in kept]
+
+
+def queue_verification_emails(user_pks):
+    """Queue verification emails in batches; each batch task reuses one SMTP connection."""
+    user_pks = list(user_pks)
+    for start in range(0, len(user_pks), EMAIL_BATCH_SIZE):
+        async_task("accounts.tasks.send_verification_emails_task", user_pks[start:start + EMAIL_BATCH_SIZE])
+    return len(user_pks)
+
+
+def import_clan(families_csv=None, members_csv=None, dry_run=True, approve=False, workers=1):
+    """
+    Validate and (unless dry_run) import families and members. Returns an ImportReport.
+    """
+    report = ImportReport(dry_run=dry_run)
+    family_rows = list(read_rows(families_csv)) if families_csv else []
+    member_rows = list(read_rows(members_csv)) if members_csv else []
+
+    families, new_families = _resolve_families(family_rows, member_rows, report)
+    members, passwords, leaders = _validate_members(member_rows, families, approve, report)
+    report.members_created = len(members)
+    report.leaders_assigned = len(leaders)
+
+    if dry_run or report.errors:
+        if report.errors and not dry_run:
+            logger.warning("Bulk import aborted, nothing written: %s", report.summary())
+        return report
+
+    hashed = hash_passwords(passwords, workers=workers)
+    for member, password in zip(members, hashed):
+        member.password = password
+
+    User = get_user_model()
+    with transaction.atomic():
+        Family.objects.bulk_create(new_families, batch_size=BULK_BATCH_SIZE)
+        created = User.objects.bulk_create(members, batch_size=BULK_BATCH_SIZE)
+        if leaders:
+            for family, member in leaders:
+                family.leader = member
+            Family.objects.bulk_update([family for family, _ in leaders], ["leader"], batch_size=BULK_BATCH_SIZE)
+        pks = [member.pk for member in created]
+        transaction.on_commit(lambda: bump_version(Family, User))
+        transaction.on_commit(lambda: queue_verification_emails(pks))
+        if approve:
+            from contributions.utils.backfill import queue_backfill
+
+            transaction.on_commit(lambda: queue_backfill(pks))
+
+    report.emails_queued = len(pks)
+    logger.info("Bulk import finished: %s", report.summary())
+    return report
@@ -49,7 +49,7 @@ def send_email_confirmation_email(user, new_email, request):
         logger.exception("Failed to send send_email_confirmation_email to %s", getattr(user, "email", "<unknown>"))
         return False
     
-def send_verification_email(user, request):
+def send_verification_email(user, request, connection=None):
     try:
         mail_subject = "BAKGOMONG | Activate Account"
         message = render_to_string("emails/account/account_activate_email.html",
@@ -62,7 +62,7 @@ def send_verification_email(user, request):
 
         from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@bakgomong.co.za")
         text_content = strip_tags(message)
-        msg = EmailMultiAlternatives(subject=mail_subject, body=text_content, from_email=from_email, to=[user.email])
+        msg = EmailMultiAlternatives(subject=mail_subject, body=text_content, from_email=from_email, to=[user.email], connection=connection)
         msg.attach_alternative(message, "text/html")
         msg.send()
         logger.info("Verification email sent to %s", user.email)
@@ -91,9 +91,10 @@ def send_password_reset_email(user, request):
         logger.exception("Failed to send send_password_reset_email to %s", getattr(user, "email", "<unknown>"))
         return False
 
-def send_html_email_with_attachments(to_email: str, subject: str, html_content: str, from_email: str, attachments: list = None) -> bool:
+def send_html_email_with_attachments(to_email: str, subject: str, html_content: str, from_email: str, attachments: list = None, connection=None) -> bool:
+    """`connection` lets batch senders reuse one open SMTP connection for many messages."""
     try:
-        msg = EmailMultiAlternatives(subject=subject, body=strip_tags(html_content), from_email=from_email, to=[to_email])
+        msg = EmailMultiAlternatives(subject=subject, body=strip_tags(html_content), from_email=from_email, to=[to_email], connection=connection)
         msg.attach_alternative(html_content, "text/html")
 
         # Attach files if provided
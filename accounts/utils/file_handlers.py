@@ -8,4 +8,9 @@ def handle_profile_upload(instance, filename):
 def handle_docs_upload(instance, filename):
     ext = filename.split('.')[-1]
     filename = '{}-{}.{}'.format(uuid.uuid4().hex, instance.user.username,ext)
-    return f"profile/verify/{filename}"
\ No newline at end of file
+    return f"profile/verify/{filename}"
+
+def handle_statement_upload(instance, filename):
+    # bank statements keep their extension (CSV or OFX) but not the uploaded name
+    ext = filename.split('.')[-1]
+    return f"imports/statements/{uuid.uuid4().hex}.{ext}"
@@ -0,0 +1,27 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def init_django_worker():
+    """
+    Initializer for pool workers. Children are spawned (not forked) so they never
+    share the parent's database sockets; they only need settings and the app registry.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bakgomong.settings")
+    import django
+    django.setup()
+
+
+def can_start_processes():
+    """False inside daemonic processes (django-q workers), which may not have children."""
+    return not multiprocessing.current_process().daemon
+
+
+def process_pool(max_workers=None):
+    """ProcessPoolExecutor whose workers have Django configured."""
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_django_worker,
+    )
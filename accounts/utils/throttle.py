@@ -0,0 +1,174 @@
+"""
+Sliding-window throttle for failed logins, keyed by client IP and by username.
+
+Each key keeps a counter per fixed window; the sliding estimate is the current window's
+count plus the previous window's count weighted by how much of it still overlaps the
+sliding window. EmailBackend consults it before looking the user up, so throttled
+attempts never reach the password hasher.
+
+Counters live in the cache when it increments atomically across processes (redis,
+memcached), otherwise in the UNLOGGED LoginThrottleBucket table: the file-based cache's
+incr() is a read and a write, and concurrent failures would go uncounted. Configure with
+settings.LOGIN_THROTTLE (see DEFAULTS).
+"""
+import hashlib
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from bakgomong import metrics
+
+logger = logging.getLogger("accounts")
+
+DEFAULTS = {
+    "ENABLED": True,
+    "STORE": "auto",  # "cache", "db" or "auto" (cache if its incr() is atomic, else db)
+    "CACHE_ALIAS": "default",
+    "WINDOW": 300,  # seconds
+    "IP_LIMIT": 30,
+    "USERNAME_LIMIT": 8,
+    # behind a reverse proxy use "HTTP_X_FORWARDED_FOR"; the last (proxy-added) address is used
+    "IP_HEADER": "REMOTE_ADDR",
+}
+ATOMIC_INCR_BACKENDS = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+)
+DB_PRUNE_PROBABILITY = 0.01
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "LOGIN_THROTTLE", {})}
+
+
+class CacheStore:
+    def __init__(self, alias, window):
+        self.cache = caches[alias]
+        self.timeout = window * 2
+
+    def _key(self, key, bucket):
+        return f"login-throttle:{key}:{bucket}"
+
+    def counts(self, key, bucket):
+        previous, current = self._key(key, bucket - 1), self._key(key, bucket)
+        values = self.cache.get_many([previous, current])
+        return values.get(previous, 0), values.get(current, 0)
+
+    def hit(self, key, bucket):
+        cache_key = self._key(key, bucket)
+        self.cache.add(cache_key, 0, timeout=self.timeout)
+        try:
+            self.cache.incr(cache_key)
+        except ValueError:
+            # expired between add() and incr()
+            self.cache.set(cache_key, 1, timeout=self.timeout)
+
+    def reset(self, key, bucket):
+        self.cache.delete_many([self._key(key, bucket - 1), self._key(key, bucket)])
+
+
+class DatabaseStore:
+    def __init__(self, window):
+        from accounts.models import LoginThrottleBucket
+        self.model = LoginThrottleBucket
+
+    def counts(self, key, bucket):
+        rows = dict(
+            self.model.objects.filter(key=key, bucket__in=[bucket - 1, bucket]).values_list("bucket", "count")
+        )
+        return rows.get(bucket - 1, 0), rows.get(bucket, 0)
+
+    def hit(self, key, bucket):
+        rows = self.model.objects.filter(key=key, bucket=bucket)
+        if not rows.update(count=F("count") + 1):
+            try:
+                with transaction.atomic():
+                    self.model.objects.create(key=key, bucket=bucket, count=1)
+            except IntegrityError:
+                rows.update(count=F("count") + 1)
+        if random.random() < DB_PRUNE_PROBABILITY:
+            self.model.objects.filter(bucket__lt=bucket - 1).delete()
+
+    def reset(self, key, bucket):
+        self.model.objects.filter(key=key).delete()
+
+
+def get_store(config):
+    store = config["STORE"]
+    if store == "auto":
+        backend = settings.CACHES.get(config["CACHE_ALIAS"], {}).get("BACKEND", "")
+        store = "cache" if backend in ATOMIC_INCR_BACKENDS else "db"
+    if store == "cache":
+        return CacheStore(config["CACHE_ALIAS"], config["WINDOW"])
+    return DatabaseStore(config["WINDOW"])
+
+
+def client_ip(request, header="REMOTE_ADDR"):
+    value = request.META.get(header) or request.META.get("REMOTE_ADDR") or ""
+    return value.split(",")[-1].strip()
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:40]
+
+
+class LoginThrottle:
+    """
+    throttle = LoginThrottle(request, username)
+    if throttle.blocked(): reject without hashing
+    ...then throttle.failed() or throttle.succeeded()
+    """
+
+    def __init__(self, request, username, config=None):
+        self.config = config or get_config()
+        self.window = self.config["WINDOW"]
+        self.store = get_store(self.config)
+        self.keys = []
+        if request is not None:
+            ip = client_ip(request, self.config["IP_HEADER"])
+            if ip:
+                self.keys.append(("ip", f"ip:{_digest(ip)}", self.config["IP_LIMIT"]))
+        if username:
+            self.keys.append(("username", f"user:{_digest(username.strip().lower())}", self.config["USERNAME_LIMIT"]))
+
+    def _bucket(self):
+        now = time.time()
+        bucket = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+        return bucket, elapsed
+
+    def blocked(self):
+        """Return the scope ("ip" or "username") that is over its limit, or None."""
+        if not self.config["ENABLED"]:
+            return None
+        bucket, elapsed = self._bucket()
+        for scope, key, limit in self.keys:
+            previous, current = self.store.counts(key, bucket)
+            if previous * (1 - elapsed) + current >= limit:
+                metrics.incr(f"login_throttle.blocked_{scope}")
+                logger.warning("Login throttled by %s (%s failures in window)", scope, current + previous)
+                return scope
+        return None
+
+    def failed(self):
+        if not self.config["ENABLED"]:
+            return
+        bucket, _ = self._bucket()
+        for _, key, _ in self.keys:
+            self.store.hit(key, bucket)
+        metrics.incr("login_throttle.failures")
+
+    def succeeded(self):
+        """A successful login clears the username's failures (not the IP's)."""
+        if not self.config["ENABLED"]:
+            return
+        bucket, _ = self._bucket()
+        for scope, key, _ in self.keys:
+            if scope == "username":
+                self.store.reset(key, bucket)
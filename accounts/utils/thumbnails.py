@@ -0,0 +1,158 @@
+"""
+Resized derivatives of uploaded images (profile images, proof-of-payment photos).
+
+Thumbnails are generated in the background after upload and stored next to the
+original as  <dir>/thumbs/<stem>.<size>.<format>.  Templates use the `thumbnail` filter
+(accounts.templatetags.thumbnails), which falls back to the original file until the
+thumbnail exists, so pages never wait for or break on a missing derivative.
+
+Saves only queue generation for a new upload (the file name changed since the instance
+was loaded, see track_file_names()). An upload that cannot be decoded gets a
+<stem>.failed marker in thumbs/ and is not retried unless forced.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_init
+from django_q.tasks import async_task
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger("tasks")
+
+# name: bounding box in px (aspect ratio is kept)
+THUMBNAIL_SIZES = {
+    "sm": (64, 64),
+    "md": (160, 160),
+    "lg": (480, 480),
+}
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+DEFAULT_FORMAT = "webp"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
+
+
+def is_image(name):
+    return posixpath.splitext(name or "")[1].lower() in IMAGE_EXTENSIONS
+
+
+def thumbnail_name(name, size, fmt=DEFAULT_FORMAT):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "thumbs", f"{stem}.{size}.{fmt}")
+
+
+def failure_marker_name(name):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "thumbs", f"{stem}.failed")
+
+
+def thumbnail_url(field_file, size="sm", fmt=DEFAULT_FORMAT):
+    """URL of the thumbnail if it has been generated, otherwise of the original file."""
+    if not field_file:
+        return ""
+    if size in THUMBNAIL_SIZES and fmt in THUMBNAIL_FORMATS and is_image(field_file.name):
+        name = thumbnail_name(field_file.name, size, fmt)
+        if field_file.storage.exists(name):
+            return field_file.storage.url(name)
+    return field_file.url
+
+
+def needs_thumbnails(field_file):
+    if not field_file or not is_image(field_file.name):
+        return False
+    storage = field_file.storage
+    if storage.exists(failure_marker_name(field_file.name)):
+        return False
+    largest = list(THUMBNAIL_SIZES)[-1]
+    return not storage.exists(thumbnail_name(field_file.name, largest))
+
+
+def _prepare(image, fmt):
+    image = ImageOps.exif_transpose(image)
+    if fmt == "jpeg" and image.mode != "RGB":
+        # JPEG has no alpha: flatten onto white
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if image.mode not in ("RGB", "RGBA"):
+        return image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    return image
+
+
+def generate_thumbnails(field_file, force=False):
+    """Write every size/format of `field_file`. Returns the names written."""
+    if not field_file or not is_image(field_file.name):
+        return []
+    storage = field_file.storage
+    written = []
+    try:
+        with storage.open(field_file.name, "rb") as fh:
+            source = Image.open(fh)
+            source.load()
+    except FileNotFoundError as e:
+        logger.warning("Cannot make thumbnails for %s: %s", field_file.name, e)
+        return []
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        logger.warning("Cannot make thumbnails for %s: %s", field_file.name, e)
+        marker = failure_marker_name(field_file.name)
+        if not storage.exists(marker):
+            storage.save(marker, ContentFile(str(e).encode("utf-8")))
+        return []
+    if force and storage.exists(failure_marker_name(field_file.name)):
+        storage.delete(failure_marker_name(field_file.name))
+
+    for fmt, (pil_format, options) in THUMBNAIL_FORMATS.items():
+        prepared = _prepare(source, fmt)
+        for size, box in THUMBNAIL_SIZES.items():
+            name = thumbnail_name(field_file.name, size, fmt)
+            if storage.exists(name):
+                if not force:
+                    continue
+                storage.delete(name)
+            image = prepared.copy()
+            image.thumbnail(box, Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, pil_format, **options)
+            written.append(storage.save(name, ContentFile(buffer.getvalue())))
+    return written
+
+
+def _file_name(value):
+    return getattr(value, "name", value) or ""
+
+
+def track_file_names(model, *field_names):
+    """Remember the file names `model` instances were loaded with (see queue_thumbnails())."""
+    def remember(sender, instance, **kwargs):
+        # None for deferred fields: unknown, so their saves queue nothing
+        instance._loaded_file_names = {
+            name: _file_name(instance.__dict__[name]) if name in instance.__dict__ else None
+            for name in field_names
+        }
+
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=f"track-file-names-{model._meta.label}")
+
+
+def queue_thumbnails(instance, field_name, created=False):
+    """
+    Queue thumbnail generation for instance.<field_name> once the transaction commits, when
+    the instance is new or the field holds a different file than it was loaded with.
+    """
+    field_file = getattr(instance, field_name)
+    loaded = getattr(instance, "_loaded_file_names", {})
+    if not created and loaded.get(field_name) in (None, _file_name(field_file)):
+        return
+    loaded[field_name] = _file_name(field_file)
+    if not needs_thumbnails(field_file):
+        return
+    label, pk = instance._meta.label, instance.pk
+    transaction.on_commit(
+        lambda: async_task("accounts.tasks.generate_thumbnails_task", label, pk, field_name)
+    )
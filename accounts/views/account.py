@@ -1,5 +1,5 @@
 from accounts.forms import AccountUpdateForm, GeneralEditForm, SocialLinksForm, UserLoginForm, RegistrationForm
-from django.contrib.auth import login, logout, authenticate, get_user_model
+from django.contrib.auth import login, logout, get_user_model
 from accounts.models import Family
 from accounts.utils.custom_mail import send_email_confirmation_email, send_html_email, send_verification_email
 from django_q.tasks import async_task
@@ -37,21 +37,21 @@ def custom_login(request):
     if request.method == "POST":
         form = UserLoginForm(request=request, data=request.POST)
         if form.is_valid():
-            user = authenticate(
-                username=form.cleaned_data["username"],
-                password=form.cleaned_data["password"],
+            user = form.get_user()
+            login(request, user)
+            messages.success(
+                request, f"Hello {user.username}! You have been logged in"
+            )
+            return redirect(success_url)
+        elif getattr(request, "login_throttled", False):
+            messages.error(request, "Too many failed login attempts. Please wait a few minutes and try again.")
+            return render(
+                request=request, template_name=template_name, context={"form": form}, status=429
             )
-            if user is not None and user.is_active:
-                login(request, user)
-                messages.success(
-                    request, f"Hello {user.username}! You have been logged in"
-                )
-                return redirect(success_url)
         else:
-            # form is invalid; avoid using cleaned_data (may not exist)
-            username = request.POST.get("username")
-            account = User.objects.filter(username=username).first() if username else None
-            if account and not account.is_active:
+            # set by EmailBackend when the password was right but the account is inactive
+            account = getattr(request, "inactive_user", None)
+            if account is not None:
                 messages.error(
                     request,
                     f"Account is not active. An activation email was sent to {account.email}."
@@ -12,10 +12,12 @@ from contributions.models import Payment, MemberContribution
 from dashboard.models import ClanDocument
 from django.contrib.auth import get_user_model
 import logging
+from bakgomong.db_router import read_from_replica
 
 logger = logging.getLogger("accounts")
 
 @login_required
+@read_from_replica()
 def get_families(request):
     user  = request.user
     if user.role == Role.MEMBER and not user.is_staff:
@@ -26,6 +28,7 @@ def get_families(request):
 
 
 @login_required
+@read_from_replica()
 def get_family(request, family_slug=None):
     """
     Show a family's profile, members, total contributions, unpaid balances, and uploaded documents.
@@ -0,0 +1,61 @@
+import logging
+import uuid
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseForbidden
+from django.shortcuts import redirect, render
+from django_q.tasks import async_task
+
+from accounts.forms import MemberImportForm
+from accounts.utils.abstracts import Role
+from accounts.utils.bulk_import import import_clan, import_timeout
+from bakgomong.storage import get_private_storage
+
+logger = logging.getLogger("accounts")
+
+
+@login_required
+def import_members(request):
+    """
+    Treasurer upload of families/members CSV files. A dry run validates the files and shows
+    the report; a real import is queued so password hashing happens off the request thread.
+    """
+    if request.user.role != Role.TREASURER and not request.user.is_staff:
+        return HttpResponseForbidden("Only treasurers can import members.")
+
+    template_name = "members/import-members.html"
+    report = None
+
+    if request.method == "POST":
+        form = MemberImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            families_file = form.cleaned_data.get("families_file")
+            members_file = form.cleaned_data.get("members_file")
+            report = import_clan(families_csv=families_file, members_csv=members_file, dry_run=True)
+
+            if form.cleaned_data["dry_run"] or not report.ok:
+                if not report.ok:
+                    messages.error(request, "The files contain errors. Nothing was imported.")
+            else:
+                paths = [
+                    get_private_storage().save(f"imports/{uuid.uuid4().hex}.csv", upload) if upload else None
+                    for upload in (families_file, members_file)
+                ]
+                # hashing runs serially on the worker: give the task time for every member
+                async_task(
+                    "accounts.tasks.import_members_task", *paths, form.cleaned_data["approve"],
+                    timeout=import_timeout(report.members_created),
+                )
+                logger.info("Queued bulk import by %s: %s", request.user.username, report.summary())
+                messages.success(
+                    request,
+                    f"Import queued: {report.families_created} families and {report.members_created} members. "
+                    "Verification emails will be sent once the import completes."
+                )
+                return redirect("accounts:import-members")
+        else:
+            messages.error(request, "Please fix the errors below.")
+    else:
+        form = MemberImportForm()
+
+    return render(request, template_name, {"form": form, "report": report})
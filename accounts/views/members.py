@@ -11,10 +11,12 @@ from django.http import HttpResponseForbidden
 from django_q.tasks import async_task
 
 from accounts.utils.custom_mail import send_verification_email
+from bakgomong.db_router import read_from_replica
 
 logger = logging.getLogger("accounts")
 
 @login_required
+@read_from_replica()
 def get_members(request, family_slug):
     family = get_object_or_404(Family, slug=family_slug)
     members = get_user_model().objects.filter(is_approved=True, family=family).order_by("username").select_related("family")
@@ -0,0 +1,170 @@
+"""
+Admin changelists and inlines for tables with millions of rows (MemberContribution,
+Payment) and families with hundreds of members.
+
+- EstimatedCountPaginator: the admin counts the rows of every changelist page it shows.
+  On PostgreSQL the count of an unfiltered changelist comes from pg_class.reltuples
+  (summed over partitions, see bakgomong.partitioning), and a filtered one from the
+  planner's row estimate. Small results (under EXACT_COUNT_BELOW) are still counted.
+- EstimatedCountAdminMixin: that paginator, without the second full COUNT(*) the
+  changelist runs for "N total" (show_full_result_count).
+- AutocompleteFilter: a list filter for a foreign key that searches the related admin
+  (select2, like autocomplete_fields) instead of listing every related row.
+- PaginatedInlineMixin: an inline showing `per_page` related rows per page.
+"""
+import json
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# estimates below this are replaced by an exact COUNT(*)
+EXACT_COUNT_BELOW = 10000
+
+
+def estimated_count(queryset):
+    """Planner estimate of len(queryset) on PostgreSQL, else None."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    if not queryset.query.where and not queryset.query.distinct:
+        # statistics of the table and, when partitioned, its partitions (the parent has none)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint FROM pg_class c "
+                "WHERE c.oid = to_regclass(%s) "
+                "OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s))",
+                [queryset.model._meta.db_table] * 2,
+            )
+            return cursor.fetchone()[0]
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator counting with estimated_count(); `estimated` tells whether it did."""
+    estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < EXACT_COUNT_BELOW:
+            return super().count
+        self.estimated = True
+        return estimate
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # with an estimated count the real last page may lie past num_pages; it is just empty
+            if not self.estimated or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        if not self.estimated:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class EstimatedCountAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        if any(isinstance(spec, tuple) and issubclass(spec[1], AutocompleteFilter) for spec in self.list_filter):
+            media += AutocompleteSelect(None, self.admin_site).media
+        return media
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Filter on a foreign key through the related admin's autocomplete view; that admin needs
+    search_fields. Use with EstimatedCountAdminMixin, which adds the select2 assets.
+    """
+    template = "admin/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.model_admin = model_admin
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        # the choices come from the autocomplete view
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        remote = self.field.remote_field.model
+        field = forms.ModelChoiceField(
+            queryset=remote._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(self.field, self.model_admin.admin_site, attrs={"onchange": "this.form.submit()"}),
+        )
+        form = type("AutocompleteFilterForm", (forms.Form,), {self.lookup_kwarg: field})(
+            data={self.lookup_kwarg: self.lookup_val[-1] if self.lookup_val else None}
+        )
+        yield {
+            "selected": bool(self.lookup_val),
+            "field": form[self.lookup_kwarg],
+            "hidden": [
+                (name, value)
+                for name, value in changelist.params.items()
+                if name not in (self.lookup_kwarg, self.lookup_kwarg_isnull)
+            ],
+            "clear_query_string": changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+        }
+
+
+class PaginatedInlineFormSet(forms.BaseInlineFormSet):
+    """Shows one page of the related rows; PaginatedInlineMixin sets the class attributes."""
+    per_page = 25
+    page_number = 1
+    query = None
+
+    def get_queryset(self):
+        if not hasattr(self, "_page"):
+            self.paginator = Paginator(super().get_queryset(), self.per_page)
+            self._page = self.paginator.get_page(self.page_number)
+            self._queryset = self._page.object_list
+        return self._queryset
+
+    @property
+    def page(self):
+        self.get_queryset()
+        return self._page
+
+    @property
+    def page_param(self):
+        return f"{self.prefix}_page"
+
+    def page_links(self):
+        """[(number, query string, current)] for the inline's pager."""
+        links = []
+        for number in self.page.paginator.page_range:
+            query = self.query.copy()
+            query[self.page_param] = str(number)
+            links.append((number, query.urlencode(), number == self.page.number))
+        return links
+
+
+class PaginatedInlineMixin:
+    formset = PaginatedInlineFormSet
+    template = "admin/edit_inline/tabular_paginated.html"
+    per_page = 25
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_number = request.GET.get(f"{formset.get_default_prefix()}_page", 1)
+        formset.query = request.GET.copy()
+        return formset
@@ -0,0 +1,40 @@
+"""
+Helpers for async views.
+
+Django's async ORM methods (aget, acount, aaggregate, ...) run their queries one at a
+time on the request's sync thread, so gathering them saves nothing. in_thread() runs a
+sync function on a thread of its own, with a connection borrowed from that process's pool,
+so independent queries gathered with asyncio.gather() really run at the same time.
+
+That only pays off, and only stays within the database's connection limit, in an ASGI
+worker (bakgomong.asgi) with pooled connections (bakgomong.db_pool): each concurrent
+query holds one pooled connection and waits for a free one past the pool's max_size.
+Anywhere else (the WSGI handler, which runs an async view on a new event loop per request,
+management commands, tests, or no pool) in_thread() runs the function on the request's
+own thread and connection, one call after the other, like the async ORM does.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+
+from bakgomong.db_pool import pooled, process_role
+
+
+def concurrent_queries():
+    """Whether in_thread() runs its calls at the same time: an ASGI worker with a pool."""
+    return process_role() == "asgi" and all(pooled(connections[alias]) for alias in connections)
+
+
+def _run(func, args, kwargs):
+    # the request_started/request_finished connection handling, for this thread's connection
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def in_thread(func, *args, **kwargs):
+    """await func(*args, **kwargs), on its own thread and database connection when concurrent_queries()."""
+    if not concurrent_queries():
+        return await sync_to_async(func)(*args, **kwargs)
+    return await sync_to_async(_run, thread_sensitive=False)(func, args, kwargs)
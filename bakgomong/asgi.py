@@ -2,6 +2,13 @@
 ASGI config for bakgomong project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with gunicorn's uvicorn workers, so the async views (dashboard index, meetings
+API, member invoice) run on the event loop:
+
+    gunicorn bakgomong.asgi:application -k uvicorn.workers.UvicornWorker
+
+The process gets the "asgi" database role (bakgomong.db_pool): its own pool size, and
+with a pool the async views run their independent queries at the same time.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +19,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bakgomong.settings')
+os.environ.setdefault('DB_PROCESS_ROLE', 'asgi')
 
 application = get_asgi_application()
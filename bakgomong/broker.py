@@ -0,0 +1,168 @@
+"""
+django-q broker for PostgreSQL.
+
+Uses the same django_q_ormq table as the ORM broker (so the admin's queued-task list and
+existing rows keep working) but:
+
+- claims up to Q_CLUSTER["bulk"] tasks with one UPDATE ... WHERE id IN (SELECT ... FOR
+  UPDATE SKIP LOCKED) RETURNING, so concurrent clusters never wait on each other's rows;
+- wakes idle workers with LISTEN/NOTIFY instead of sleeping `poll` seconds between empty
+  polls. enqueue() sends a NOTIFY on the queue's channel; an idle dequeue() blocks on its
+  listening connection until a notification arrives or Q_CLUSTER["listen_timeout"]
+  (default 5s) passes, which also picks up tasks whose lock expired (retries). The
+  listening connection is opened directly, outside the connection pool (db_pool), and
+  closed with the broker.
+- keeps a task that has a timeout of its own (async_task(..., timeout=...)) longer than
+  Q_CLUSTER["retry"] locked until that timeout has passed, so no other worker picks it
+  up again while it still runs. The ORM broker always unlocks after `retry` seconds.
+
+Enable it with Q_CLUSTER["broker_class"] = "bakgomong.broker.PostgresBroker". On other
+database vendors it behaves exactly like the ORM broker.
+"""
+import select
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from django_q.brokers.orm import ORM
+from django_q.conf import Conf, logger
+from django_q.models import OrmQ
+from django_q.signing import BadSignature, SignedPackage
+
+DEFAULT_LISTEN_TIMEOUT = 5.0
+CHANNEL_PREFIX = "django_q_"
+
+
+def listen_timeout():
+    return float(settings.Q_CLUSTER.get("listen_timeout", DEFAULT_LISTEN_TIMEOUT))
+
+
+def channel_name(list_key):
+    # NOTIFY channels are identifiers: at most 63 bytes
+    return (CHANNEL_PREFIX + (list_key or Conf.CLUSTER_NAME))[:63]
+
+
+class PostgresBroker(ORM):
+    def __init__(self, list_key: str = None):
+        super().__init__(list_key=list_key)
+        self.channel = channel_name(self.list_key)
+        self._listener = None
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.channel = channel_name(self.list_key)
+        # a listening connection is never shared across processes: reopened lazily
+        self._listener = None
+
+    @property
+    def db(self):
+        return connections[Conf.ORM]
+
+    @property
+    def is_postgres(self):
+        return self.db.vendor == "postgresql"
+
+    def info(self) -> str:
+        if not self.is_postgres:
+            return super().info()
+        if not self._info:
+            self._info = f"PostgreSQL {Conf.ORM} (SKIP LOCKED, LISTEN {self.channel})"
+        return self._info
+
+    def enqueue(self, task):
+        package_id = super().enqueue(task)
+        if self.is_postgres:
+            with self.db.cursor() as cursor:
+                # delivered on commit when called inside a transaction
+                cursor.execute("SELECT pg_notify(%s, '')", [self.channel])
+        return package_id
+
+    def claim(self):
+        """Lock and return up to Conf.BULK [(id, payload)] that no other cluster holds."""
+        table = self.db.ops.quote_name(OrmQ._meta.db_table)
+        now = timezone.now()
+        with self.db.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} SET "lock" = %s
+                WHERE "id" IN (
+                    SELECT "id" FROM {table}
+                    WHERE "key" = %s AND "lock" < %s
+                    ORDER BY "id"
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING "id", "payload"
+                """,
+                [self.timeout(None), self.list_key, now, Conf.BULK],
+            )
+            tasks = cursor.fetchall()
+        self.hold_long_tasks(tasks, now)
+        return tasks
+
+    def hold_long_tasks(self, tasks, now):
+        """Extend the lock of claimed tasks whose own timeout outlasts Conf.RETRY."""
+        for task_id, payload in tasks:
+            try:
+                timeout = SignedPackage.loads(payload).get("timeout")
+            except (TypeError, BadSignature):
+                continue  # the pusher fails it
+            if timeout and timeout >= Conf.RETRY:
+                OrmQ.objects.using(Conf.ORM).filter(pk=task_id).update(lock=now + timedelta(seconds=timeout + Conf.RETRY))
+
+    def dequeue(self):
+        if not self.is_postgres:
+            return super().dequeue()
+        self.get_connection()  # closes stale connections like the ORM broker
+        # LISTEN before claiming, so a NOTIFY sent between an empty claim and the wait is not lost
+        listener = self._listen()
+        tasks = self.claim()
+        if tasks:
+            return tasks
+        self._wait(listener, listen_timeout())
+
+    def _listen(self):
+        if self._listener is None:
+            try:
+                # a connection of its own, never one borrowed from the pool (which would stay
+                # checked out for as long as the broker lives)
+                listener = self.db.Database.connect(**self.db.get_connection_params())
+                listener.autocommit = True
+                with listener.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                self._listener = listener
+            except Exception:
+                logger.exception("PostgresBroker could not LISTEN on %s; falling back to polling", self.channel)
+                self._listener = None
+        return self._listener
+
+    def _wait(self, listener, timeout):
+        if listener is None:
+            time.sleep(Conf.POLL)
+            return
+        try:
+            if hasattr(listener, "poll"):
+                # psycopg2
+                listener.poll()
+                if not listener.notifies:
+                    if select.select([listener], [], [], timeout) != ([], [], []):
+                        listener.poll()
+                listener.notifies.clear()
+            else:
+                # psycopg 3
+                for _ in listener.notifies(timeout=timeout, stop_after=1):
+                    pass
+        except Exception:
+            logger.exception("PostgresBroker lost its LISTEN connection on %s", self.channel)
+            self.close()
+
+    def close(self):
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except Exception:
+                pass
+            self._listener = None
@@ -0,0 +1,251 @@
+"""
+Versioned caching.
+
+Every cached model has a version counter in the cache. post_save / post_delete bump it,
+and cache keys embed the current versions of the models a value depends on, so a write
+makes every dependent entry unreachable without deleting anything by hand; stale entries
+simply expire.
+
+    totals = cached_query("clan-totals", compute_totals, deps=["contributions.MemberContribution"])
+
+    @cache_view(deps=["dashboard.Meeting"])
+    def meetings(request): ...
+
+Bulk writes (QuerySet.update, bulk_create) do not send signals: call bump_version()
+after them. A bump happens when the writer's transaction commits (at once outside one):
+bumped earlier, a concurrent reader could miss, recompute from the rows as they were
+before the commit and store them under the new version until the entry expires.
+
+incr() is cache.add() + cache.incr(), which redis and memcached do atomically. The
+file-based cache reads, adds and writes the value back, so there it runs under a lock
+file shared by the processes of the host; otherwise concurrent increments would be lost.
+
+A version bump only reaches the processes sharing the cache, so with a per-process
+backend (locmem, dummy) cached_query() and cache_view() do not cache at all: another
+gunicorn worker or qcluster process would keep serving values from before the write.
+"""
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files import locks
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+KEY_PREFIX = "vc"
+DEFAULT_TIMEOUT = 300
+
+# backends whose entries (and version counters) are private to one process
+PROCESS_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+FILE_BACKEND = "django.core.cache.backends.filebased.FileBasedCache"
+
+VERSIONED_MODELS = [
+    "accounts.Account",
+    "accounts.Family",
+    "contributions.ContributionType",
+    "contributions.MemberContribution",
+    "contributions.Payment",
+    "dashboard.Meeting",
+    "dashboard.ClanDocument",
+]
+
+
+def cache_settings(base_dir, backend="file", location=None):
+    """
+    CACHES setting for the chosen backend: "file" (shared by the processes on one host),
+    "redis" (shared by every host; location is the URL) or "locmem" (per process, which
+    turns versioned caching off).
+    """
+    if backend == "redis":
+        default = {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": location or "redis://127.0.0.1:6379/1",
+        }
+    elif backend == "file":
+        default = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": location or str(base_dir / "cache"),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    else:
+        default = {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": location or "bakgomong",
+        }
+    default["KEY_PREFIX"] = "bakgomong"
+    default["TIMEOUT"] = DEFAULT_TIMEOUT
+    return {"default": default}
+
+
+def is_shared():
+    """Whether every process sees the same cache, so a version bump invalidates everywhere."""
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_BACKENDS
+
+
+def model_label(model):
+    """'app_label.model' for a model class, instance or "app_label.Model" string."""
+    if isinstance(model, str):
+        return model.lower()
+    return model._meta.label_lower
+
+
+def _version_key(label):
+    return f"{KEY_PREFIX}:version:{label}"
+
+
+def _initial_version():
+    # time based, so versions never restart at a number an old entry was stored under
+    return int(time.time() * 1000)
+
+
+def get_versions(deps):
+    labels = sorted({model_label(dep) for dep in deps})
+    keys = {label: _version_key(label) for label in labels}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for label, key in keys.items():
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key, _initial_version())
+        versions[label] = found[key]
+    return versions
+
+
+@contextmanager
+def _incr_lock():
+    config = settings.CACHES["default"]
+    if config["BACKEND"] != FILE_BACKEND:
+        yield
+        return
+    os.makedirs(config["LOCATION"], exist_ok=True)
+    # not a *.djcache file, so the cache never culls it
+    with open(os.path.join(config["LOCATION"], "incr.lock"), "a") as fh:
+        locks.lock(fh, locks.LOCK_EX)
+        try:
+            yield
+        finally:
+            locks.unlock(fh)
+
+
+def incr(key, delta=1, initial=0, timeout=None):
+    """Add `delta` to the default cache's `key` (starting from `initial`); returns the new value."""
+    with _incr_lock():
+        cache.add(key, initial, timeout=timeout)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # expired between add() and incr()
+            cache.set(key, initial + delta, timeout=timeout)
+            return initial + delta
+
+
+def bump_version(*models, using=None):
+    """Invalidate what depends on `models`, once the current transaction on `using` commits."""
+    def bump():
+        for model in models:
+            incr(_version_key(model_label(model)), initial=_initial_version())
+
+    transaction.on_commit(bump, using=using)
+
+
+def make_key(key, deps):
+    versions = get_versions(deps)
+    stamp = ".".join(f"{label}={version}" for label, version in versions.items())
+    digest = hashlib.md5(stamp.encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:{key}:{digest}"
+
+
+def cached_query(key, compute, deps, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached result of compute() for `key`, recomputing it whenever one of the
+    `deps` models has changed. Return evaluated values (lists, numbers), not querysets.
+    """
+    if not is_shared():
+        return compute()
+    full_key = make_key(key, deps)
+    missing = object()
+    value = cache.get(full_key, missing)
+    if value is missing:
+        value = compute()
+        cache.set(full_key, value, timeout)
+    return value
+
+
+def cache_view(deps, timeout=DEFAULT_TIMEOUT, per_user=True):
+    """
+    Cache a view's GET responses until one of `deps` changes.
+
+    per_user responses are keyed by user and session, so login/logout (which rotate the
+    session and CSRF token) never serve another session's page. Requests with pending
+    flash messages are not served from, or stored into, the cache. Works on sync and
+    async views.
+    """
+    def cache_key(request, user, view_func):
+        parts = [view_func.__module__, view_func.__qualname__, request.get_full_path()]
+        if per_user:
+            session_key = getattr(getattr(request, "session", None), "session_key", None) or ""
+            parts += [str(user.pk), hashlib.md5(session_key.encode("utf-8")).hexdigest()]
+        return make_key("view:" + hashlib.md5("|".join(parts).encode("utf-8")).hexdigest(), deps)
+
+    def store(full_key, response):
+        if response.status_code == 200 and not response.streaming:
+            if hasattr(response, "render") and callable(response.render):
+                response.render()
+            cache.set(full_key, response, timeout)
+
+    def finish(response):
+        if per_user:
+            patch_vary_headers(response, ["Cookie"])
+            patch_cache_control(response, private=True)
+        return response
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                if not is_shared() or request.method not in ("GET", "HEAD") or await sync_to_async(lambda: len(get_messages(request)))():
+                    return await view_func(request, *args, **kwargs)
+
+                user = await request.auser() if per_user else None
+                full_key = await sync_to_async(cache_key)(request, user, view_func)
+                response = await cache.aget(full_key)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                    await sync_to_async(store)(full_key, response)
+                return finish(response)
+            return _wrapped_async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not is_shared() or request.method not in ("GET", "HEAD") or len(get_messages(request)):
+                return view_func(request, *args, **kwargs)
+
+            full_key = cache_key(request, request.user, view_func)
+            response = cache.get(full_key)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                store(full_key, response)
+            return finish(response)
+        return _wrapped_view
+    return decorator
+
+
+def _bump_sender(sender, using=None, **kwargs):
+    bump_version(sender, using=using)
+
+
+def connect_version_signals():
+    for label in VERSIONED_MODELS:
+        post_save.connect(_bump_sender, sender=label, dispatch_uid=f"cache-version-save-{label}")
+        post_delete.connect(_bump_sender, sender=label, dispatch_uid=f"cache-version-delete-{label}")
@@ -0,0 +1,129 @@
+"""
+Database connection reuse.
+
+With psycopg 3 and psycopg_pool installed, connection_settings() gives each process a
+connection pool (Django's OPTIONS["pool"]): connections are opened once, checked with a
+cheap query when a request borrows them (CONN_HEALTH_CHECKS) and returned after the
+request. Pool sizes differ per process role: gunicorn web workers serve many short
+requests, django-q workers (qcluster) run one task at a time, and ASGI workers
+(bakgomong.asgi, role "asgi") also run several queries of one request at once
+(bakgomong.aio.in_thread). Without psycopg_pool (or with DB_POOL off) the same settings
+fall back to persistent connections (CONN_MAX_AGE) with health checks, except for ASGI
+workers: Django runs the sync code of each ASGI request on a thread of its own, so a
+persistent connection per thread would pile up; there they close after the request.
+
+pool_stats() reports pool utilisation and how long requests waited for a connection, for
+the process that serves the dashboard:metrics view. The "db.connections_opened" counter
+(bakgomong.metrics) counts new connections in every process.
+"""
+import os
+import sys
+
+DEFAULT_SIZES = {
+    # (min_size, max_size) connections per process
+    "web": (2, 8),
+    "worker": (1, 2),
+    "asgi": (4, 16),
+}
+# seconds a request waits for a free pooled connection before failing
+POOL_TIMEOUT = 10
+# seconds an unpooled connection is kept open between requests
+CONN_MAX_AGE = 600
+
+WORKER_COMMANDS = ("qcluster", "celery")
+
+
+def process_role(argv=None):
+    """"worker" for task queue processes, else "web" ("asgi" is set by bakgomong.asgi). DB_PROCESS_ROLE overrides it."""
+    role = os.environ.get("DB_PROCESS_ROLE")
+    if role:
+        return role
+    argv = sys.argv if argv is None else argv
+    return "worker" if any(command in argv for command in WORKER_COMMANDS) else "web"
+
+
+def pool_available():
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def connection_settings(database, pool=True, role="web", sizes=None, timeout=POOL_TIMEOUT, conn_max_age=CONN_MAX_AGE):
+    """`database` (a DATABASES entry) with pooled or persistent connections for `role`."""
+    database = {**database, "OPTIONS": {**database.get("OPTIONS", {})}, "CONN_HEALTH_CHECKS": True}
+    if pool and pool_available():
+        min_size, max_size = {**DEFAULT_SIZES, **(sizes or {})}.get(role, DEFAULT_SIZES["web"])
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": min_size,
+            "max_size": max_size,
+            "timeout": timeout,
+            "name": f"bakgomong-{role}",
+        }
+    else:
+        database["CONN_MAX_AGE"] = 0 if role == "asgi" else conn_max_age
+    return database
+
+
+def pooled(connection):
+    return bool(connection.settings_dict["OPTIONS"].get("pool"))
+
+
+def pool_stats():
+    """{alias: stats} of each database connection's pool (or persistent connection settings)."""
+    from django.db import connections
+
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        pool = getattr(connection, "pool", None)
+        if pool is None:
+            stats[alias] = {
+                "mode": "persistent" if connection.settings_dict.get("CONN_MAX_AGE") else "per-request",
+                "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE"),
+            }
+            continue
+        raw = pool.get_stats()
+        requests = raw.get("requests_num", 0)
+        in_use = raw.get("pool_size", 0) - raw.get("pool_available", 0)
+        stats[alias] = {
+            "mode": "pool",
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "size": raw.get("pool_size", 0),
+            "in_use": in_use,
+            "utilisation": round(in_use / pool.max_size, 3) if pool.max_size else None,
+            "waiting": raw.get("requests_waiting", 0),
+            "requests": requests,
+            "requests_queued": raw.get("requests_queued", 0),
+            "avg_wait_ms": round(raw.get("requests_wait_ms", 0) / requests, 2) if requests else 0,
+            "timeouts": raw.get("requests_errors", 0),
+            "connections_opened": raw.get("connections_num", 0),
+            "avg_connect_ms": round(raw.get("connections_ms", 0) / raw["connections_num"], 2) if raw.get("connections_num") else 0,
+            "failed_checks": raw.get("connections_lost", 0),
+        }
+    return stats
+
+
+def count_connection(sender, connection, **kwargs):
+    """connection_created receiver: counts new database connections."""
+    from bakgomong import metrics
+
+    if pooled(connection):
+        # a connection borrowed from the pool: pool_stats() counts the ones it opens
+        return
+    metrics.incr("db.connections_opened")
+
+
+def _forget_inherited_pools():
+    # a forked child (django-q worker) must not share its parent's pooled sockets or pool threads
+    base = sys.modules.get("django.db.backends.postgresql.base")
+    if base is not None:
+        base.DatabaseWrapper._connection_pools.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_pools)
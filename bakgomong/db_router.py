@@ -0,0 +1,150 @@
+"""
+Read replica routing.
+
+Reads go to the primary unless the code asked for the replica: views decorated with
+@read_from_replica() (dashboards, reports, list pages) and jobs run inside
+`with read_from_replica():`. Even then a read stays on the primary when
+
+- it runs inside a transaction (atomic block) on the primary;
+- this request or job has already written: it must see its own writes;
+- the client wrote within the last STICKY_SECONDS: ReplicaStickinessMiddleware sets a
+  short-lived cookie on responses to requests that wrote, so the redirect after a POST is
+  not served stale data by a lagging replica;
+- the model belongs to PRIMARY_APPS (sessions, task queues).
+
+Without settings.DATABASE_REPLICA["ALIAS"] in DATABASES (the default) everything stays on
+the primary. Tunable with settings.DATABASE_REPLICA (see DEFAULTS).
+"""
+import contextlib
+import functools
+import inspect
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULTS = {
+    "ALIAS": "replica",
+    # seconds a client that wrote keeps reading from the primary
+    "STICKY_SECONDS": 10,
+    "COOKIE": "use_primary",
+    "PRIMARY_APPS": ("sessions", "django_q", "django_celery_results", "django_celery_beat"),
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "DATABASE_REPLICA", {})}
+
+
+def replica_alias():
+    """The replica's DATABASES alias, or None when no replica is configured."""
+    alias = get_config()["ALIAS"]
+    return alias if alias and alias in settings.DATABASES else None
+
+
+class RoutingState:
+    __slots__ = ("replica", "sticky", "wrote")
+
+    def __init__(self, replica=False, sticky=False):
+        self.replica = replica
+        self.sticky = sticky
+        self.wrote = False
+
+
+_state = ContextVar("db_routing", default=None)
+
+
+def set_routing_state(state):
+    return _state.set(state)
+
+
+def reset_routing_state(token):
+    _state.reset(token)
+
+
+@contextlib.contextmanager
+def routing_state(**kwargs):
+    """A fresh RoutingState for one request or job."""
+    state = RoutingState(**kwargs)
+    token = set_routing_state(state)
+    try:
+        yield state
+    finally:
+        reset_routing_state(token)
+
+
+class read_from_replica:
+    """
+    Send reads to the replica (see the module docstring). A context manager, and a
+    decorator for sync and async views.
+    """
+
+    def __enter__(self):
+        state = _state.get()
+        if state is None:
+            self._token, self._previous = set_routing_state(RoutingState(replica=True)), None
+        else:
+            self._token, self._previous = None, state.replica
+            state.replica = True
+
+    def __exit__(self, *exc_info):
+        if self._token is not None:
+            reset_routing_state(self._token)
+        else:
+            _state.get().replica = self._previous
+
+    def __call__(self, func):
+        # a fresh instance per call: concurrent requests must not share _token/_previous
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def inner(*args, **kwargs):
+                with read_from_replica():
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def inner(*args, **kwargs):
+                with read_from_replica():
+                    return func(*args, **kwargs)
+        return inner
+
+
+def _primary_only(model):
+    return model._meta.app_label in get_config()["PRIMARY_APPS"]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias is None:
+            return None
+        state = _state.get()
+        if (
+            state is None
+            or not state.replica
+            or state.sticky
+            or state.wrote
+            or _primary_only(model)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            # explicit, so instances loaded from the replica do not drag their relations there
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and not _primary_only(model):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema through replication
+        if db == replica_alias():
+            return False
+        return None
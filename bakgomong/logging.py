@@ -1,6 +1,26 @@
+"""
+Logging setup (settings.LOGGING, installed by configure_logging via LOGGING_CONFIG).
+
+With LOG_QUEUE on (the default) the file and admin-email handlers do not run on the
+logging thread: configure_logging() swaps every logger's handlers for a QueueHandler and
+one QueueListener thread per process writes the records out. LOG_FORMAT=json writes the
+log files as JSON lines.
+
+Every record carries a correlation_id: the request's (CorrelationIdMiddleware, taken from
+an X-Request-ID header or generated) and, in django-q workers, the id of the request or
+task that queued the task, so log lines can be joined across web and worker processes.
+"""
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.config
+import logging.handlers
 import os
+import queue
+import uuid
 from pathlib import Path
-from datetime import datetime
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -15,21 +35,79 @@ LOGGING_LEVEL = os.getenv("LOGGING_LEVEL", "INFO").upper()
 LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))  # 10MB
 LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 7))
 
+# hand records to a background thread instead of writing them on the calling thread
+LOG_QUEUE = os.getenv("LOG_QUEUE", "true").lower() in ("1", "true", "yes")
+# "text" or "json" (one JSON object per line) for the log files
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+FILE_FORMATTER = "json" if LOG_FORMAT == "json" else "default"
+
+_correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+
+def get_correlation_id():
+    return _correlation_id.get()
+
+
+def set_correlation_id(value=None):
+    """Set the current correlation id (a new one when `value` is empty). Returns a reset token."""
+    return _correlation_id.set(value or uuid.uuid4().hex)
+
+
+def reset_correlation_id(token):
+    _correlation_id.reset(token)
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamps record.correlation_id ("-" outside a request or task) on the emitting thread."""
+
+    def filter(self, record):
+        if not hasattr(record, "correlation_id"):
+            record.correlation_id = _correlation_id.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "process": record.process,
+            "thread": record.threadName,
+            "module": record.module,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
 # Logging
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'correlation_id': {
+            '()': 'bakgomong.logging.CorrelationIdFilter',
+        },
+    },
     'formatters': {
         'default': {
-            'format': '%(levelname)s %(asctime)s %(name)s %(process)d %(threadName)s %(module)s %(message)s',
+            'format': '%(levelname)s %(asctime)s %(name)s %(process)d %(threadName)s %(module)s [%(correlation_id)s] %(message)s',
             'datefmt': '%Y-%m-%d %H:%M:%S',
         },
+        'json': {
+            '()': 'bakgomong.logging.JsonFormatter',
+        },
     },
     'handlers': {
         'console': {
             'level': LOGGING_LEVEL,
             'class': 'logging.StreamHandler',
             'formatter': 'default',
+            'filters': ['correlation_id'],
         },
         'rotating_file': {
             'level': LOGGING_LEVEL,
@@ -37,7 +115,8 @@ LOGGING = {
             'filename': str(LOGGING_DIR / 'app.log'),
             'maxBytes': LOG_MAX_BYTES,
             'backupCount': LOG_BACKUP_COUNT,
-            'formatter': 'default',
+            'formatter': FILE_FORMATTER,
+            'filters': ['correlation_id'],
         },
         # per-area rotating handlers
         'accounts_file': {
@@ -46,7 +125,8 @@ LOGGING = {
             'filename': str(LOGGING_DIR / 'accounts.log'),
             'maxBytes': LOG_MAX_BYTES,
             'backupCount': LOG_BACKUP_COUNT,
-            'formatter': 'default',
+            'formatter': FILE_FORMATTER,
+            'filters': ['correlation_id'],
         },
         'emails_file': {
             'level': LOGGING_LEVEL,
@@ -54,7 +134,8 @@ LOGGING = {
             'filename': str(LOGGING_DIR / 'emails.log'),
             'maxBytes': LOG_MAX_BYTES,
             'backupCount': LOG_BACKUP_COUNT,
-            'formatter': 'default',
+            'formatter': FILE_FORMATTER,
+            'filters': ['correlation_id'],
         },
         'tasks_file': {
             'level': LOGGING_LEVEL,
@@ -62,7 +143,8 @@ LOGGING = {
             'filename': str(LOGGING_DIR / 'tasks.log'),
             'maxBytes': LOG_MAX_BYTES,
             'backupCount': LOG_BACKUP_COUNT,
-            'formatter': 'default',
+            'formatter': FILE_FORMATTER,
+            'filters': ['correlation_id'],
         },
         'signals_file': {
             'level': LOGGING_LEVEL,
@@ -70,7 +152,8 @@ LOGGING = {
             'filename': str(LOGGING_DIR / 'signals.log'),
             'maxBytes': LOG_MAX_BYTES,
             'backupCount': LOG_BACKUP_COUNT,
-            'formatter': 'default',
+            'formatter': FILE_FORMATTER,
+            'filters': ['correlation_id'],
         },
         'smtp_file': {
             'level': 'DEBUG',
@@ -78,12 +161,14 @@ LOGGING = {
             'filename': str(LOGGING_DIR / 'smtp.log'),
             'maxBytes': LOG_MAX_BYTES,
             'backupCount': LOG_BACKUP_COUNT,
-            'formatter': 'default',
+            'formatter': FILE_FORMATTER,
+            'filters': ['correlation_id'],
         },
         'mail_admins': {
             'level': 'ERROR',
             'class': 'django.utils.log.AdminEmailHandler',
             'include_html': True,
+            'filters': ['correlation_id'],
         },
     },
     'loggers': {
@@ -133,3 +218,115 @@ LOGGING = {
     },
 }
 
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records for the handlers of one logger (`route`)."""
+
+    def __init__(self, route):
+        super().__init__(None)
+        self.route = route
+        self.addFilter(CorrelationIdFilter())
+
+    def prepare(self, record):
+        # the listener runs in this process, so unlike the stock QueueHandler keep exc_info
+        # and extras (AdminEmailHandler reads record.request); only freeze the message
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args = record.getMessage(), None
+        record.route = self.route
+        return record
+
+
+class _Dispatcher(logging.Handler):
+    """Runs on the listener thread: hands each record to its logger's original handlers."""
+
+    def __init__(self, routes):
+        super().__init__()
+        self.routes = routes
+
+    def handle(self, record):
+        for handler in self.routes.get(record.route, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_listener = None
+_queue_handlers = []
+
+
+def _start_listener(routes):
+    global _listener
+    records = queue.SimpleQueue()
+    for handler in _queue_handlers:
+        handler.queue = records
+    _listener = logging.handlers.QueueListener(records, _Dispatcher(routes))
+    _listener.start()
+
+
+def start_queue():
+    """Move every configured logger's handlers behind one QueueListener thread."""
+    if _listener is not None:
+        return
+    routes = {}
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+    ]
+    for logger in loggers:
+        if not logger.handlers:
+            continue
+        routes[logger.name] = list(logger.handlers)
+        handler = _QueueHandler(logger.name)
+        _queue_handlers.append(handler)
+        logger.handlers = [handler]
+    _start_listener(routes)
+
+
+def stop_queue():
+    """Flush what is queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork():
+    # threads do not survive fork(): give the child (gunicorn/django-q workers) its own listener
+    if _listener is not None:
+        _start_listener(_listener.handlers[0].routes)
+
+
+def configure_logging(config):
+    """settings.LOGGING_CONFIG: dictConfig, then (LOG_QUEUE) move the handlers to the listener."""
+    logging.config.dictConfig(config)
+    if LOG_QUEUE:
+        start_queue()
+
+
+atexit.register(stop_queue)
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+# django-q: a task logs under the correlation id of whatever queued it
+_task_tokens = {}
+
+
+def _stamp_task(sender, task, **kwargs):
+    task.setdefault("correlation_id", _correlation_id.get() or task.get("id"))
+
+
+def _enter_task(sender, task, **kwargs):
+    _task_tokens[task.get("id")] = set_correlation_id(task.get("correlation_id") or task.get("id"))
+
+
+def _exit_task(sender, task, **kwargs):
+    token = _task_tokens.pop(task.get("id"), None)
+    if token is not None:
+        reset_correlation_id(token)
+
+
+def connect_task_signals():
+    from django_q.signals import post_execute_in_worker, pre_enqueue, pre_execute
+
+    pre_enqueue.connect(_stamp_task, dispatch_uid="bakgomong.logging.stamp_task")
+    pre_execute.connect(_enter_task, dispatch_uid="bakgomong.logging.enter_task")
+    post_execute_in_worker.connect(_exit_task, dispatch_uid="bakgomong.logging.exit_task")
@@ -0,0 +1,36 @@
+"""
+Simple operational counters, readable by staff at dashboard:metrics.
+
+Counters are kept in the default cache (bakgomong.cache.incr), so processes that share a
+cache backend add to the same numbers; with the local-memory cache they are per process.
+"""
+import logging
+
+from django.core.cache import cache
+
+from bakgomong.cache import incr as cache_incr
+
+logger = logging.getLogger("accounts")
+
+KEY_PREFIX = "metrics:"
+
+COUNTERS = [
+    "login_throttle.failures",
+    "login_throttle.blocked_ip",
+    "login_throttle.blocked_username",
+    "db.connections_opened",
+]
+
+
+def incr(name, amount=1):
+    key = KEY_PREFIX + name
+    try:
+        cache_incr(key, amount)
+    except Exception as e:
+        # metrics must never break the request that is being counted
+        logger.warning("Could not increment metric %s: %s", name, e)
+
+
+def snapshot():
+    values = cache.get_many([KEY_PREFIX + name for name in COUNTERS])
+    return {name: values.get(KEY_PREFIX + name, 0) for name in COUNTERS}
@@ -0,0 +1,252 @@
+"""
+Response compression: Brotli, then gzip, then identity, by the client's Accept-Encoding.
+
+Streaming responses are compressed chunk by chunk and flushed after each chunk, so they
+keep streaming. Tunable with settings.COMPRESSION (see DEFAULTS).
+
+HTML responses that may carry the CSRF token are only gzipped, with a random-length file name in
+the gzip header (as Django's GZipMiddleware does), so their compressed length does not
+reveal the token (BREACH). Brotli has no such padding and streams are not padded, so
+those are sent uncompressed.
+
+CorrelationIdMiddleware gives every request the correlation id its log lines carry.
+ReplicaStickinessMiddleware keeps clients that just wrote on the primary database
+(bakgomong.db_router).
+"""
+import gzip
+import re
+import secrets
+import uuid
+import zlib
+
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import get_random_string
+from django.utils.deprecation import MiddlewareMixin
+
+from bakgomong import db_router
+from bakgomong.logging import reset_correlation_id, set_correlation_id
+
+DEFAULTS = {
+    "BROTLI_QUALITY": 5,
+    "GZIP_LEVEL": 6,
+    "MIN_SIZE": 512,
+    # up to this many random bytes pad the gzip header of responses carrying the CSRF token
+    "MAX_RANDOM_BYTES": 100,
+    "CONTENT_TYPES": (
+        "text/html",
+        "text/plain",
+        "text/css",
+        "text/csv",
+        "text/javascript",
+        "application/javascript",
+        "application/json",
+        "application/xml",
+        "image/svg+xml",
+    ),
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "COMPRESSION", {})}
+
+
+def accepted_encodings(header):
+    """{content-coding: q} from an Accept-Encoding header; q=0 means "not acceptable"."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header, codings=("br", "gzip")):
+    """The client's preferred coding of `codings` (ties in that order), or None."""
+    accepted = accepted_encodings(header)
+    best, best_q = None, 0
+    for coding in codings:
+        # an explicit q (even q=0) overrides "*"
+        q = accepted.get(coding, accepted.get("*", 0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data, encoding, config):
+    if encoding == "br":
+        return brotli.compress(data, quality=config["BROTLI_QUALITY"], mode=brotli.MODE_TEXT)
+    return gzip.compress(data, compresslevel=config["GZIP_LEVEL"], mtime=0)
+
+
+def compress_padded(data, config):
+    """gzip with a random-length FNAME field in the header (Heal The Breach)."""
+    compressed = gzip.compress(data, compresslevel=config["GZIP_LEVEL"], mtime=0)
+    header = bytearray(compressed[:10])
+    header[3] |= gzip.FNAME
+    filename = get_random_string(secrets.randbelow(config["MAX_RANDOM_BYTES"]) + 1).encode() + b"\x00"
+    return bytes(header) + filename + compressed[10:]
+
+
+class StreamCompressor:
+    def __init__(self, encoding, config):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=config["BROTLI_QUALITY"], mode=brotli.MODE_TEXT)
+            self._process, self._flush, self._finish = (
+                self._compressor.process, self._compressor.flush, self._compressor.finish,
+            )
+        else:
+            # wbits 31: gzip container
+            self._compressor = zlib.compressobj(config["GZIP_LEVEL"], zlib.DEFLATED, 31)
+            self._process = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def chunk(self, data):
+        return self._process(data) + self._flush()
+
+    def finish(self):
+        return self._finish()
+
+
+def compress_stream(chunks, encoding, config):
+    compressor = StreamCompressor(encoding, config)
+    for data in chunks:
+        out = compressor.chunk(data)
+        if out:
+            yield out
+    yield compressor.finish()
+
+
+async def compress_stream_async(chunks, encoding, config):
+    compressor = StreamCompressor(encoding, config)
+    async for data in chunks:
+        out = compressor.chunk(data)
+        if out:
+            yield out
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress HTML, JSON and other text responses. Skips small bodies, responses that
+    already carry a Content-Encoding (e.g. precompressed asset bundles) and other types.
+    """
+
+    def process_response(self, request, response):
+        config = get_config()
+        if response.has_header("Content-Encoding") or request.method == "HEAD":
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in config["CONTENT_TYPES"]:
+            return response
+        if not response.streaming and len(response.content) < config["MIN_SIZE"]:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        # CsrfViewMiddleware (or get_token()) put a CSRF secret on the request: the page may
+        # contain the token
+        secret = content_type == "text/html" and "CSRF_COOKIE" in request.META
+        if secret and response.streaming:
+            return response
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), ("gzip",) if secret else ("br", "gzip"))
+        if encoding is None:
+            return response
+
+        if secret:
+            compressed = compress_padded(response.content, config)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+        elif response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_stream_async(response.streaming_content, encoding, config)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding, config)
+            del response["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding, config)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # the body differs from the uncompressed representation: a strong ETag no longer holds
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+
+CORRELATION_HEADER = "X-Request-ID"
+# ids from a proxy or client are only trusted when they look like ids
+VALID_CORRELATION_ID = re.compile(r"^[A-Za-z0-9._-]{8,64}$")
+
+
+class CorrelationIdMiddleware(MiddlewareMixin):
+    """
+    Use the incoming X-Request-ID (e.g. set by the proxy) or a new id as the correlation id
+    for the request's log lines and for the tasks it queues; echoed in the response.
+    """
+
+    def process_request(self, request):
+        incoming = request.headers.get(CORRELATION_HEADER, "")
+        request.correlation_id = incoming if VALID_CORRELATION_ID.match(incoming) else uuid.uuid4().hex
+        request._correlation_token = set_correlation_id(request.correlation_id)
+
+    def process_response(self, request, response):
+        correlation_id = getattr(request, "correlation_id", None)
+        if correlation_id:
+            response[CORRELATION_HEADER] = correlation_id
+        token = getattr(request, "_correlation_token", None)
+        if token is not None:
+            try:
+                reset_correlation_id(token)
+            except ValueError:
+                # set in a different context (async): the next request sets its own
+                pass
+        return response
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """
+    Give each request its database routing state. A request that wrote sets a short-lived
+    cookie; while it is present the client's reads stay on the primary.
+    """
+
+    def process_request(self, request):
+        config = db_router.get_config()
+        state = db_router.RoutingState(sticky=config["COOKIE"] in request.COOKIES)
+        request._routing_state = state
+        request._routing_token = db_router.set_routing_state(state)
+
+    def process_response(self, request, response):
+        state = getattr(request, "_routing_state", None)
+        if state is not None and state.wrote and db_router.replica_alias():
+            config = db_router.get_config()
+            response.set_cookie(
+                config["COOKIE"],
+                "1",
+                max_age=config["STICKY_SECONDS"],
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        token = getattr(request, "_routing_token", None)
+        if token is not None:
+            try:
+                db_router.reset_routing_state(token)
+            except ValueError:
+                pass
+        return response
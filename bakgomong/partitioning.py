@@ -0,0 +1,316 @@
+"""
+Optional yearly range partitioning of the contribution ledger on PostgreSQL:
+MemberContribution by due_date and Payment by payment_date (see PARTITIONED). Both keys
+are NOT NULL.
+
+convert() swaps a table for a partitioned one with a partition per year that has rows, plus
+a DEFAULT partition (anything outside the yearly ranges), and copies the rows across.
+PostgreSQL only enforces unique indexes of a partitioned table that include the partition
+key, and a foreign key can only reference such an index. So each partitioned table gets a
+plain "keys" table (`<table>_keys`), kept in step by a trigger, with one row per ledger row:
+
+- its id (the primary key), the partition key, and the columns of every unique index that
+  does not contain the partition key (reference, checkout_id, gateway_transaction_id), which
+  stay unique across all years there;
+- foreign keys *to* the ledger table (Payment.member_contribution, BankStatementLine.*)
+  reference the keys table's id instead;
+- the ledger table's primary key becomes (id, key); its other unique indexes are unique
+  as before when they contain the key, else plain indexes for lookups.
+
+Enable it with PARTITIONED_TABLES = True before migrating (migration 0014 converts), or
+convert an existing database with `manage.py partition_tables --convert`. Future years
+are created ahead of time by the same command, run monthly from bakgomong.schedules, so
+rows never land in the DEFAULT partition (which would block creating their year).
+
+Queries that filter on the partition key (MemberContribution.objects.due_between(),
+Payment.objects.paid_between(), ...) only scan the years they need. Lookups of one row by
+id or another unique column go through PartitionedQuerySet.find(), which reads the row's
+key from the keys table first, so PostgreSQL opens a single partition instead of probing
+the index of each. Schema changes to the unique columns or the foreign keys pointing at a
+partitioned table need the keys table and its trigger updated by hand.
+"""
+import datetime
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.apps import apps as global_apps
+from django.db import connections, models, transaction
+from django.db.backends.utils import truncate_name
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+logger = logging.getLogger("tasks")
+
+# model label: partition key column
+PARTITIONED = {
+    "contributions.MemberContribution": "due_date",
+    "contributions.Payment": "payment_date",
+}
+YEARS_AHEAD = 2
+
+INDEX_DEF_RE = re.compile(r"^CREATE (UNIQUE )?INDEX (\S+) ON (\S+) USING (\w+) \((.*)\)$")
+REFERENCES_RE = re.compile(r"REFERENCES \S+?\(")
+
+# (alias, table): whether the table has a keys table, looked up once per process
+_keyed_tables = {}
+
+
+def partition_name(table, year):
+    return f"{table}_y{year}"
+
+
+def keys_table_name(table):
+    return f"{table}_keys"
+
+
+def year_bounds(year):
+    return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+
+
+def _models(apps=None):
+    apps = apps or global_apps
+    return [(apps.get_model(label), column) for label, column in PARTITIONED.items()]
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+        return cursor.fetchone() is not None
+
+
+def partition_years(connection, table):
+    """Years that have a partition, from the partition names."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f"{table}_y"
+    return sorted(int(name[len(prefix):]) for name in names if name.startswith(prefix) and name[len(prefix):].isdigit())
+
+
+def create_partition(connection, table, year):
+    qn = connection.ops.quote_name
+    start, end = year_bounds(year)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(partition_name(table, year))} PARTITION OF {qn(table)} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def create_future_partitions(using="default", years_ahead=YEARS_AHEAD, apps=None):
+    """Create this year's and the next `years_ahead` partitions of each partitioned table."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return []
+    this_year = timezone.localdate().year
+    created = []
+    for model, column in _models(apps):
+        table = model._meta.db_table
+        if not is_partitioned(connection, table):
+            continue
+        existing = set(partition_years(connection, table))
+        for year in range(this_year, this_year + years_ahead + 1):
+            if year not in existing:
+                create_partition(connection, table, year)
+                created.append(partition_name(table, year))
+    if created:
+        logger.info("Created partitions %s", ", ".join(created))
+    return created
+
+
+def _index_definitions(cursor, table):
+    """[(name, is_primary, is_unique, CREATE INDEX sql)] of `table`."""
+    cursor.execute(
+        "SELECT c.relname, i.indisprimary, i.indisunique, pg_get_indexdef(i.indexrelid) "
+        "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = to_regclass(%s)",
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _index_columns(sql):
+    match = INDEX_DEF_RE.match(sql)
+    if match is None:
+        return None
+    return match.group(4), match.group(5), re.findall(r'"?(\w+)"?', match.group(5))
+
+
+def _partitioned_index(connection, table, column, name, primary, unique, sql):
+    """The statement recreating one index of the old table on the partitioned `table`."""
+    qn = connection.ops.quote_name
+    parsed = _index_columns(sql)
+    if parsed is None:
+        raise ValueError(f"cannot partition index {name}: {sql}")
+    method, columns, names = parsed
+    if primary:
+        keyed = columns if column in names else f"{columns}, {qn(column)}"
+        return f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} PRIMARY KEY ({keyed})"
+    if unique and column in names:
+        return f"CREATE UNIQUE INDEX {qn(name)} ON {qn(table)} USING {method} ({columns})"
+    # unique without the key: enforced by the keys table
+    return f"CREATE INDEX {qn(name)} ON {qn(table)} USING {method} ({columns})"
+
+
+def _keys_table_sql(connection, table, pk, column, unique_columns):
+    """Statements creating and filling `table`'s keys table and the trigger keeping it in step."""
+    qn = connection.ops.quote_name
+    keys = keys_table_name(table)
+    columns = list(dict.fromkeys([pk, column, *(c for names in unique_columns for c in names)]))
+    listed = ", ".join(qn(c) for c in columns)
+    new = ", ".join(f"NEW.{qn(c)}" for c in columns)
+    old = ", ".join(f"OLD.{qn(c)}" for c in columns)
+    assignments = ", ".join(f"{qn(c)} = NEW.{qn(c)}" for c in columns)
+    function = qn(truncate_name(f"{keys}_sync", connection.ops.max_name_length()))
+    statements = [
+        f"CREATE TABLE {qn(keys)} AS SELECT {listed} FROM {qn(table)}",
+        f"ALTER TABLE {qn(keys)} ADD PRIMARY KEY ({qn(pk)}), ALTER COLUMN {qn(column)} SET NOT NULL",
+    ]
+    for names in unique_columns:
+        name = truncate_name(f"{keys}_{'_'.join(names)}_key", connection.ops.max_name_length())
+        statements.append(f"ALTER TABLE {qn(keys)} ADD CONSTRAINT {qn(name)} UNIQUE ({', '.join(qn(c) for c in names)})")
+    # a row moving to another year's partition fires DELETE then INSERT: the foreign keys to
+    # the keys table are deferred (as Django creates them) and checked once it is back
+    statements += [
+        f"""CREATE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO {qn(keys)} ({listed}) VALUES ({new});
+            ELSIF TG_OP = 'DELETE' THEN
+                DELETE FROM {qn(keys)} WHERE {qn(pk)} = OLD.{qn(pk)};
+            ELSIF ({new}) IS DISTINCT FROM ({old}) THEN
+                UPDATE {qn(keys)} SET {assignments} WHERE {qn(pk)} = OLD.{qn(pk)};
+            END IF;
+            RETURN NULL;
+        END $$""",
+        f"CREATE TRIGGER {function} AFTER INSERT OR DELETE OR UPDATE OF {listed} ON {qn(table)} "
+        f"FOR EACH ROW EXECUTE FUNCTION {function}()",
+    ]
+    return statements
+
+
+def convert(model, column, using="default"):
+    """Replace `model`'s table with one range-partitioned by year on `column`. Returns the years."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor != "postgresql" or is_partitioned(connection, table):
+        return []
+    if model._meta.get_field(column).null:
+        raise ValueError(f"{table}.{column} keys the partitions and must be NOT NULL")
+    qn = connection.ops.quote_name
+    legacy = f"{table}_unpartitioned"
+    keys = keys_table_name(table)
+    pk = model._meta.pk.column
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+        indexes = _index_definitions(cursor, table)
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        outgoing = cursor.fetchall()
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE confrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        incoming = cursor.fetchall()
+        cursor.execute(f"SELECT DISTINCT EXTRACT(YEAR FROM {qn(column)})::int FROM {qn(table)}")
+        years = sorted({row[0] for row in cursor.fetchall()} | {timezone.localdate().year})
+        unique_columns = []
+        for name, primary, unique, sql in indexes:
+            parsed = _index_columns(sql)
+            if unique and not primary and parsed and column not in parsed[2]:
+                unique_columns.append(parsed[2])
+
+        for referencing, name, _ in incoming:
+            cursor.execute(f"ALTER TABLE {referencing} DROP CONSTRAINT {qn(name)}")
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({qn(column)})"
+        )
+        for year in years:
+            create_partition(connection, table, year)
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+        # the legacy table's index and constraint names are reused
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+        for name, primary, unique, sql in indexes:
+            cursor.execute(_partitioned_index(connection, table, column, name, primary, unique, sql))
+        for name, definition in outgoing:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+        for statement in _keys_table_sql(connection, table, pk, column, unique_columns):
+            cursor.execute(statement)
+        for referencing, name, definition in incoming:
+            definition = REFERENCES_RE.sub(f"REFERENCES {qn(keys)}(", definition, count=1)
+            cursor.execute(f"ALTER TABLE {referencing} ADD CONSTRAINT {qn(name)} {definition}")
+
+    _keyed_tables.pop((using, table), None)
+    logger.info("Partitioned %s by %s: %s", table, column, ", ".join(map(str, years)))
+    return years
+
+
+def convert_all(using="default", apps=None):
+    """convert() every PARTITIONED table. Returns {table: years} for the ones converted."""
+    converted = {}
+    for model, column in _models(apps):
+        years = convert(model, column, using=using)
+        if years:
+            converted[model._meta.db_table] = years
+    create_future_partitions(using=using, apps=apps)
+    return converted
+
+
+def has_keys_table(connection, table):
+    key = (connection.alias, table)
+    if key not in _keyed_tables:
+        if connection.vendor != "postgresql":
+            _keyed_tables[key] = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [keys_table_name(table)])
+                _keyed_tables[key] = cursor.fetchone()[0]
+    return _keyed_tables[key]
+
+
+class PartitionedQuerySet(models.QuerySet):
+    """QuerySet of a model in PARTITIONED."""
+
+    def find(self, **lookups):
+        """
+        filter(**lookups) for one row by its id or another unique column. When the table is
+        partitioned the row's partition key is read from the keys table first (an InitPlan),
+        so PostgreSQL prunes every other partition at run time.
+        """
+        queryset = self.filter(**lookups)
+        connection = connections[self.db]
+        opts = self.model._meta
+        partition_key = PARTITIONED.get(opts.label)
+        if partition_key is None or not has_keys_table(connection, opts.db_table):
+            return queryset
+        qn = connection.ops.quote_name
+        key_field = opts.get_field(partition_key)
+        for name, value in lookups.items():
+            name = name.removesuffix("__exact")
+            if "__" in name:
+                continue
+            field = opts.pk if name == "pk" else opts.get_field(name)
+            if not field.unique:
+                continue
+            key = RawSQL(
+                f"SELECT {qn(key_field.column)} FROM {qn(keys_table_name(opts.db_table))} WHERE {qn(field.column)} = %s",
+                [field.get_db_prep_value(value, connection)],
+                output_field=key_field,
+            )
+            return queryset.filter(**{partition_key: key})
+        return queryset
+
+    async def afind(self, **lookups):
+        # find() looks the keys table up once per process: off the event loop
+        return await sync_to_async(self.find)(**lookups)
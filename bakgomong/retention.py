@@ -0,0 +1,207 @@
+"""
+Retention for task history: django-q's Task (success/failure) table and Celery's
+TaskResult table grow by a row per task, and the notification fan-outs queue thousands a
+day.
+
+prune() deletes rows older than the retention period in primary-key batches, each in its
+own short transaction, so locks are held for one batch at a time. Failures are kept longer
+than successes. With ARCHIVE on, each batch is first stored as a gzipped JSON-lines part
+(archives/tasks/<model>-<time>-<n>.jsonl.gz) in private storage (bakgomong.storage): the
+rows hold task arguments and results. The part is stored inside the batch's transaction,
+so when storing fails the batch is not deleted. Tunable with settings.TASK_RETENTION (see
+DEFAULTS).
+"""
+import datetime
+import gzip
+import json
+import logging
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from bakgomong.storage import get_private_storage
+
+logger = logging.getLogger("tasks")
+
+DEFAULTS = {
+    "SUCCESS_DAYS": 14,
+    "FAILURE_DAYS": 90,
+    "BATCH_SIZE": 1000,
+    # seconds between batches, lets other writers in
+    "PAUSE": 0.05,
+    "ARCHIVE": False,
+}
+
+# model label: (completion time field, failed rows)
+SOURCES = {
+    "django_q.Task": ("stopped", Q(success=False)),
+    "django_celery_results.TaskResult": ("date_done", Q(status__in=["FAILURE", "REVOKED"])),
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "TASK_RETENTION", {})}
+
+
+@dataclass
+class TableReport:
+    label: str
+    table: str
+    successes: int = 0
+    failures: int = 0
+    rows_before: int = 0
+    bytes_before: int = None
+    bytes_after: int = None
+    archives: list = field(default_factory=list)
+
+    @property
+    def deleted(self):
+        return self.successes + self.failures
+
+    @property
+    def reclaimable(self):
+        # DELETE leaves dead tuples that VACUUM makes reusable: estimate by average row size
+        if not self.bytes_before or not self.rows_before:
+            return None
+        return int(self.bytes_before / self.rows_before * self.deleted)
+
+    def summary(self):
+        line = f"{self.label}: deleted {self.successes} successes, {self.failures} failures"
+        if self.bytes_before is not None:
+            line += f"; table {self.bytes_before / 1e6:.1f} MB -> {self.bytes_after / 1e6:.1f} MB"
+            if self.reclaimable:
+                line += f", ~{self.reclaimable / 1e6:.1f} MB reusable after vacuum"
+        if self.archives:
+            line += f"; archived to {self.archives[0]} .. {self.archives[-1]} ({len(self.archives)} files)"
+        return line
+
+
+@dataclass
+class RetentionReport:
+    dry_run: bool = False
+    tables: list = field(default_factory=list)
+
+    def summary(self):
+        prefix = "[dry run] " if self.dry_run else ""
+        return "\n".join(prefix + table.summary() for table in self.tables)
+
+
+def table_stats(table):
+    """(total bytes incl. indexes and TOAST, estimated rows) on PostgreSQL, else (None, None)."""
+    if connection.vendor != "postgresql":
+        return None, None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_total_relation_size(%s::regclass), GREATEST(reltuples, 0)::bigint "
+            "FROM pg_class WHERE oid = %s::regclass",
+            [table, table],
+        )
+        return cursor.fetchone()
+
+
+class _ArchiveEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            # unpickled task args/results can be anything
+            return repr(o)
+
+
+class _Archive:
+    """Stores batches of rows as the numbered parts of one archive in private storage."""
+
+    def __init__(self, label):
+        self.prefix = f"archives/tasks/{label}-{timezone.now():%Y%m%d-%H%M%S}"
+        self.parts = []
+
+    def write(self, rows):
+        """Store `rows` as the next part; returns its name (None without rows)."""
+        count = 0
+        with tempfile.TemporaryFile() as tmp:
+            with gzip.GzipFile(fileobj=tmp, mode="wb") as gz:
+                for row in rows:
+                    gz.write(json.dumps(row, cls=_ArchiveEncoder).encode("utf-8") + b"\n")
+                    count += 1
+            if not count:
+                return None
+            tmp.seek(0)
+            name = get_private_storage().save(f"{self.prefix}-{len(self.parts) + 1:05d}.jsonl.gz", File(tmp))
+        self.parts.append(name)
+        return name
+
+
+def delete_in_batches(queryset, batch_size, pause=0, archive=None):
+    """Delete `queryset` batch_size primary keys at a time. Returns the number deleted."""
+    model = queryset.model
+    deleted = 0
+    last_pk = None
+    while True:
+        batch = queryset.order_by("pk")
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        last_pk = pks[-1]
+        with transaction.atomic():
+            if archive is not None:
+                # stored before the delete commits: a storage error rolls the batch back
+                archive.write(model._default_manager.filter(pk__in=pks).values())
+            model._default_manager.filter(pk__in=pks)._raw_delete(model._default_manager.db)
+        deleted += len(pks)
+        if pause:
+            time.sleep(pause)
+
+
+def prune(dry_run=False, archive=None, now=None):
+    """Apply the retention policy to every SOURCES table that is installed."""
+    config = get_config()
+    archive = config["ARCHIVE"] if archive is None else archive
+    now = now or timezone.now()
+    success_cutoff = now - datetime.timedelta(days=config["SUCCESS_DAYS"])
+    failure_cutoff = now - datetime.timedelta(days=config["FAILURE_DAYS"])
+    report = RetentionReport(dry_run=dry_run)
+
+    for label, (time_field, failed) in SOURCES.items():
+        try:
+            model = apps.get_model(label)
+        except LookupError:
+            continue
+        table = model._meta.db_table
+        stats = TableReport(label=label, table=table)
+        stats.bytes_before, estimated_rows = table_stats(table)
+        stats.rows_before = estimated_rows if estimated_rows else model._default_manager.count()
+
+        old_successes = model._default_manager.filter(**{f"{time_field}__lt": success_cutoff}).exclude(failed)
+        old_failures = model._default_manager.filter(failed, **{f"{time_field}__lt": failure_cutoff})
+        if dry_run:
+            stats.successes, stats.failures = old_successes.count(), old_failures.count()
+        else:
+            writer = _Archive(model._meta.model_name) if archive else None
+            stats.successes = delete_in_batches(old_successes, config["BATCH_SIZE"], config["PAUSE"], writer)
+            stats.failures = delete_in_batches(old_failures, config["BATCH_SIZE"], config["PAUSE"], writer)
+            if writer is not None:
+                stats.archives = writer.parts
+        stats.bytes_after, _ = table_stats(table)
+        report.tables.append(stats)
+        logger.info("Task retention %s", stats.summary())
+    return report
+
+
+def vacuum(report):
+    """VACUUM (ANALYZE) the pruned tables on PostgreSQL so the space is reused promptly."""
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for table in report.tables:
+            if table.deleted:
+                cursor.execute(f"VACUUM (ANALYZE) {connection.ops.quote_name(table.table)}")
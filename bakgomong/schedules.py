@@ -0,0 +1,74 @@
+"""
+Recurring django-q tasks. `manage.py sync_schedules` creates or updates one
+django_q Schedule per entry (matched by name), so the list here is the source of truth.
+
+"at" is the local time of the first run; django-q then repeats it every schedule_type.
+"""
+import datetime
+
+from django.utils import timezone
+from django_q.models import Schedule
+
+SCHEDULES = [
+    {
+        "name": "generate-recurring-periods",
+        "func": "contributions.tasks.generate_recurring_periods_task",
+        "schedule_type": Schedule.DAILY,
+        "at": datetime.time(1, 15),
+    },
+    {
+        "name": "rebuild-arrears-aging",
+        "func": "contributions.tasks.refresh_arrears_aging_task",
+        "kwargs": "{'full': True}",
+        "schedule_type": Schedule.DAILY,
+        "at": datetime.time(0, 30),
+    },
+    {
+        "name": "refresh-arrears-aging",
+        "func": "contributions.tasks.refresh_arrears_aging_task",
+        "schedule_type": Schedule.HOURLY,
+        "at": datetime.time(0, 45),
+    },
+    {
+        # webhook events are processed as they arrive; this retries failed ones
+        "name": "retry-webhook-events",
+        "func": "contributions.tasks.process_webhook_events_task",
+        "kwargs": "{'retry_failed': True}",
+        "schedule_type": Schedule.MINUTES,
+        "minutes": 10,
+        "at": datetime.time(0, 5),
+    },
+    {
+        "name": "prune-task-history",
+        "func": "dashboard.tasks.prune_task_history_task",
+        "schedule_type": Schedule.DAILY,
+        "at": datetime.time(3, 30),
+    },
+    {
+        # no-op unless the ledger tables are partitioned (bakgomong.partitioning)
+        "name": "create-partitions",
+        "func": "dashboard.tasks.create_partitions_task",
+        "schedule_type": Schedule.MONTHLY,
+        "at": datetime.time(3, 45),
+    },
+]
+
+
+def next_run_at(at):
+    now = timezone.localtime()
+    run = now.replace(hour=at.hour, minute=at.minute, second=0, microsecond=0)
+    return run if run > now else run + datetime.timedelta(days=1)
+
+
+def sync_schedules():
+    """Create or update the SCHEDULES entries. Returns (created, updated) names."""
+    created, updated = [], []
+    for entry in SCHEDULES:
+        defaults = {key: value for key, value in entry.items() if key not in ("name", "at")}
+        schedule, was_created = Schedule.objects.update_or_create(
+            name=entry["name"],
+            defaults=defaults,
+            create_defaults={**defaults, "next_run": next_run_at(entry["at"])},
+        )
+        (created if was_created else updated).append(schedule.name)
+    return created, updated
@@ -0,0 +1,205 @@
+"""
+Search over members, families, clan documents and meetings.
+
+On PostgreSQL each searched model has a `search_vector` tsvector column, filled by a
+trigger (see SEARCH_VECTORS and the migrations that call search_trigger_sql()), so bulk
+imports and QuerySet.update() keep it current too. The column has a GIN index, and the
+name columns in TRIGRAM_COLUMNS have pg_trgm GIN indexes for fuzzy matching ("Dlamni"
+finds "Dlamini"). match_q() uses both and is shared by the search endpoint and the admin
+changelists (IndexedSearchAdminMixin). On other databases it falls back to icontains.
+
+`weights` ("A", "AB", ...; "" for all) limits a search to the columns of those weights in
+SEARCH_VECTORS, through tsquery weight labels ("dlam:*A"). The members' search endpoint
+uses it to keep email and phone (weight B of accounts_account) to staff and executives;
+the admin changelists search every column.
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Greatest
+
+SEARCH_CONFIG = "simple"
+
+# table: {weight: source columns}
+SEARCH_VECTORS = {
+    "accounts_account": {"A": ["first_name", "last_name", "maiden_name", "username"], "B": ["email", "phone"]},
+    "accounts_family": {"A": ["name"]},
+    "dashboard_clandocument": {"A": ["title"], "B": ["description"]},
+    "dashboard_meeting": {"A": ["title"], "B": ["description"]},
+}
+# table: columns with a gin_trgm_ops index
+TRIGRAM_COLUMNS = {
+    "accounts_account": ["first_name", "last_name"],
+    "accounts_family": ["name"],
+    "dashboard_clandocument": ["title"],
+    "dashboard_meeting": ["title"],
+}
+
+TOKEN_RE = re.compile(r"[\w@.+-]+")
+# characters with a meaning in to_tsquery() input
+TSQUERY_SPECIAL = re.compile(r"[&|!():*<>'\\]")
+
+
+def enabled():
+    return connection.vendor == "postgresql"
+
+
+def prefix_query(term, weights=""):
+    """to_tsquery() input matching every word of `term` as a prefix (in columns of `weights`), or None."""
+    words = [TSQUERY_SPECIAL.sub("", word).strip(".-+") for word in TOKEN_RE.findall(term)]
+    words = [word for word in words if word]
+    if not words:
+        return None
+    return " & ".join(f"{word}:*{weights}" for word in words)
+
+
+def _columns(model, weights=""):
+    return [
+        column
+        for weight, columns in SEARCH_VECTORS[model._meta.db_table].items()
+        if not weights or weight in weights
+        for column in columns
+    ]
+
+
+def _trigram_columns(model, weights=""):
+    columns = _columns(model, weights)
+    return [column for column in TRIGRAM_COLUMNS.get(model._meta.db_table, []) if column in columns]
+
+
+def match_q(model, term, prefix="", weights=""):
+    """
+    Q matching `term` on `model` (or, with `prefix` like "account__", on the related model
+    `model` through that path). Full-text prefix match on search_vector, or a trigram match
+    on a name column. `weights` limits the match to the columns of those weights.
+    """
+    term = term.strip()
+    if not enabled():
+        q = Q()
+        for column in _columns(model, weights):
+            q |= Q(**{f"{prefix}{column}__icontains": term})
+        return q
+
+    from django.contrib.postgres.search import SearchQuery
+
+    q = Q()
+    query = prefix_query(term, weights)
+    if query:
+        q |= Q(**{f"{prefix}search_vector": SearchQuery(query, search_type="raw", config=SEARCH_CONFIG)})
+    for column in _trigram_columns(model, weights):
+        q |= Q(**{f"{prefix}{column}__trigram_similar": term})
+    return q
+
+
+def search(queryset, term, limit=10, weights=""):
+    """The best `limit` matches for `term` in `queryset` (in columns of `weights`), best first."""
+    term = term.strip()
+    if not term:
+        return []
+    model = queryset.model
+    queryset = queryset.filter(match_q(model, term, weights=weights))
+    if not enabled():
+        return list(queryset[:limit])
+
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+    scores = [TrigramSimilarity(column, term) for column in _trigram_columns(model, weights)]
+    query = prefix_query(term, weights)
+    if query:
+        scores.append(SearchRank(F("search_vector"), SearchQuery(query, search_type="raw", config=SEARCH_CONFIG)))
+    if not scores:
+        scores.append(Value(0.0))
+    score = Greatest(*scores, output_field=FloatField()) if len(scores) > 1 else scores[0]
+    return list(queryset.annotate(search_score=score).order_by(F("search_score").desc(nulls_last=True))[:limit])
+
+
+def _weighted(weight, columns, row="NEW."):
+    values = ", ".join(f"{row}{column}" for column in columns)
+    return f"setweight(to_tsvector('{SEARCH_CONFIG}', concat_ws(' ', {values})), '{weight}')"
+
+
+def search_trigger_sql(table):
+    """Statements creating `table`'s search_vector trigger and indexes, and filling the column."""
+    vectors = SEARCH_VECTORS[table]
+    columns = [column for cols in vectors.values() for column in cols]
+    expression = " || ".join(_weighted(weight, cols) for weight, cols in vectors.items())
+    statements = [
+        f"""
+        CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := {expression};
+            RETURN NEW;
+        END
+        $$
+        """,
+        f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}",
+        f"CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {', '.join(columns)} "
+        f"ON {table} FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()",
+        # fires the trigger for every existing row
+        f"UPDATE {table} SET {columns[0]} = {columns[0]}",
+        f"CREATE INDEX IF NOT EXISTS {table}_search_vector_idx ON {table} USING gin (search_vector)",
+    ]
+    for column in TRIGRAM_COLUMNS.get(table, []):
+        statements.append(f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm_idx ON {table} USING gin ({column} gin_trgm_ops)")
+    return statements
+
+
+def drop_search_trigger_sql(table):
+    statements = [
+        f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}",
+        f"DROP FUNCTION IF EXISTS {table}_search_vector()",
+        f"DROP INDEX IF EXISTS {table}_search_vector_idx",
+    ]
+    for column in TRIGRAM_COLUMNS.get(table, []):
+        statements.append(f"DROP INDEX IF EXISTS {table}_{column}_trgm_idx")
+    return statements
+
+
+def search_triggers(*tables):
+    """RunPython (forwards, backwards) functions for the tables' triggers and indexes (PostgreSQL only)."""
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            for table in tables:
+                for statement in search_trigger_sql(table):
+                    schema_editor.execute(statement)
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            for table in tables:
+                for statement in drop_search_trigger_sql(table):
+                    schema_editor.execute(statement)
+
+    return forwards, backwards
+
+
+class IndexedSearchAdminMixin:
+    """
+    Admin changelist search through match_q() on PostgreSQL, instead of icontains scans over
+    the name columns. indexed_search_relation: "" for the model itself, or the path to a
+    searchable model ("account__"). indexed_search_fields: admin search_fields still
+    searched the usual way (references, ids).
+    """
+    indexed_search_relation = ""
+    indexed_search_fields = ()
+
+    def get_search_fields(self, request):
+        if getattr(request, "_indexed_search", False):
+            return self.indexed_search_fields
+        return super().get_search_fields(request)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not enabled():
+            return super().get_search_results(request, queryset, search_term)
+        model = queryset.model
+        if self.indexed_search_relation:
+            model = model._meta.get_field(self.indexed_search_relation.rstrip("_")).related_model
+        matched = queryset.filter(match_q(model, search_term, prefix=self.indexed_search_relation))
+        if not self.indexed_search_fields:
+            return matched, False
+        request._indexed_search = True
+        try:
+            others, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        finally:
+            request._indexed_search = False
+        return others | matched, may_have_duplicates
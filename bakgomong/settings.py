@@ -1,6 +1,8 @@
 import os, re
 from pathlib import Path
 from bakgomong.logging import LOGGING
+from bakgomong.cache import cache_settings
+from bakgomong.db_pool import connection_settings, process_role
 from decouple import config, Csv
 from celery.schedules import crontab
 
@@ -17,6 +19,9 @@ SECRET_KEY = config('SECRET', 'django-insecure-^9#-e&z484&v&)(iime^im_3(q#%tzpao
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=False, cast=bool)
 
+# dictConfig plus the background QueueListener (bakgomong/logging.py)
+LOGGING_CONFIG = 'bakgomong.logging.configure_logging'
+
 
 
 # Application definition
@@ -30,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     'accounts.apps.AccountsConfig',
     'dashboard.apps.DashboardConfig',
@@ -40,7 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bakgomong.middleware.CorrelationIdMiddleware',
+    'bakgomong.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'bakgomong.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +71,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.member_shell',
             ],
         },
     },
@@ -84,6 +94,35 @@ DATABASES = {
         }
     }
 
+# Pooled connections with psycopg 3 + psycopg_pool, else persistent ones (bakgomong/db_pool.py);
+# sized per process: gunicorn workers ("web"), uvicorn workers ("asgi") or qcluster ("worker")
+DATABASES["default"] = connection_settings(
+    DATABASES["default"],
+    pool=config("DB_POOL", default=True, cast=bool),
+    role=process_role(),
+    sizes={
+        "web": (config("DB_POOL_WEB_MIN", default=2, cast=int), config("DB_POOL_WEB_MAX", default=8, cast=int)),
+        "worker": (config("DB_POOL_WORKER_MIN", default=1, cast=int), config("DB_POOL_WORKER_MAX", default=2, cast=int)),
+        "asgi": (config("DB_POOL_ASGI_MIN", default=4, cast=int), config("DB_POOL_ASGI_MAX", default=16, cast=int)),
+    },
+    timeout=config("DB_POOL_TIMEOUT", default=10, cast=int),
+)
+
+# Read replica for dashboards, reports and list pages (bakgomong/db_router.py)
+if config("DB_REPLICA_HOST", default=""):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": config("DB_REPLICA_HOST"),
+        "PORT": config("DB_REPLICA_PORT", default="5432"),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["bakgomong.db_router.ReplicaRouter"]
+DATABASE_REPLICA = {
+    "ALIAS": "replica",
+    "STICKY_SECONDS": config("DB_REPLICA_STICKY_SECONDS", default=10, cast=int),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -150,6 +189,33 @@ else:
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# member documents (PDFs, bank statements, member imports); never served directly, see bakgomong.storage
+PRIVATE_MEDIA_ROOT = config("PRIVATE_MEDIA_ROOT", default=str(BASE_DIR / 'private'))
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "private": {"BACKEND": "bakgomong.storage.PrivateStorage"},
+}
+
+# Response compression (bakgomong.middleware.CompressionMiddleware)
+COMPRESSION = {
+    "BROTLI_QUALITY": config("COMPRESSION_BROTLI_QUALITY", default=5, cast=int),
+    "GZIP_LEVEL": config("COMPRESSION_GZIP_LEVEL", default=6, cast=int),
+    "MIN_SIZE": 512,
+}
+
+# Bundled static assets (manage.py build_assets, dashboard.assets)
+ASSETS_URL = '/assets/'
+ASSETS_ROOT = BASE_DIR / 'assets'
+
+# Cache: file (shared on one host) or redis (shared by every host). locmem is per process,
+# so bakgomong.cache does not cache with it (a write would not invalidate other workers)
+CACHES = cache_settings(
+    BASE_DIR,
+    backend=config("CACHE_BACKEND", default="file"),
+    location=config("CACHE_LOCATION", default=None),
+)
 
 # Celery
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
@@ -231,6 +297,16 @@ ADMINS = [
 ]
 MANAGERS = [('admin@bakgomong.co.za'), ('support@bakgomong.co.za'), ('gumedethomas12@gmail.com') ]
 
+# Login throttling (accounts.utils.throttle)
+LOGIN_THROTTLE = {
+    "STORE": config("LOGIN_THROTTLE_STORE", default="auto"),
+    "WINDOW": 300,
+    "IP_LIMIT": 30,
+    "USERNAME_LIMIT": 8,
+    # production sits behind a reverse proxy (see SECURE_PROXY_SSL_HEADER)
+    "IP_HEADER": "REMOTE_ADDR" if DEBUG else "HTTP_X_FORWARDED_FOR",
+}
+
 # Email
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -255,17 +331,41 @@ INSTALLED_APPS += [
     "django_q",
 ]
 
-# Example: ORM broker (no external service)
+# Task queue: the database is the broker (no external service)
 Q_CLUSTER = {
     "name": "bakgomong",
     "workers": 4,
     "recycle": 500,
     "timeout": 60,
     "retry": 120,
+    # a task that failed or timed out is not run again (the default retries it every `retry`
+    # seconds for ever); one whose worker died without a result still is
+    "max_attempts": 1,
     "queue_limit": 50,
     "bulk": 10,
     "orm": "default",
+    # seconds an idle PostgresBroker waits for a NOTIFY before polling again
+    "listen_timeout": 5,
 }
+# "postgres": claim with SKIP LOCKED and wake on LISTEN/NOTIFY (bakgomong/broker.py); "orm": poll
+if config("Q_BROKER", default="postgres") == "postgres":
+    Q_CLUSTER["broker_class"] = "bakgomong.broker.PostgresBroker"
+
+# Secret API key ("sk_...") for Yoco checkouts (contributions/utils/yoco.py)
+YOCO_SECRET_KEY = config("YOCO_SECRET_KEY", default="")
+# Signing secret ("whsec_...") of the Yoco webhook subscription (contributions/views/webhooks.py)
+YOCO_WEBHOOK_SECRET = config("YOCO_WEBHOOK_SECRET", default="")
+
+# Task history kept by `manage.py prune_task_history` (bakgomong/retention.py, runs nightly)
+TASK_RETENTION = {
+    "SUCCESS_DAYS": config("TASK_RETENTION_SUCCESS_DAYS", default=14, cast=int),
+    "FAILURE_DAYS": config("TASK_RETENTION_FAILURE_DAYS", default=90, cast=int),
+    "ARCHIVE": config("TASK_RETENTION_ARCHIVE", default=False, cast=bool),
+}
+
+# Partition MemberContribution/Payment by year on PostgreSQL (bakgomong/partitioning.py):
+# read by migration contributions 0014, or run `manage.py partition_tables --convert`
+PARTITIONED_TABLES = config("PARTITIONED_TABLES", default=False, cast=bool)
 
 # Or Redis broker (if you run redis)
 # Q_CLUSTER = {
@@ -0,0 +1,39 @@
+"""
+Private file storage for documents that carry member data: invoice, receipt and statement
+PDFs, uploaded bank statements and member imports.
+
+MEDIA_ROOT is served as is under MEDIA_URL (bakgomong.urls in development, the web server
+in production), so anything stored there is public to whoever guesses the path. Private
+files live under PRIVATE_MEDIA_ROOT, outside MEDIA_ROOT, through the "private" entry of
+STORAGES. PrivateStorage has no URL: a file is read back only by a view that checked the
+user's permission first (contributions.views.pdf, views.bank_import) or by a task.
+
+FileFields take the callable get_private_storage, so their migrations refer to it rather
+than to a location on this machine; code outside models calls it when it needs the storage.
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.utils.functional import cached_property
+
+PRIVATE_STORAGE_ALIAS = "private"
+
+
+class PrivateStorage(FileSystemStorage):
+    """FileSystemStorage under PRIVATE_MEDIA_ROOT (read when first used, as MEDIA_ROOT is)."""
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == "PRIVATE_MEDIA_ROOT":
+            self.__dict__.pop("base_location", None)
+            self.__dict__.pop("location", None)
+
+    def url(self, name):
+        raise ValueError(f"{name} is in private storage and has no URL; serve it through a view.")
+
+
+def get_private_storage():
+    return storages[PRIVATE_STORAGE_ALIAS]
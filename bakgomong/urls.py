@@ -4,9 +4,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.contrib.sitemaps.views import sitemap
 from django.views.generic import TemplateView
+from dashboard.views.assets import serve_asset
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path(settings.ASSETS_URL.lstrip('/') + '<path:path>', serve_asset, name='asset'),
     path("", include("accounts.urls", namespace="accounts")),
     path("", include("dashboard.urls", namespace="dashboard")),
     path("", include("contributions.urls", namespace="contributions")),
@@ -5,7 +5,11 @@ from django.urls import reverse
 from django.db.models import Sum
 from django.utils.translation import gettext_lazy as _
 
-from contributions.models import ContributionType, MemberContribution, Payment
+from contributions.models import BankStatementImport, ContributionType, MemberContribution, MemberStatement, Payment, WebhookEvent
+from bakgomong.cache import bump_version
+from bakgomong.admin_perf import AutocompleteFilter, EstimatedCountAdminMixin
+from bakgomong.search import IndexedSearchAdminMixin
+from accounts.utils.thumbnails import thumbnail_url
 
 logger = logging.getLogger("contributions.admin")
 
@@ -50,7 +54,7 @@ class ContributionTypeAdmin(admin.ModelAdmin):
 
 
 @admin.register(MemberContribution)
-class MemberContributionAdmin(admin.ModelAdmin):
+class MemberContributionAdmin(EstimatedCountAdminMixin, IndexedSearchAdminMixin, admin.ModelAdmin):
     def account_link(self, obj):
         """Link to member profile."""
         url = reverse("admin:accounts_account_change", args=[obj.account.id])
@@ -95,10 +99,13 @@ class MemberContributionAdmin(admin.ModelAdmin):
         "status_badge",
         "created"
     )
-    list_filter = ("is_paid", "due_date", "contribution_type", "created")
+    list_filter = ("is_paid", "due_date", ("contribution_type", AutocompleteFilter), "created")
+    list_select_related = ("account", "contribution_type")
     search_fields = ("account__username", "account__first_name", "account__last_name", "reference")
+    indexed_search_relation = "account__"
+    indexed_search_fields = ("reference",)
     readonly_fields = ("created", "updated", "reference")
-    date_hierarchy = "due_date"
+    autocomplete_fields = ("account", "contribution_type")
 
     fieldsets = (
         (_("Member & Contribution"), {
@@ -117,7 +124,7 @@ class MemberContributionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(EstimatedCountAdminMixin, IndexedSearchAdminMixin, admin.ModelAdmin):
     def account_link(self, obj):
         """Link to member profile."""
         url = reverse("admin:accounts_account_change", args=[obj.account.id])
@@ -154,8 +161,9 @@ class PaymentAdmin(admin.ModelAdmin):
                 )
             else:
                 return format_html(
-                    '<img src="{}" style="max-width:300px; max-height:200px;" />',
-                    obj.proof_of_payment.url
+                    '<a href="{}" target="_blank"><img src="{}" style="max-width:300px; max-height:200px;" /></a>',
+                    obj.proof_of_payment.url,
+                    thumbnail_url(obj.proof_of_payment, "lg")
                 )
         return _("No proof attached")
     proof_preview.short_description = _("Proof of Payment")
@@ -183,6 +191,7 @@ class PaymentAdmin(admin.ModelAdmin):
         """Bulk reject payments."""
         updated = queryset.filter(is_approved="PENDING").update(is_approved="REJECTED")
         if updated:
+            bump_version(Payment)
             self.message_user(
                 request,
                 f"✗ {updated} payment(s) rejected.",
@@ -200,9 +209,14 @@ class PaymentAdmin(admin.ModelAdmin):
         "recorded_by",
         "payment_date"
     )
-    list_filter = ("is_approved", "payment_method", "payment_date", "payment_verified_date")
-    search_fields = ("reference", "account__username", "account__first_name", "receipt")
+    list_filter = ("is_approved", "payment_method", ("contribution_type", AutocompleteFilter), "payment_date", "payment_verified_date")
+    list_select_related = ("account", "recorded_by")
+    autocomplete_fields = ("account", "contribution_type", "member_contribution", "recorded_by")
+    search_fields = ("reference", "account__username", "account__first_name", "receipt", "=gateway_transaction_id")
+    indexed_search_relation = "account__"
+    indexed_search_fields = ("reference", "receipt", "=gateway_transaction_id")
     readonly_fields = (
+        "gateway_transaction_id",
         "payment_date",
         "created",
         "updated",
@@ -210,14 +224,12 @@ class PaymentAdmin(admin.ModelAdmin):
         "payment_verified_date",
         "proof_preview"
     )
-    date_hierarchy = "payment_date"
-    
     fieldsets = (
         (_("Payment Info"), {
             "fields": ("reference", "account", "amount", "payment_method")
         }),
         (_("Receipt & Proof"), {
-            "fields": ("receipt", "proof_of_payment", "proof_preview")
+            "fields": ("receipt", "gateway_transaction_id", "proof_of_payment", "proof_preview")
         }),
         (_("Related Contribution"), {
             "fields": ("member_contribution", "contribution_type")
@@ -251,3 +263,57 @@ class PaymentAdmin(admin.ModelAdmin):
                 obj.is_approved,
                 request.user.username
             )
+
+
+@admin.register(MemberStatement)
+class MemberStatementAdmin(IndexedSearchAdminMixin, admin.ModelAdmin):
+    """Written by `manage.py generate_statements`; shows how far a run got."""
+    list_display = ("account", "period", "status", "total_due", "total_paid", "balance", "sent_at")
+    list_filter = ("status", "period")
+    search_fields = ("account__username", "account__first_name", "account__last_name", "account__email")
+    indexed_search_relation = "account__"
+    list_select_related = ("account",)
+    exclude = ("pdf",)
+    readonly_fields = ("account", "period", "total_due", "total_paid", "balance", "pdf_name", "status", "sent_at", "error", "created", "updated")
+
+    def has_add_permission(self, request):
+        return False
+
+    def pdf_name(self, obj):
+        # private storage: the file has no URL to link to
+        return obj.pdf.name or "-"
+
+    pdf_name.short_description = _("PDF")
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    """Payment gateway webhook inbox; events are applied by process_webhook_events_task."""
+    list_display = ("event_id", "provider", "event_type", "status", "attempts", "created", "processed_at")
+    list_filter = ("provider", "status", "event_type")
+    search_fields = ("event_id",)
+    readonly_fields = ("provider", "event_id", "event_type", "payload", "status", "attempts", "processed_at", "error", "created", "updated")
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BankStatementImport)
+class BankStatementImportAdmin(admin.ModelAdmin):
+    """Uploaded bank statements; lines are reviewed at contributions:bank-import-review."""
+    list_display = ("__str__", "uploaded_by", "status", "lines", "matched", "unmatched", "ambiguous", "duplicates", "created")
+    list_filter = ("status", "created")
+    list_select_related = ("uploaded_by",)
+    exclude = ("file",)
+    readonly_fields = ("statement_file", "uploaded_by", "status", "lines", "matched", "unmatched", "ambiguous", "duplicates", "error", "created", "updated")
+
+    def has_add_permission(self, request):
+        return False
+
+    def statement_file(self, obj):
+        # private storage: downloaded through the treasurer-only view
+        return format_html(
+            '<a href="{}">{}</a>', reverse("contributions:bank-import-file", args=[obj.pk]), obj.original_name or obj.file.name
+        )
+
+    statement_file.short_description = _("File")
@@ -102,10 +102,10 @@ class PaymentCheckoutForm(forms.ModelForm):
         )
 
         if self.user:
-            # Use single PaymentStatus value (not list)
+            # unpaid rows: NOT_PAID, or 'NOT PAID' in older data
             mc_qs = MemberContribution.objects.filter(
                 account=self.user,
-                is_paid='NOT PAID'
+                is_paid__in=[PaymentStatus.NOT_PAID, 'NOT PAID'],
             ).select_related('contribution_type')
             self.fields['member_contribution'].queryset = mc_qs
         else:
@@ -282,4 +282,19 @@ class LogPaymentForm(forms.ModelForm):
             payment_method
         )
 
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+class BankStatementUploadForm(forms.Form):
+    """Upload of a bank statement for reconciliation by contribution reference."""
+    file = forms.FileField(
+        help_text=_("CSV (date, amount or credit, description columns) or OFX export from the bank"),
+        widget=forms.FileInput(attrs={"class": "form-control rounded-lg", "accept": ".csv,.ofx,.qfx"}),
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data["file"]
+        if not upload.name.lower().endswith((".csv", ".ofx", ".qfx")):
+            raise ValidationError(_("Upload a .csv, .ofx or .qfx file."))
+        if upload.size > 20 * 1024 * 1024:
+            raise ValidationError(_("File size exceeds 20MB limit."))
+        return upload
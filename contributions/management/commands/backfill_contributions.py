@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Account
+from contributions.utils.backfill import backfill_contributions, missing_contributions
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the contributions members are missing for active contribution types they came "
+        "into scope of after the type was created. Safe to run repeatedly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--family", help="Only members of the family with this slug")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the contributions that would be created")
+        parser.add_argument("--no-notify", action="store_true", help="Do not queue the new-contribution emails")
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.all()
+        if options["family"]:
+            accounts = accounts.filter(family__slug=options["family"])
+
+        if options["dry_run"]:
+            missing = missing_contributions(accounts)
+            members = len({account_id for account_id, _ in missing})
+            self.stdout.write(f"{len(missing)} contributions missing for {members} members")
+            return
+
+        created = backfill_contributions(accounts, notify=not options["no_notify"])
+        self.stdout.write(self.style.SUCCESS(f"{created} contributions created"))
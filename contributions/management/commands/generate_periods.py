@@ -0,0 +1,34 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from contributions.utils.periods import due_periods, generate_periods
+
+
+class Command(BaseCommand):
+    help = "Create the next period of every recurring contribution type that is due. Safe to run repeatedly."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Run as if today were this date (YYYY-MM-DD)")
+        parser.add_argument("--dry-run", action="store_true", help="Only list the periods that would be created")
+        parser.add_argument("--no-notify", action="store_true", help="Do not queue the new-contribution emails")
+
+    def handle(self, *args, **options):
+        today = None
+        if options["date"]:
+            try:
+                today = datetime.date.fromisoformat(options["date"])
+            except ValueError:
+                raise CommandError("--date must look like 2025-01-31")
+
+        if options["dry_run"]:
+            periods = due_periods(today)
+            for contribution_type, due_date in periods:
+                self.stdout.write(f"{contribution_type.name}: {due_date}")
+            self.stdout.write(f"{len(periods)} periods due")
+            return
+
+        results = generate_periods(today, notify=not options["no_notify"])
+        for (name, due_date), created in results.items():
+            self.stdout.write(f"{name}: {due_date}: {created} contributions created")
+        self.stdout.write(self.style.SUCCESS(f"{sum(results.values())} contributions created in {len(results)} periods"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from contributions.utils.statements import CHUNK_SIZE, generate_statements, parse_period
+
+
+class Command(BaseCommand):
+    help = "Render and email every member's monthly statement. Safe to re-run: finished statements are skipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--period", required=True, help="Statement month as YYYY-MM")
+        parser.add_argument("--workers", type=int, default=None, help="Rendering processes (default: CPU count, 1 renders in this process)")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Members loaded, rendered and mailed per chunk")
+        parser.add_argument("--no-email", action="store_true", help="Render and store the PDFs without mailing them")
+        parser.add_argument("--force", action="store_true", help="Re-render and re-send statements that were already sent")
+
+    def handle(self, *args, **options):
+        try:
+            parse_period(options["period"])
+        except ValueError:
+            raise CommandError("--period must look like 2025-01")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        def progress(report):
+            self.stdout.write(report.summary())
+
+        report = generate_statements(
+            options["period"],
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+            send=not options["no_email"],
+            force=options["force"],
+            progress=progress,
+        )
+        for account_id, error in report.errors:
+            self.stderr.write(f"account {account_id}: {error}")
+        style = self.style.WARNING if report.failed else self.style.SUCCESS
+        self.stdout.write(style(report.summary()))
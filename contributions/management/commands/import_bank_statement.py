@@ -0,0 +1,39 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from contributions.models import BankStatementImport
+from contributions.utils.bank_import import CHUNK_SIZE, import_statement
+
+
+class Command(BaseCommand):
+    help = "Import a bank statement (CSV or OFX) and match deposits to contributions by reference."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Statement file (.csv, .ofx or .qfx)")
+        parser.add_argument("--user", help="Username recorded as the importer (recorded_by on the payments)")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Lines matched per query")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(username=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user '{options['user']}'.")
+        try:
+            fh = open(options["path"], "rb")
+        except OSError as e:
+            raise CommandError(str(e))
+        with fh:
+            statement_import = BankStatementImport(original_name=os.path.basename(options["path"])[:255], uploaded_by=user)
+            statement_import.file.save(os.path.basename(options["path"]), File(fh), save=True)
+
+        report = import_statement(statement_import, chunk_size=options["chunk_size"])
+        for error in report.errors:
+            self.stderr.write(error)
+        if statement_import.status == BankStatementImport.Status.FAILED:
+            raise CommandError(statement_import.error)
+        self.stdout.write(self.style.SUCCESS(report.summary()))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from contributions.utils import aging
+
+
+class Command(BaseCommand):
+    help = "Refresh the arrears aging snapshot (changed groups only, or everything with --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild the whole snapshot")
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt: {aging.rebuild()} groups in arrears"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Refreshed: {aging.refresh()} groups recomputed"))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:35
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0008_contributiontype_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberStatement',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('period', models.DateField(help_text='First day of the statement month')),
+                ('total_due', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pdf', models.FileField(blank=True, null=True, upload_to='pdfs/statements/')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RENDERED', 'Rendered'), ('SENT', 'Sent'), ('SKIPPED', 'Skipped (no email)'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=20)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Member Statement',
+                'verbose_name_plural': 'Member Statements',
+                'ordering': ['-period', 'account'],
+                'constraints': [models.UniqueConstraint(fields=('account', 'period'), name='unique_member_statement_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:40
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_loginthrottlebucket'),
+        ('contributions', '0009_memberstatement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArrearsAgingSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('as_of', models.DateField(db_index=True)),
+                ('count_0_30', models.PositiveIntegerField(default=0)),
+                ('amount_0_30', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('count_31_60', models.PositiveIntegerField(default=0)),
+                ('amount_31_60', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('count_61_90', models.PositiveIntegerField(default=0)),
+                ('amount_61_90', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('count_90_plus', models.PositiveIntegerField(default=0)),
+                ('amount_90_plus', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('refreshed_at', models.DateTimeField()),
+                ('contribution_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aging_snapshots', to='contributions.contributiontype')),
+                ('family', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='aging_snapshots', to='accounts.family')),
+            ],
+            options={
+                'verbose_name': 'Arrears Aging Snapshot',
+                'verbose_name_plural': 'Arrears Aging Snapshots',
+                'ordering': ['family', 'contribution_type'],
+                'indexes': [models.Index(fields=['family', 'contribution_type'], name='contributio_family__99cd93_idx')],
+            },
+        ),
+    ]
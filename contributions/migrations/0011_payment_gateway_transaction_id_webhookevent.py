@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:47
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0010_arrearsagingsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='gateway_transaction_id',
+            field=models.CharField(blank=True, help_text='Payment id from the card gateway (Yoco)', max_length=100, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('provider', models.CharField(choices=[('YOCO', 'Yoco')], max_length=20)),
+                ('event_id', models.CharField(max_length=200)),
+                ('event_type', models.CharField(blank=True, max_length=100)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('RECEIVED', 'Received'), ('PROCESSED', 'Processed'), ('IGNORED', 'Ignored'), ('FAILED', 'Failed')], default='RECEIVED', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Webhook Event',
+                'verbose_name_plural': 'Webhook Events',
+                'ordering': ['-created'],
+                'indexes': [models.Index(fields=['status', 'created'], name='contributio_status_eb07fe_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'event_id'), name='unique_webhook_event')],
+            },
+        ),
+    ]
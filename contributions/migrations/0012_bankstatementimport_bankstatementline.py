@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:50
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0011_payment_gateway_transaction_id_webhookevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankStatementImport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('file', models.FileField(upload_to='imports/statements/')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('IMPORTED', 'Imported'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('lines', models.PositiveIntegerField(default=0)),
+                ('matched', models.PositiveIntegerField(default=0)),
+                ('unmatched', models.PositiveIntegerField(default=0)),
+                ('ambiguous', models.PositiveIntegerField(default=0)),
+                ('duplicates', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bank Statement Import',
+                'verbose_name_plural': 'Bank Statement Imports',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BankStatementLine',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('line_number', models.PositiveIntegerField()),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('description', models.CharField(max_length=255)),
+                ('bank_reference', models.CharField(blank=True, max_length=100)),
+                ('references', models.CharField(blank=True, help_text='Contribution references found in the description', max_length=255)),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('MATCHED', 'Matched'), ('UNMATCHED', 'Unmatched'), ('AMBIGUOUS', 'Ambiguous'), ('RESOLVED', 'Resolved'), ('IGNORED', 'Ignored')], db_index=True, max_length=20)),
+                ('member_contribution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_lines', to='contributions.membercontribution')),
+                ('payment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_line', to='contributions.payment')),
+                ('statement_import', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statement_lines', to='contributions.bankstatementimport')),
+            ],
+            options={
+                'verbose_name': 'Bank Statement Line',
+                'verbose_name_plural': 'Bank Statement Lines',
+                'ordering': ['statement_import', 'line_number'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:55
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_amount_paid(apps, schema_editor):
+    MemberContribution = apps.get_model("contributions", "MemberContribution")
+    Payment = apps.get_model("contributions", "Payment")
+    approved = (
+        Payment.objects.filter(member_contribution=OuterRef("pk"), is_approved="APPROVED")
+        .order_by()
+        .values("member_contribution")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    MemberContribution.objects.update(
+        amount_paid=Coalesce(Subquery(approved), Value(0), output_field=DecimalField(max_digits=12, decimal_places=2))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0012_bankstatementimport_bankstatementline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membercontribution',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_amount_paid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def fill_due_dates(apps, schema_editor):
+    # due_date becomes NOT NULL (it keys the partitioned table): a contribution without one is
+    # due on its creation date, as statements already dated it
+    MemberContribution = apps.get_model("contributions", "MemberContribution")
+    MemberContribution.objects.filter(due_date__isnull=True).update(due_date=TruncDate("created"))
+
+
+def partition_tables(apps, schema_editor):
+    # opt-in (settings.PARTITIONED_TABLES); `manage.py partition_tables --convert` does the same later
+    if schema_editor.connection.vendor != "postgresql" or not getattr(settings, "PARTITIONED_TABLES", False):
+        return
+    from bakgomong.partitioning import convert_all
+
+    convert_all(using=schema_editor.connection.alias, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    # convert_all() runs its own transaction
+    atomic = False
+
+    dependencies = [
+        ('contributions', '0013_membercontribution_amount_paid'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_due_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='membercontribution',
+            name='due_date',
+            field=models.DateField(),
+        ),
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
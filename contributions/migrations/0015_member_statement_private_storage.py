@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:39
+
+import bakgomong.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0014_partition_ledger_tables'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='memberstatement',
+            name='pdf',
+            field=models.FileField(blank=True, null=True, storage=bakgomong.storage.get_private_storage, upload_to='pdfs/statements/'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:42
+
+import posixpath
+
+import accounts.utils.file_handlers
+import bakgomong.storage
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_statements(apps, schema_editor):
+    """Move uploaded statements out of public MEDIA; payments no longer use them as proof."""
+    BankStatementImport = apps.get_model("contributions", "BankStatementImport")
+    Payment = apps.get_model("contributions", "Payment")
+    private = bakgomong.storage.get_private_storage()
+    for statement_import in BankStatementImport.objects.exclude(file=""):
+        name = statement_import.file.name
+        Payment.objects.filter(proof_of_payment=name).update(proof_of_payment="")
+        if default_storage.exists(name):
+            with default_storage.open(name, "rb") as fh:
+                statement_import.file.name = private.save(name, fh)
+            default_storage.delete(name)
+        statement_import.original_name = posixpath.basename(name)[:255]
+        statement_import.save(update_fields=["file", "original_name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0015_member_statement_private_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankstatementimport',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='bankstatementimport',
+            name='file',
+            field=models.FileField(storage=bakgomong.storage.get_private_storage, upload_to=accounts.utils.file_handlers.handle_statement_upload),
+        ),
+        migrations.RunPython(move_statements, migrations.RunPython.noop),
+    ]
@@ -4,9 +4,15 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from accounts.models import Family
 from accounts.utils.abstracts import AbstractCreate, AbstractPayment
+from accounts.utils.file_handlers import handle_statement_upload
+from bakgomong.partitioning import PartitionedQuerySet
+from bakgomong.storage import get_private_storage
 from django.contrib.auth import get_user_model
 
-from django.db.models import Sum
+from django.db.models import F, Sum
+from decimal import Decimal
+import logging
+import posixpath
 import random
 import uuid
 from django.utils.crypto import get_random_string
@@ -15,6 +21,7 @@ from django.db import transaction
 from accounts.utils.validators import verify_rsa_phone
 
 PHONE_VALIDATOR = verify_rsa_phone()
+logger = logging.getLogger("contributions")
 
 class PaymentMethod(models.TextChoices):
         CASH = 'cash', _('Cash')
@@ -132,6 +139,12 @@ class ContributionType(AbstractCreate):
         return reverse("contributions:delete-contribution", kwargs={"contribution_slug": self.slug})
     
 
+class MemberContributionQuerySet(PartitionedQuerySet):
+    # filter on due_date, the partition key when the table is partitioned (bakgomong.partitioning)
+    def due_between(self, start, end):
+        return self.filter(due_date__range=(start, end))
+
+
 class MemberContribution(AbstractCreate):
     from accounts.utils.abstracts import PaymentStatus
     
@@ -139,8 +152,12 @@ class MemberContribution(AbstractCreate):
     contribution_type = models.ForeignKey(ContributionType, on_delete=models.CASCADE, related_name="member_contributions")
     amount_due = models.DecimalField(max_digits=10, decimal_places=2)
     reference = models.CharField(max_length=100, blank=True, null=True, help_text=_("Receipt or transaction reference"), unique=True)
-    due_date = models.DateField(blank=True, null=True)
+    due_date = models.DateField()
     is_paid = models.CharField(max_length=100, choices=PaymentStatus.choices, default=PaymentStatus.NOT_PAID, db_index=True)
+    # running total of approved payments, kept by Payment.save() and the payment post_delete signal
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+
+    objects = MemberContributionQuerySet.as_manager()
     
 
     class Meta:
@@ -162,11 +179,24 @@ class MemberContribution(AbstractCreate):
     def save(self, *args, **kwargs):
         # reference has default UUID; ensure not overwritten on update
         super().save(*args, **kwargs)
+
+    @classmethod
+    def status_for(cls, amount_paid, amount_due):
+        """is_paid for `amount_paid` in approved payments against `amount_due`."""
+        if amount_paid >= amount_due:
+            return cls.PaymentStatus.PAID
+        return cls.PaymentStatus.PARTIALLY_PAID if amount_paid > 0 else cls.PaymentStatus.NOT_PAID
         
     def get_absolute_url(self):
         return reverse("contributions:member-contribution", kwargs={"id": self.id}) 
 
 
+class PaymentQuerySet(PartitionedQuerySet):
+    # filter on payment_date, the partition key when the table is partitioned (bakgomong.partitioning)
+    def paid_between(self, start, end):
+        return self.filter(payment_date__range=(start, end))
+
+
 class Payment(AbstractCreate, AbstractPayment):
     class LogPaymentStatus(models.TextChoices):
         PENDING = "PENDING", _("Pending Verification")
@@ -180,6 +210,13 @@ class Payment(AbstractCreate, AbstractPayment):
         blank=True,
         db_index=True
     )
+    gateway_transaction_id = models.CharField(
+        max_length=100,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text=_("Payment id from the card gateway (Yoco)")
+    )
     account = models.ForeignKey(
         get_user_model(),
         on_delete=models.CASCADE,
@@ -256,6 +293,8 @@ class Payment(AbstractCreate, AbstractPayment):
         help_text=_("Reason if payment was rejected")
     )
 
+    objects = PaymentQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Payment")
         verbose_name_plural = _("Payments")
@@ -274,7 +313,6 @@ class Payment(AbstractCreate, AbstractPayment):
     def approve_payment(self, approved_by, rejection_reason=None):
         """Approve or reject payment."""
         from django.utils import timezone
-        from accounts.utils.abstracts import PaymentStatus as ContribPaymentStatus
 
         if rejection_reason:
             self.is_approved = self.LogPaymentStatus.REJECTED
@@ -285,12 +323,9 @@ class Payment(AbstractCreate, AbstractPayment):
 
         self.payment_verified_by = approved_by
         self.payment_verified_date = timezone.now()
+        # save() moves the member contribution's amount_paid and status
         self.save()
 
-        # Update member contribution status if approved
-        if self.is_approved == self.LogPaymentStatus.APPROVED and self.member_contribution:
-            self.update_member_contribution_status(ContribPaymentStatus.PAID)
-
     def update_member_contribution_status(self, status):
          """Automatically update member contribution payment status."""
          if not self.member_contribution:
@@ -299,45 +334,246 @@ class Payment(AbstractCreate, AbstractPayment):
          self.member_contribution.is_paid = status
          self.member_contribution.save(update_fields=['is_paid'])
 
-    def save(self, *args, **kwargs):
-        import logging
-        from accounts.utils.abstracts import PaymentStatus as ContribPaymentStatus
-        logger = logging.getLogger("contributions")
+    def contribution_share(self):
+        """(member contribution id, amount counted towards its amount_paid): approved payments only."""
+        return self._share(self.member_contribution_id, self.is_approved, self.amount)
+
+    @classmethod
+    def _share(cls, member_contribution_id, is_approved, amount):
+        if is_approved != cls.LogPaymentStatus.APPROVED:
+            return member_contribution_id, Decimal("0")
+        return member_contribution_id, Decimal(amount or 0)
+
+    def stored_share(self):
+        """
+        contribution_share() of this payment's row as stored, which is locked until the
+        transaction ends: another instance of the same payment may have saved it since this
+        one was loaded. (None, 0) when there is no row yet. Call inside transaction.atomic().
+        """
+        row = (
+            Payment.objects.select_for_update()
+            .find(pk=self.pk)
+            .values_list("member_contribution_id", "is_approved", "amount")
+            .first()
+        )
+        return self._share(*row) if row else (None, Decimal("0"))
+
+    def apply_to_contributions(self, before, after):
+        """
+        Move this payment's share of amount_paid from `before` to `after` (contribution_share()
+        pairs; None means unknown: recount). Each affected MemberContribution row is locked,
+        amount_paid moves by an F() delta and only amount_paid and is_paid are written.
+        """
+        deltas = {}
+        for share, sign in ((before, -1), (after, 1)):
+            if share is not None and share[0] and share[1]:
+                deltas[share[0]] = deltas.get(share[0], Decimal("0")) + sign * share[1]
+        deltas = {pk: delta for pk, delta in deltas.items() if delta != 0}
+        if before is None and after[0]:
+            deltas[after[0]] = None
+        if not deltas:
+            return
+
+        locked = MemberContribution.objects.select_for_update().filter(pk__in=deltas).order_by("pk")
+        for contribution in locked.only("pk", "amount_due", "amount_paid", "is_paid"):
+            delta = deltas[contribution.pk]
+            if delta is None:
+                paid = contribution.payments.filter(is_approved=self.LogPaymentStatus.APPROVED).aggregate(total=Sum("amount"))["total"] or Decimal("0")
+                contribution.amount_paid = paid
+            else:
+                paid = contribution.amount_paid + delta
+                contribution.amount_paid = F("amount_paid") + delta
+            contribution.is_paid = MemberContribution.status_for(paid, contribution.amount_due)
+            contribution.save(update_fields=["amount_paid", "is_paid"])
+            contribution.amount_paid = paid
+            # keep an already loaded self.member_contribution in step with the row
+            cached = self._state.fields_cache.get("member_contribution")
+            if cached is not None and cached.pk == contribution.pk:
+                cached.amount_paid, cached.is_paid = paid, contribution.is_paid
+            logger.info("Payment %s: member contribution %s paid R%s, status %s", self.id, contribution.pk, paid, contribution.is_paid)
 
-        # Validate proof_of_payment if logged by treasurer
-        if self.recorded_by and not self.pk:  # New payment being created
-            if self.recorded_by.role == "TREASURER" and not self.proof_of_payment:
+    def save(self, *args, **kwargs):
+        # Validate proof_of_payment if logged by treasurer (role looked up last: it is a query)
+        if not self.pk and self.recorded_by_id and not self.proof_of_payment:
+            if self.recorded_by.role == "TREASURER":
                 raise ValueError("Proof of payment is required when treasurer logs a payment.")
 
-        # save payment and then atomically update related member_contribution status
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"amount", "is_approved", "member_contribution", "member_contribution_id"} & set(update_fields):
+            return super().save(*args, **kwargs)
+
+        after = self.contribution_share()
         with transaction.atomic():
+            before = (None, Decimal("0")) if self._state.adding else self.stored_share()
             super().save(*args, **kwargs)
-            if self.member_contribution:
-                # recalc total paid for the member contribution
-                total_paid = (
-                    self.member_contribution.payments
-                    .filter(is_approved=self.LogPaymentStatus.APPROVED)
-                    .aggregate(total=Sum("amount"))
-                    .get("total") or 0
-                )
-                if total_paid >= self.member_contribution.amount_due:
-                    new_status = ContribPaymentStatus.PAID
-                else:
-                    new_status = (
-                        ContribPaymentStatus.PARTIALLY_PAID
-                        if total_paid > 0
-                        else ContribPaymentStatus.NOT_PAID
-                    )
-                # only save when status changes
-                if self.member_contribution.is_paid != new_status:
-                    self.member_contribution.is_paid = new_status
-                    self.member_contribution.save()
-
-                logger.info(
-                    "Payment %s saved; member contribution %s status: %s",
-                    self.id,
-                    self.member_contribution.id,
-                    new_status
-                )
+            # nothing to recompute unless the approved amount or the contribution changed
+            if before != after:
+                self.apply_to_contributions(before, after)
+
+
+class MemberStatement(AbstractCreate):
+    """
+    One member's statement for a month. Written by `manage.py generate_statements`;
+    the status lets an interrupted run resume where it stopped.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        RENDERED = "RENDERED", _("Rendered")
+        SENT = "SENT", _("Sent")
+        SKIPPED = "SKIPPED", _("Skipped (no email)")
+        FAILED = "FAILED", _("Failed")
+
+    account = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name="statements")
+    period = models.DateField(help_text=_("First day of the statement month"))
+    total_due = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pdf = models.FileField(upload_to="pdfs/statements/", storage=get_private_storage, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Member Statement")
+        verbose_name_plural = _("Member Statements")
+        ordering = ["-period", "account"]
+        constraints = [
+            models.UniqueConstraint(fields=["account", "period"], name="unique_member_statement_period"),
+        ]
 
+    def __str__(self):
+        return f"{self.account} - {self.period:%Y-%m} ({self.get_status_display()})"
+
+
+class ArrearsAgingSnapshot(AbstractCreate):
+    """
+    Outstanding amounts per family and contribution type, bucketed by days overdue.
+    Rebuilt nightly and refreshed incrementally by contributions.utils.aging; the aging
+    dashboard only reads this table.
+    """
+    as_of = models.DateField(db_index=True)
+    family = models.ForeignKey(Family, on_delete=models.CASCADE, null=True, blank=True, related_name="aging_snapshots")
+    contribution_type = models.ForeignKey(ContributionType, on_delete=models.CASCADE, related_name="aging_snapshots")
+    count_0_30 = models.PositiveIntegerField(default=0)
+    amount_0_30 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    count_31_60 = models.PositiveIntegerField(default=0)
+    amount_31_60 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    count_61_90 = models.PositiveIntegerField(default=0)
+    amount_61_90 = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    count_90_plus = models.PositiveIntegerField(default=0)
+    amount_90_plus = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = _("Arrears Aging Snapshot")
+        verbose_name_plural = _("Arrears Aging Snapshots")
+        ordering = ["family", "contribution_type"]
+        indexes = [
+            models.Index(fields=["family", "contribution_type"]),
+        ]
+
+    def __str__(self):
+        return f"{self.family or 'No family'} - {self.contribution_type.name} ({self.as_of})"
+
+
+class WebhookEvent(AbstractCreate):
+    """
+    Inbox for payment gateway webhooks. The webhook view only stores the raw event, keyed
+    by the provider's event id so retries are dropped by the unique constraint, and
+    contributions.utils.webhooks applies stored events in batches in a django-q task.
+    """
+    class Provider(models.TextChoices):
+        YOCO = "YOCO", _("Yoco")
+
+    class Status(models.TextChoices):
+        RECEIVED = "RECEIVED", _("Received")
+        PROCESSED = "PROCESSED", _("Processed")
+        IGNORED = "IGNORED", _("Ignored")
+        FAILED = "FAILED", _("Failed")
+
+    provider = models.CharField(max_length=20, choices=Provider.choices)
+    event_id = models.CharField(max_length=200)
+    event_type = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RECEIVED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Webhook Event")
+        verbose_name_plural = _("Webhook Events")
+        ordering = ["-created"]
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "event_id"], name="unique_webhook_event"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "created"]),
+        ]
 
+    def __str__(self):
+        return f"{self.provider} {self.event_type} {self.event_id} ({self.get_status_display()})"
+
+
+class BankStatementImport(AbstractCreate):
+    """An uploaded bank statement (CSV or OFX), imported by contributions.utils.bank_import."""
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        IMPORTED = "IMPORTED", _("Imported")
+        FAILED = "FAILED", _("Failed")
+
+    file = models.FileField(upload_to=handle_statement_upload, storage=get_private_storage)
+    original_name = models.CharField(max_length=255, blank=True)
+    uploaded_by = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True, related_name="bank_imports")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    lines = models.PositiveIntegerField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    unmatched = models.PositiveIntegerField(default=0)
+    ambiguous = models.PositiveIntegerField(default=0)
+    duplicates = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Bank Statement Import")
+        verbose_name_plural = _("Bank Statement Imports")
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"{self.original_name or posixpath.basename(self.file.name)} ({self.get_status_display()})"
+
+    def get_absolute_url(self):
+        return reverse("contributions:bank-import-review", kwargs={"id": self.id})
+
+
+class BankStatementLine(AbstractCreate):
+    """
+    One credit line of an imported statement. MATCHED lines have a PENDING payment;
+    UNMATCHED and AMBIGUOUS lines wait in the review queue for a treasurer.
+    """
+    class Status(models.TextChoices):
+        MATCHED = "MATCHED", _("Matched")
+        UNMATCHED = "UNMATCHED", _("Unmatched")
+        AMBIGUOUS = "AMBIGUOUS", _("Ambiguous")
+        RESOLVED = "RESOLVED", _("Resolved")
+        IGNORED = "IGNORED", _("Ignored")
+
+    statement_import = models.ForeignKey(BankStatementImport, on_delete=models.CASCADE, related_name="statement_lines")
+    line_number = models.PositiveIntegerField()
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    description = models.CharField(max_length=255)
+    bank_reference = models.CharField(max_length=100, blank=True)
+    references = models.CharField(max_length=255, blank=True, help_text=_("Contribution references found in the description"))
+    # same date, amount, description and occurrence in the file: a re-imported line
+    fingerprint = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=20, choices=Status.choices, db_index=True)
+    member_contribution = models.ForeignKey(MemberContribution, on_delete=models.SET_NULL, null=True, blank=True, related_name="bank_lines")
+    payment = models.OneToOneField(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name="bank_line")
+
+    class Meta:
+        verbose_name = _("Bank Statement Line")
+        verbose_name_plural = _("Bank Statement Lines")
+        ordering = ["statement_import", "line_number"]
+
+    def __str__(self):
+        return f"{self.date} R{self.amount} {self.description}"
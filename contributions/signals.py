@@ -1,19 +1,25 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django_q.tasks import async_task
 from datetime import timedelta
 
 from dateutil.relativedelta import relativedelta
-from accounts.models import Account
-from accounts.utils.abstracts import Role, PaymentStatus
+from accounts.utils.abstracts import PaymentStatus
 from contributions.utils.sms import generate_reference
-from contributions.models import ContributionType, MemberContribution, SCOPE_CHOICES
+from contributions.utils.periods import eligible_members
+from bakgomong.cache import bump_version
+from accounts.utils.thumbnails import queue_thumbnails, track_file_names
+from accounts.models import Account
+from contributions.models import ContributionType, MemberContribution, Payment
 
 import logging
 
 logger = logging.getLogger("signals")
 
+track_file_names(Payment, "proof_of_payment")
+
 
 def calculate_due_date(recurrence):
     """Calculate due date based on recurrence type."""
@@ -43,45 +49,7 @@ def create_member_contributions(sender, instance: ContributionType, created, **k
         return
 
     try:
-        # Determine target members based on scope
-        if instance.scope == SCOPE_CHOICES.CLAN:
-            members_qs = Account.objects.filter(
-                is_active=True,
-                is_approved=True
-            )
-
-        elif instance.scope == SCOPE_CHOICES.FAMILY and instance.family:
-            members_qs = Account.objects.filter(
-                is_active=True,
-                is_approved=True,
-                family=instance.family
-            )
-
-        elif instance.scope == SCOPE_CHOICES.FAMILY_LEADERS:
-            members_qs = Account.objects.filter(
-                is_active=True,
-                is_approved=True,
-                role=Role.FAMILY_LEADER
-            )
-
-        elif instance.scope == SCOPE_CHOICES.EXECUTIVES:
-            members_qs = Account.objects.filter(
-                is_active=True,
-                is_approved=True,
-                role__in=[
-                    Role.CLAN_CHAIRPERSON,
-                    Role.DEP_CHAIRPERSON,
-                    Role.DEP_SECRETARY,
-                    Role.KGOSANA,
-                    Role.SECRETARY,
-                    Role.TREASURER,
-                    Role.FAMILY_LEADER,
-                ]
-            )
-
-        else:
-            logger.warning("Unknown scope for ContributionType %s: %s", instance.id, instance.scope)
-            members_qs = Account.objects.none()
+        members_qs = eligible_members(instance)
 
         member_count = members_qs.count()
         if member_count == 0:
@@ -122,6 +90,7 @@ def create_member_contributions(sender, instance: ContributionType, created, **k
             contributions_to_create,
             batch_size=1000  # Insert in batches to avoid memory issues
         )
+        bump_version(MemberContribution)
         logger.info(
             "Created %d member contributions for ContributionType %s (name: %s, scope: %s)",
             len(created_contributions),
@@ -150,3 +119,36 @@ def create_member_contributions(sender, instance: ContributionType, created, **k
         )
         raise  # Re-raise to allow Django to handle signal errors
 
+
+@receiver(post_save, sender=Payment)
+def payment_proof_thumbnails(sender, instance, created, **kwargs):
+    queue_thumbnails(instance, "proof_of_payment", created)
+
+
+@receiver(pre_delete, sender=Payment)
+def payment_deleting(sender, instance, **kwargs):
+    # inside the delete's transaction: lock the row and keep what it counts as stored
+    instance._deleted_share = instance.stored_share()
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    # an approved payment no longer counts towards its member contribution
+    share = getattr(instance, "_deleted_share", None) or instance.contribution_share()
+    instance.apply_to_contributions(share, (None, 0))
+
+
+@receiver(post_save, sender=Account)
+def account_membership_changed(sender, instance, created, update_fields=None, **kwargs):
+    # approved, reactivated, moved to a family or given a role: contribution types may now apply
+    if update_fields is not None and not set(update_fields) & {"is_active", "is_approved", "family", "family_id", "role"}:
+        return
+    before = None if created else getattr(instance, "_loaded_membership", None)
+    after = instance.membership()
+    if before == after or not (instance.is_active and instance.is_approved):
+        return
+    instance._loaded_membership = after
+    if created or before is not None:
+        from contributions.utils.backfill import queue_backfill
+
+        transaction.on_commit(lambda: queue_backfill([instance.pk]))
@@ -21,7 +21,7 @@ def send_contribution_created_notification_task(member_contribution_id):
     Notify member immediately when a new MemberContribution is created.
     """
     try:
-        mc = MemberContribution.objects.get(id=member_contribution_id)
+        mc = MemberContribution.objects.find(id=member_contribution_id).get()
     except MemberContribution.DoesNotExist:
         logger.error("MemberContribution %s not found", member_contribution_id)
         return False
@@ -165,7 +165,7 @@ def send_payment_confirmation_task(member_contribution_id, treasurer_name):
     Member is notified that payment has been received and confirmed.
     """
     try:
-        mc = MemberContribution.objects.get(id=member_contribution_id)
+        mc = MemberContribution.objects.find(id=member_contribution_id).get()
     except MemberContribution.DoesNotExist:
         logger.error("MemberContribution %s not found", member_contribution_id)
         return False
@@ -217,7 +217,7 @@ def send_payment_details_task(obj_id, obj_type='contribution', treasurer_name=No
     try:
         logger.info("send_payment_details_task called: id=%s type=%s", obj_id, obj_type)
         if obj_type == 'payment':
-            payment = Payment.objects.select_related('member_contribution', 'recorded_by').filter(id=obj_id).first()
+            payment = Payment.objects.select_related('member_contribution', 'recorded_by').find(id=obj_id).first()
             if not payment:
                 logger.error("Payment %s not found", obj_id)
                 return False
@@ -233,3 +233,140 @@ def send_payment_details_task(obj_id, obj_type='contribution', treasurer_name=No
     except Exception as exc:
         logger.exception("send_payment_details_task failed for %s: %s", obj_id, exc)
         return False
+
+
+def render_invoice_pdf_task(member_contribution_id, force=False):
+    """
+    Background task: render the PDF invoice of a MemberContribution for its current
+    fingerprint (contributions.utils.pdf). Returns the storage name, or None on failure.
+    """
+    from contributions.utils.pdf import invoice_pdf_name, release_render_lock, write_invoice_pdf
+
+    mc = MemberContribution.objects.select_related("account", "contribution_type").find(id=member_contribution_id).first()
+    if mc is None:
+        logger.error("render_invoice_pdf_task: MemberContribution %s not found", member_contribution_id)
+        return None
+    name = invoice_pdf_name(mc)
+    try:
+        return write_invoice_pdf(mc, force=force)
+    except Exception:
+        logger.exception("render_invoice_pdf_task failed for %s", member_contribution_id)
+        return None
+    finally:
+        release_render_lock(name)
+
+
+def render_receipt_pdf_task(payment_id, force=False):
+    """Background task: render the PDF receipt of an approved Payment."""
+    from contributions.utils.pdf import receipt_pdf_name, release_render_lock, write_receipt_pdf
+
+    payment = (
+        Payment.objects.select_related("account", "contribution_type", "member_contribution", "payment_verified_by")
+        .find(id=payment_id)
+        .filter(is_approved=Payment.LogPaymentStatus.APPROVED)
+        .first()
+    )
+    if payment is None:
+        logger.error("render_receipt_pdf_task: approved Payment %s not found", payment_id)
+        return None
+    name = receipt_pdf_name(payment)
+    try:
+        return write_receipt_pdf(payment, force=force)
+    except Exception:
+        logger.exception("render_receipt_pdf_task failed for %s", payment_id)
+        return None
+    finally:
+        release_render_lock(name)
+
+
+def generate_recurring_periods_task():
+    """
+    Scheduled task (daily, see bakgomong.schedules): create the next period of every
+    MONTHLY/ANNUAL contribution type whose latest period has fallen due.
+    Returns the number of contributions created.
+    """
+    from contributions.utils.periods import generate_periods
+
+    try:
+        return sum(generate_periods().values())
+    except Exception:
+        logger.exception("generate_recurring_periods_task failed")
+        return 0
+
+
+def backfill_contributions_task(account_ids=None):
+    """
+    Background task: create the contributions `account_ids` (default: every account) are
+    missing for active contribution types, after a large approval or import.
+    Returns the number of contributions created.
+    """
+    from accounts.models import Account
+    from contributions.utils.backfill import backfill_contributions
+    from contributions.utils.periods import BATCH_SIZE
+
+    try:
+        if account_ids is None:
+            return backfill_contributions()
+        created = 0
+        for start in range(0, len(account_ids), BATCH_SIZE):
+            created += backfill_contributions(Account.objects.filter(pk__in=account_ids[start:start + BATCH_SIZE]))
+        return created
+    except Exception:
+        logger.exception("backfill_contributions_task failed")
+        return 0
+
+
+def refresh_arrears_aging_task(full=False):
+    """
+    Scheduled task (see bakgomong.schedules): full=True rebuilds the arrears aging
+    snapshot (nightly); otherwise only groups changed since the last run are recomputed.
+    """
+    from bakgomong.db_router import read_from_replica
+    from contributions.utils import aging
+
+    try:
+        if full:
+            # the nightly rebuild reads every open contribution: from the replica when there is one
+            with read_from_replica():
+                return aging.rebuild()
+        return aging.refresh()
+    except Exception:
+        logger.exception("refresh_arrears_aging_task failed (full=%s)", full)
+        return 0
+
+
+def process_webhook_events_task(retry_failed=False):
+    """
+    Apply stored payment gateway webhook events (contributions.utils.webhooks). Queued by
+    the webhook view and swept on a schedule with retry_failed=True.
+    """
+    from contributions.utils import webhooks
+
+    if not retry_failed:
+        # events stored from now on queue a new run
+        webhooks.release_processing_lock()
+    try:
+        return webhooks.process_events(retry_failed=retry_failed)
+    except Exception:
+        logger.exception("process_webhook_events_task failed")
+        return 0
+
+
+def import_bank_statement_task(statement_import_id):
+    """Background task: import an uploaded bank statement (contributions.utils.bank_import)."""
+    from contributions.models import BankStatementImport
+    from contributions.utils.bank_import import import_statement
+
+    try:
+        statement_import = BankStatementImport.objects.select_related("uploaded_by").get(pk=statement_import_id)
+    except BankStatementImport.DoesNotExist:
+        logger.error("BankStatementImport %s not found", statement_import_id)
+        return None
+    try:
+        return import_statement(statement_import).summary()
+    except Exception as e:
+        logger.exception("import_bank_statement_task failed for %s", statement_import_id)
+        BankStatementImport.objects.filter(pk=statement_import_id).update(
+            status=BankStatementImport.Status.FAILED, error=f"{type(e).__name__}: {e}"
+        )
+        return None
@@ -1,3 +1,405 @@
-from django.test import TestCase
+import base64
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Account, Family
+from bakgomong import partitioning
+from bakgomong.aio import in_thread
+from bakgomong.cache import get_versions, incr
+from bakgomong.storage import get_private_storage
+from contributions.models import BankStatementImport, ContributionType, MemberContribution, Payment, WebhookEvent
+from contributions.utils.bank_import import import_statement, parse_amount
+from contributions.utils.pdf import invoice_pdf_name, write_invoice_pdf
+from contributions.utils.periods import _insert, create_period
+from contributions.utils.sms import generate_reference
+
+
+def make_member(username, **kwargs):
+    return Account.objects.create_user(username=username, password="secret", is_approved=True, **kwargs)
+
+
+def make_contribution(account, amount=Decimal("40.00"), due_date=datetime.date(2026, 3, 1)):
+    contribution_type = ContributionType.objects.create(name="Burial Fund", amount=amount, is_active=False)
+    return MemberContribution.objects.create(
+        account=account, contribution_type=contribution_type, amount_due=amount, reference=generate_reference(), due_date=due_date,
+    )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PRIVATE_MEDIA_ROOT=tempfile.mkdtemp())
+class InvoicePdfStorageTests(TestCase):
+    def setUp(self):
+        self.member = make_member("thabo")
+        self.contribution = make_contribution(self.member)
+        with mock.patch("contributions.utils.pdf.render_pdf", return_value=b"%PDF-1.4 invoice"):
+            self.name = write_invoice_pdf(self.contribution)
+
+    def test_pdf_is_not_in_public_media(self):
+        self.assertEqual(self.name, invoice_pdf_name(self.contribution))
+        self.assertTrue(get_private_storage().exists(self.name))
+        self.assertFalse(default_storage.exists(self.name))
+        self.assertFalse(get_private_storage().path(self.name).startswith(str(settings.MEDIA_ROOT)))
+        with self.assertRaises(ValueError):
+            get_private_storage().url(self.name)
+
+    def test_owner_downloads_through_view(self):
+        self.client.force_login(self.member)
+        response = self.client.get(reverse("contributions:member-contribution-pdf", args=[self.contribution.id]), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 invoice")
+
+    def test_other_member_is_forbidden(self):
+        self.client.force_login(make_member("lerato"))
+        response = self.client.get(reverse("contributions:member-contribution-pdf", args=[self.contribution.id]), secure=True)
+        self.assertEqual(response.status_code, 403)
+
+
+class MemberContributionViewTests(TestCase):
+    def test_invoice_lists_approved_payments(self):
+        member = make_member("thabo")
+        contribution = make_contribution(member)
+        Payment.objects.create(
+            account=member, member_contribution=contribution, amount=Decimal("40.00"),
+            is_approved=Payment.LogPaymentStatus.APPROVED,
+        )
+        self.client.force_login(member)
+        response = self.client.get(reverse("contributions:member-contribution", args=[contribution.id]), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["approved_payments"]), 1)
+
+    def test_other_member_is_turned_away(self):
+        contribution = make_contribution(make_member("thabo"))
+        self.client.force_login(make_member("lerato"))
+        response = self.client.get(reverse("contributions:member-contribution", args=[contribution.id]), secure=True)
+        self.assertRedirects(response, reverse("contributions:member-contributions-list"), fetch_redirect_response=False)
+
+    def test_unknown_contribution_is_404(self):
+        self.client.force_login(make_member("thabo"))
+        response = self.client.get(reverse("contributions:member-contribution", args=[uuid.uuid4()]), secure=True)
+        self.assertEqual(response.status_code, 404)
+
+
+class ParseAmountTests(SimpleTestCase):
+    def test_thousands_and_decimal_separators(self):
+        cases = {
+            "1,500": "1500",
+            "12,345,678": "12345678",
+            "1,234.50": "1234.50",
+            "1.234,50": "1234.50",
+            "R1 234.50": "1234.50",
+            "1\xa0234,50": "1234.50",
+            "1234,5": "1234.5",
+            "12,50": "12.50",
+            "1,5000": "1.5000",
+            "50": "50",
+            "1.500": "1.500",
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse_amount(text), Decimal(expected))
+
+    def test_debits(self):
+        for text in ("-1,500", "(1,500)", "1,500 Dr", "R-1,500"):
+            with self.subTest(text=text):
+                self.assertEqual(parse_amount(text), Decimal("-1500"))
+        self.assertEqual(parse_amount("1,500 Cr"), Decimal("1500"))
+
+    def test_unreadable(self):
+        for text in ("abc", "1,2,3", ""):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                parse_amount(text)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PRIVATE_MEDIA_ROOT=tempfile.mkdtemp())
+class BankStatementStorageTests(TestCase):
+    def setUp(self):
+        self.member = make_member("thabo")
+        self.contribution = make_contribution(self.member)
+        self.statement_import = BankStatementImport(original_name="march.csv")
+        self.statement_import.file.save(
+            "march.csv", ContentFile(f"Date,Amount,Description\n2026-03-02,40.00,{self.contribution.reference}\n".encode())
+        )
+
+    def test_statement_is_private_and_not_proof_of_payment(self):
+        name = self.statement_import.file.name
+        self.assertNotIn("march", name)
+        self.assertTrue(get_private_storage().exists(name))
+        self.assertFalse(default_storage.exists(name))
+
+        report = import_statement(self.statement_import)
+        self.assertEqual(report.matched, 1)
+        payment = Payment.objects.get(member_contribution=self.contribution)
+        self.assertFalse(payment.proof_of_payment)
+        self.assertEqual(payment.bank_line.statement_import, self.statement_import)
+
+    def test_only_treasurers_download_statement(self):
+        url = reverse("contributions:bank-import-file", args=[self.statement_import.id])
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(url, secure=True).status_code, 403)
+
+        self.client.force_login(make_member("treasurer", is_staff=True))
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="march.csv"', response["Content-Disposition"])
+
+
+@override_settings(CACHES={"default": {
+    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tempfile.mkdtemp(),
+}})
+class CacheVersionTests(TestCase):
+    def test_version_is_bumped_when_the_write_commits(self):
+        member = make_member("thabo")
+        before = get_versions([MemberContribution])
+        with self.captureOnCommitCallbacks(execute=True):
+            make_contribution(member)
+            # a reader in the meantime still sees (and caches under) the old version
+            self.assertEqual(get_versions([MemberContribution]), before)
+        self.assertNotEqual(get_versions([MemberContribution]), before)
+
+    def test_concurrent_increments_are_not_lost(self):
+        def count():
+            for _ in range(50):
+                incr("test-counter")
+
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(incr("test-counter", 0), 400)
+
+
+class InThreadTests(TestCase):
+    def test_sequential_outside_pooled_asgi_worker(self):
+        # the request's own thread, connection and (in tests) transaction
+        self.assertEqual(async_to_sync(in_thread)(threading.get_ident), threading.get_ident())
+
+    def test_own_thread_in_pooled_asgi_worker(self):
+        with mock.patch.dict(os.environ, {"DB_PROCESS_ROLE": "asgi"}), \
+                mock.patch("bakgomong.aio.pooled", return_value=True), \
+                mock.patch("bakgomong.aio.close_old_connections"):
+            self.assertNotEqual(async_to_sync(in_thread)(threading.get_ident), threading.get_ident())
+
+
+class PaymentApprovalTests(TestCase):
+    def setUp(self):
+        self.treasurer = make_member("treasurer", is_staff=True)
+        self.contribution = make_contribution(make_member("thabo"), amount=Decimal("100.00"))
+        self.payment = Payment.objects.create(
+            account=self.contribution.account,
+            contribution_type=self.contribution.contribution_type,
+            member_contribution=self.contribution,
+            amount=Decimal("40.00"),
+            is_approved=Payment.LogPaymentStatus.PENDING,
+        )
+
+    def test_stale_instances_approve_once(self):
+        # two requests load the pending payment before either approves it
+        first, second = Payment.objects.get(pk=self.payment.pk), Payment.objects.get(pk=self.payment.pk)
+        first.approve_payment(self.treasurer)
+        second.approve_payment(self.treasurer)
+        self.contribution.refresh_from_db()
+        self.assertEqual(self.contribution.amount_paid, Decimal("40.00"))
+
+    def test_stale_instance_deletes_approved_share(self):
+        stale = Payment.objects.get(pk=self.payment.pk)
+        self.payment.approve_payment(self.treasurer)
+        stale.delete()
+        self.contribution.refresh_from_db()
+        self.assertEqual(self.contribution.amount_paid, Decimal("0"))
+
+
+class PeriodInsertTests(TestCase):
+    def setUp(self):
+        family = Family.objects.create(name="Dladla Family", slug="dladla-family", is_approved=True)
+        self.members = [make_member(f"dladla{i}", family=family) for i in range(3)]
+        self.contribution_type = ContributionType.objects.create(
+            name="Monthly Fee", amount=Decimal("50.00"), scope="family", family=family, is_active=False,
+        )
+        self.taken = make_contribution(make_member("taken")).reference
+
+    def test_colliding_references_are_regenerated(self):
+        # the first reference is taken in the table, the next two collide with each other
+        references = iter([self.taken, "CLN-DUP001", "CLN-DUP001", "CLN-NEW001", "CLN-NEW002"])
+        with mock.patch("contributions.utils.periods.generate_reference", lambda: next(references)), \
+                self.assertLogs("contributions", "WARNING") as logs:
+            created = create_period(self.contribution_type, datetime.date(2026, 4, 1), notify=False)
+
+        self.assertEqual(created, 3)
+        self.assertEqual(
+            set(self.contribution_type.member_contributions.filter(due_date=datetime.date(2026, 4, 1)).values_list("reference", flat=True)),
+            {"CLN-DUP001", "CLN-NEW001", "CLN-NEW002"},
+        )
+        self.assertIn("Regenerated 2 colliding contribution references", logs.output[-1])
+
+    def test_only_existing_periods_are_skipped(self):
+        due_date = datetime.date(2026, 4, 1)
+        rows = [
+            MemberContribution(
+                account=member, contribution_type=self.contribution_type, amount_due=Decimal("50.00"),
+                reference=generate_reference(), due_date=due_date,
+            )
+            for member in self.members
+        ]
+        # a concurrent run created the first member's period after the batch was built
+        MemberContribution.objects.create(
+            account=self.members[0], contribution_type=self.contribution_type, amount_due=Decimal("50.00"),
+            reference=generate_reference(), due_date=due_date,
+        )
+        self.assertEqual(_insert(rows, notify=False), 2)
+        self.assertEqual(self.contribution_type.member_contributions.filter(due_date=due_date).count(), 3)
+
+
+WEBHOOK_SECRET = "whsec_" + base64.b64encode(b"webhook-test-secret").decode()
+
+
+def yoco_delivery(event):
+    """Headers and body of a Yoco webhook delivery of `event`, signed with WEBHOOK_SECRET."""
+    body, webhook_id, timestamp = json.dumps(event).encode(), event["id"], str(int(time.time()))
+    key = base64.b64decode(WEBHOOK_SECRET.split("_", 1)[1])
+    signature = base64.b64encode(hmac.new(key, f"{webhook_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()).decode()
+    return body, {"webhook-id": webhook_id, "webhook-timestamp": timestamp, "webhook-signature": f"v1,{signature}"}
+
+
+@override_settings(
+    YOCO_SECRET_KEY="sk_test", YOCO_WEBHOOK_SECRET=WEBHOOK_SECRET,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class YocoCheckoutTests(TestCase):
+    def setUp(self):
+        self.member = make_member("thabo")
+        self.contribution = make_contribution(self.member)
+        ContributionType.objects.filter(pk=self.contribution.contribution_type_id).update(is_active=True)
+        self.client.force_login(self.member)
+
+    def pay_by_card(self, checkout_id):
+        response = self.client.post(reverse("contributions:checkout", args=[self.contribution.id]), {
+            "contribution_type": self.contribution.contribution_type_id,
+            "member_contribution": self.contribution.id,
+            "amount": "40.00",
+            "payment_method": "mobile",
+        }, secure=True)
+        payment = Payment.objects.get(member_contribution=self.contribution)
+        self.assertRedirects(response, reverse("contributions:yoco-checkout", args=[payment.id]), fetch_redirect_response=False)
+        yoco = mock.Mock(**{"json.return_value": {"id": checkout_id, "redirectUrl": f"https://c.yoco.com/checkout/{checkout_id}"}})
+        with mock.patch("contributions.utils.yoco.requests.post", return_value=yoco) as post:
+            response = self.client.get(response.url, secure=True)
+        self.assertRedirects(response, f"https://c.yoco.com/checkout/{checkout_id}", fetch_redirect_response=False)
+        self.assertEqual(post.call_args.kwargs["json"]["amount"], 4000)
+        return post.call_args.kwargs["json"]["metadata"]
+
+    def deliver(self, event_id, metadata, amount=4000):
+        # what Yoco sends: the checkout's metadata plus its id as checkoutId
+        body, headers = yoco_delivery({
+            "id": event_id, "type": "payment.succeeded",
+            "payload": {"id": f"p_{event_id}", "amount": amount, "currency": "ZAR", "metadata": metadata,
+                        "paymentMethodDetails": {"type": "card", "card": {"maskedCard": "************1111", "scheme": "visa"}}},
+        })
+        response = self.client.post(
+            reverse("contributions:yoco-webhook"), body, content_type="application/json",
+            headers=headers, secure=True,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_card_payment_is_approved_by_its_webhook(self):
+        metadata = self.pay_by_card("ch_live_1")
+        payment = Payment.objects.get(member_contribution=self.contribution)
+        self.assertEqual(payment.checkout_id, "ch_live_1")
+
+        self.deliver("evt_1", {**metadata, "checkoutId": "ch_live_1"})
+        self.assertEqual(WebhookEvent.objects.get(event_id="evt_1").status, WebhookEvent.Status.PROCESSED)
+        payment.refresh_from_db()
+        self.assertEqual(payment.is_approved, Payment.LogPaymentStatus.APPROVED)
+        self.assertEqual(payment.gateway_transaction_id, "p_evt_1")
+        self.contribution.refresh_from_db()
+        self.assertEqual(self.contribution.amount_paid, Decimal("40.00"))
+
+    def test_payment_of_an_earlier_checkout_is_found_by_its_metadata(self):
+        metadata = self.pay_by_card("ch_live_1")
+        payment = Payment.objects.get(member_contribution=self.contribution)
+        with mock.patch("contributions.utils.yoco.requests.post", return_value=mock.Mock(
+            **{"json.return_value": {"id": "ch_live_2", "redirectUrl": "https://c.yoco.com/checkout/ch_live_2"}}
+        )):
+            self.client.get(reverse("contributions:yoco-checkout", args=[payment.id]), secure=True)
+
+        self.deliver("evt_1", {**metadata, "checkoutId": "ch_live_1"})
+        payment.refresh_from_db()
+        self.assertEqual(payment.is_approved, Payment.LogPaymentStatus.APPROVED)
+
+
+@skipUnless(connection.vendor == "postgresql", "table partitioning needs PostgreSQL")
+class PartitioningTests(TestCase):
+    def setUp(self):
+        self.member = make_member("thabo")
+        self.contribution = make_contribution(self.member, due_date=datetime.date(2024, 5, 1))
+        self.payment = Payment.objects.create(
+            account=self.member, member_contribution=self.contribution, amount=Decimal("40.00"), checkout_id="ch_1",
+        )
+        # ALTER TABLE refuses to run with deferred foreign key checks pending
+        self.check_constraints_now()
+        partitioning.convert_all()
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+    def tearDown(self):
+        # the conversion is rolled back with the test
+        partitioning._keyed_tables.clear()
+
+    def check_constraints_now(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    def assertRejected(self, create):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            create()
+            self.check_constraints_now()
+
+    def test_unique_columns_stay_unique_across_years(self):
+        self.assertRejected(lambda: MemberContribution.objects.create(
+            account=self.member, contribution_type=self.contribution.contribution_type, amount_due=1,
+            reference=self.contribution.reference, due_date=datetime.date(2027, 1, 1),
+        ))
+        self.assertRejected(lambda: Payment.objects.create(account=self.member, amount=1, checkout_id="ch_1"))
+
+    def test_foreign_keys_to_partitioned_table_are_enforced(self):
+        self.assertRejected(lambda: Payment.objects.create(account=self.member, amount=1, member_contribution_id=uuid.uuid4()))
+
+    def test_row_moves_between_years(self):
+        self.contribution.due_date = datetime.date(2026, 3, 1)
+        self.contribution.save()
+        self.check_constraints_now()
+        found = MemberContribution.objects.find(pk=self.contribution.pk)
+        self.assertEqual(found.get().due_date, datetime.date(2026, 3, 1))
+        self.assertEqual(MemberContribution.objects.find(reference=self.contribution.reference).get(), self.contribution)
+        self.assertIn("never executed", found.explain(analyze=True))
+
+    def test_async_lookup_prunes_too(self):
+        found = async_to_sync(MemberContribution.objects.afind)(pk=self.contribution.pk)
+        self.assertIn(partitioning.keys_table_name(MemberContribution._meta.db_table), str(found.query))
+        self.assertEqual(found.get(), self.contribution)
+
+    def test_delete_releases_unique_values(self):
+        self.contribution.delete()
+        self.payment.refresh_from_db()
+        self.assertIsNone(self.payment.member_contribution_id)
+        make_contribution(self.member, due_date=datetime.date(2027, 1, 1)).payments.create(
+            account=self.member, amount=1, checkout_id="ch_2",
+        )
+        self.payment.delete()
+        Payment.objects.create(account=self.member, amount=1, checkout_id="ch_1")
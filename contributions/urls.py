@@ -1,6 +1,9 @@
 from django.urls import path
-from .views.checkout import checkout, log_payment
+from .views.checkout import checkout, log_payment, yoco_checkout
 from contributions.views.member_contr import add_member_contribution, my_member_contributions_list, member_contribution, delete_member_contribution, member_contributions_list, update_member_contribution
+from .views.pdf import download_invoice_pdf, download_receipt_pdf
+from .views.webhooks import yoco_webhook
+from .views.bank_import import bank_import_review, bank_imports, download_bank_statement
 from .views.contributions import get_contribution, get_contributions, add_contribution, update_contribution, delete_contribution
 
 app_name = "contributions"
@@ -18,7 +21,14 @@ urlpatterns = [
     path('member-invoices/add/', add_member_contribution, name='add-member-contribution'),
     path('member-invoices/<uuid:id>/edit/', update_member_contribution, name='update-member-contribution'),
     path('member-invoices/<uuid:id>/delete/', delete_member_contribution, name='delete-member-contribution'),
+    path('member-invoice/<uuid:id>/pdf', download_invoice_pdf, name='member-contribution-pdf'),
+    path('payment/receipt/<uuid:id>/pdf', download_receipt_pdf, name='payment-receipt-pdf'),
     
     path('payment/checkout/<uuid:id>', checkout, name='checkout'),
     path('payment/log-payment/<uuid:id>', log_payment, name='log-payment'),
+    path('payment/yoco/<uuid:payment_id>', yoco_checkout, name='yoco-checkout'),
+    path('payment/yoco/webhook', yoco_webhook, name='yoco-webhook'),
+    path('payment/bank-imports', bank_imports, name='bank-imports'),
+    path('payment/bank-imports/<uuid:id>', bank_import_review, name='bank-import-review'),
+    path('payment/bank-imports/<uuid:id>/file', download_bank_statement, name='bank-import-file'),
 ]
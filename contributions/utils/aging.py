@@ -0,0 +1,148 @@
+"""
+Arrears aging: outstanding contribution amounts per family and contribution type,
+bucketed by days overdue (0-30, 31-60, 61-90, 90+).
+
+rebuild() recomputes the whole ArrearsAgingSnapshot table with one CASE-based grouped
+query; it runs nightly because bucket boundaries move with the date. refresh() runs
+during the day and recomputes only the (family, contribution type) groups with a
+MemberContribution or Payment whose `updated` is newer than the snapshot. Deleted rows
+and members moving family are picked up by the next rebuild.
+"""
+import datetime
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.utils.abstracts import PaymentStatus
+from contributions.models import ArrearsAgingSnapshot, MemberContribution, Payment
+
+logger = logging.getLogger("tasks")
+
+# name: (min days overdue, max days overdue or None)
+BUCKETS = [
+    ("0_30", 0, 30),
+    ("31_60", 31, 60),
+    ("61_90", 61, 90),
+    ("90_plus", 91, None),
+]
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _bucket_range(as_of, low, high):
+    # overdue means due before as_of: "0-30 days" starts the day after the due date
+    q = Q(due_date__lte=as_of - datetime.timedelta(days=max(low, 1)))
+    if high is not None:
+        q &= Q(due_date__gte=as_of - datetime.timedelta(days=high))
+    return q
+
+
+def aging_rows(as_of, groups=None):
+    """
+    One grouped query: a row per (family, contribution type) with a count and an
+    outstanding amount per bucket. `groups` limits it to those (family id, type id) pairs.
+    """
+    paid = (
+        Payment.objects
+        .filter(member_contribution=OuterRef("pk"), is_approved=Payment.LogPaymentStatus.APPROVED)
+        .values("member_contribution")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    qs = (
+        MemberContribution.objects
+        .filter(due_date__lt=as_of)
+        .exclude(is_paid=PaymentStatus.PAID)
+        .annotate(outstanding=F("amount_due") - Coalesce(Subquery(paid, output_field=MONEY), Value(Decimal("0"), output_field=MONEY)))
+        .filter(outstanding__gt=0)
+    )
+    if groups is not None:
+        condition = Q()
+        for family_id, type_id in groups:
+            condition |= Q(account__family_id=family_id, contribution_type_id=type_id)
+        qs = qs.filter(condition)
+
+    aggregates = {}
+    for name, low, high in BUCKETS:
+        in_bucket = _bucket_range(as_of, low, high)
+        aggregates[f"count_{name}"] = Sum(Case(When(in_bucket, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        aggregates[f"amount_{name}"] = Sum(Case(When(in_bucket, then=F("outstanding")), default=Value(Decimal("0")), output_field=MONEY))
+    return (
+        qs.values(family_id=F("account__family_id"), contribution_type_ref=F("contribution_type_id"))
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+
+def _snapshots(rows, as_of, refreshed_at):
+    return [
+        ArrearsAgingSnapshot(
+            as_of=as_of,
+            family_id=row.pop("family_id"),
+            contribution_type_id=row.pop("contribution_type_ref"),
+            refreshed_at=refreshed_at,
+            **row,
+        )
+        for row in rows
+    ]
+
+
+def rebuild(as_of=None):
+    """Replace the whole snapshot. Returns the number of rows written."""
+    started = timezone.now()
+    as_of = as_of or timezone.localdate()
+    snapshots = _snapshots(list(aging_rows(as_of)), as_of, started)
+    with transaction.atomic():
+        ArrearsAgingSnapshot.objects.all().delete()
+        ArrearsAgingSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    logger.info("Arrears aging rebuilt as of %s: %d groups", as_of, len(snapshots))
+    return len(snapshots)
+
+
+def changed_groups(since):
+    """(family id, type id) pairs with a contribution or payment updated after `since`."""
+    groups = set(
+        MemberContribution.objects.filter(updated__gt=since)
+        .values_list("account__family_id", "contribution_type_id")
+        .distinct()
+    )
+    groups.update(
+        Payment.objects.filter(updated__gt=since, member_contribution__isnull=False)
+        .values_list("member_contribution__account__family_id", "member_contribution__contribution_type_id")
+        .distinct()
+    )
+    return groups
+
+
+def refresh():
+    """
+    Recompute only the groups changed since the last refresh. Falls back to rebuild()
+    when the snapshot is empty or from an earlier day. Returns the number of groups.
+    """
+    today = timezone.localdate()
+    latest = ArrearsAgingSnapshot.objects.order_by("-refreshed_at").values("as_of", "refreshed_at").first()
+    if latest is None or latest["as_of"] != today:
+        return rebuild(today)
+
+    started = timezone.now()
+    groups = changed_groups(latest["refreshed_at"])
+    if not groups:
+        return 0
+    snapshots = _snapshots(list(aging_rows(today, groups)), today, started)
+    stale = Q()
+    for family_id, type_id in groups:
+        stale |= Q(family_id=family_id, contribution_type_id=type_id)
+    with transaction.atomic():
+        ArrearsAgingSnapshot.objects.filter(stale).delete()
+        ArrearsAgingSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    logger.info("Arrears aging refreshed: %d groups changed", len(groups))
+    return len(groups)
+
+
+def bucket_totals(queryset):
+    """Sums of every bucket column over a snapshot queryset."""
+    fields = [f"{kind}_{name}" for name, _, _ in BUCKETS for kind in ("count", "amount")]
+    return queryset.aggregate(**{field: Coalesce(Sum(field), 0, output_field=MONEY if field.startswith("amount") else IntegerField()) for field in fields})
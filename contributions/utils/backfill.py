@@ -0,0 +1,131 @@
+"""
+Contributions for members who came into a contribution type's scope after it was created.
+
+The post_save signal (contributions.signals) only fans a ContributionType out to the
+members eligible at creation. Members approved later, or moved into a family with its
+own levies, get the missing ones here: missing_contributions() is a single anti-join of
+accounts x active types, matched by scope (as eligible_members()), against the existing
+contributions, and backfill_contributions() bulk-inserts the result.
+
+A backfilled contribution gets the latest due date its type already has, so the member
+joins the current period (generate_periods() adds later ones), else the type's due date.
+
+Hooked into the approve_members admin action, the bulk member import and Account saves
+that change approval, activity, family or role (contributions.signals). More than
+INLINE_LIMIT accounts are handed to backfill_contributions_task instead.
+"""
+import logging
+
+from django.db import connections
+from django.db.models import Max
+from django_q.tasks import async_task
+
+from accounts.models import Account
+from accounts.utils.abstracts import PaymentStatus, Role
+from bakgomong.cache import bump_version
+from contributions.models import ContributionType, MemberContribution, SCOPE_CHOICES
+from contributions.utils.periods import BATCH_SIZE, EXECUTIVE_ROLES, _insert
+from contributions.utils.sms import generate_reference
+
+logger = logging.getLogger("contributions")
+
+# accounts backfilled in the request; more go to the task queue
+INLINE_LIMIT = 200
+
+
+def missing_contributions(accounts=None):
+    """
+    [(account id, contribution type id)]: the active types each of `accounts` (a queryset,
+    default every account) is in scope for and has no contribution of. One query.
+    """
+    accounts = Account.objects.all() if accounts is None else accounts
+    connection = connections[MemberContribution.objects.db]
+    qn = connection.ops.quote_name
+    executive_roles = ", ".join(["%s"] * len(EXECUTIVE_ROLES))
+    scoped, scoped_params = accounts.order_by().values("pk").query.sql_with_params()
+    sql = f"""
+        SELECT a.{qn("id")}, t.{qn("id")}
+        FROM {qn(Account._meta.db_table)} a
+        JOIN {qn(ContributionType._meta.db_table)} t ON t.is_active AND (
+            t.scope = %s
+            OR (t.scope = %s AND t.family_id = a.family_id)
+            OR (t.scope = %s AND a.role = %s)
+            OR (t.scope = %s AND a.role IN ({executive_roles}))
+        )
+        WHERE a.is_active AND a.is_approved
+          AND a.{qn("id")} IN ({scoped})
+          AND NOT EXISTS (
+              SELECT 1 FROM {qn(MemberContribution._meta.db_table)} mc
+              WHERE mc.account_id = a.{qn("id")} AND mc.contribution_type_id = t.{qn("id")}
+          )
+    """
+    params = [
+        SCOPE_CHOICES.CLAN,
+        SCOPE_CHOICES.FAMILY,
+        SCOPE_CHOICES.FAMILY_LEADERS, Role.FAMILY_LEADER,
+        SCOPE_CHOICES.EXECUTIVES, *EXECUTIVE_ROLES,
+        *scoped_params,
+    ]
+    account_pk, type_pk = Account._meta.pk, ContributionType._meta.pk
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(account_pk.to_python(a), type_pk.to_python(t)) for a, t in cursor.fetchall()]
+
+
+def due_dates(types):
+    """{type id: due date of a backfilled contribution} for `types`."""
+    from contributions.signals import calculate_due_date
+
+    latest = dict(
+        MemberContribution.objects
+        .filter(contribution_type__in=types, due_date__isnull=False)
+        .values_list("contribution_type_id")
+        .annotate(latest=Max("due_date"))
+    )
+    return {
+        t.pk: latest.get(t.pk) or t.due_date or calculate_due_date(t.recurrence)
+        for t in types
+    }
+
+
+def backfill_contributions(accounts=None, notify=True):
+    """Create the missing contributions of `accounts` (queryset, default all). Returns how many."""
+    missing = missing_contributions(accounts)
+    if not missing:
+        return 0
+    types = ContributionType.objects.in_bulk({type_id for _, type_id in missing})
+    dates = due_dates(list(types.values()))
+
+    created = 0
+    batch = []
+    for account_id, type_id in missing:
+        contribution_type = types[type_id]
+        batch.append(MemberContribution(
+            account_id=account_id,
+            contribution_type=contribution_type,
+            amount_due=contribution_type.amount,
+            reference=generate_reference(),
+            due_date=dates[type_id],
+            is_paid=PaymentStatus.NOT_PAID,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            created += _insert(batch, notify)
+            batch = []
+    if batch:
+        created += _insert(batch, notify)
+
+    if created:
+        bump_version(MemberContribution)
+    logger.info("Backfilled %d member contributions over %d contribution types", created, len(types))
+    return created
+
+
+def queue_backfill(account_ids):
+    """Backfill `account_ids` now, or on the task queue when there are many."""
+    account_ids = [str(pk) for pk in account_ids]
+    if not account_ids:
+        return
+    if len(account_ids) > INLINE_LIMIT:
+        async_task("contributions.tasks.backfill_contributions_task", account_ids)
+        return
+    backfill_contributions(Account.objects.filter(pk__in=account_ids))
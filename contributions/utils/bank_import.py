@@ -0,0 +1,351 @@
+"""
+Bank statement import and reconciliation by contribution reference.
+
+Members pay by deposit quoting their MemberContribution reference (CLN-XXXXXX). A
+statement (CSV or OFX) is read as a stream and handled in chunks of CHUNK_SIZE credit
+lines. Each chunk costs a fixed number of queries, however many lines it holds:
+
+- one `fingerprint__in` query drops lines already imported from an earlier statement;
+- one `reference__in` query resolves every reference found in the chunk's descriptions;
+- bulk inserts for the PENDING payments and the statement lines.
+
+A line quoting exactly one known contribution is MATCHED: it gets a PENDING payment,
+which a treasurer approves as usual. Lines quoting none (UNMATCHED) or several
+(AMBIGUOUS) wait in the review queue (contributions/views/bank_import.py). Debits are
+skipped.
+
+The statement lists every member's deposits, so it is kept in private storage
+(bakgomong.storage) for treasurers only and is not any payment's proof_of_payment: a
+payment leads back to its line through BankStatementLine.payment.
+"""
+import csv
+import datetime
+import hashlib
+import io
+import logging
+import posixpath
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from accounts.utils.abstracts import PaymentStatus
+from bakgomong.cache import bump_version
+from contributions.models import BankStatementImport, BankStatementLine, MemberContribution, Payment, PaymentMethod
+
+logger = logging.getLogger("contributions")
+
+CHUNK_SIZE = 1000
+REFERENCE_RE = re.compile(r"\bCLN[\s\-_]?([A-Z0-9]{6})\b", re.IGNORECASE)
+# 1,500 and 12,345,678: commas between groups of three digits
+THOUSANDS_RE = re.compile(r"^\d{1,3}(,\d{3})+$")
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y", "%d %b %Y", "%d %B %Y", "%Y%m%d")
+
+# CSV header names (lower-cased) per field; the first header row with a date and an
+# amount or credit column is used, so bank preambles above it are skipped
+DATE_COLUMNS = ("date", "transaction date", "posting date", "value date")
+AMOUNT_COLUMNS = ("amount", "transaction amount")
+CREDIT_COLUMNS = ("credit", "credit amount", "money in", "deposit", "deposits")
+DESCRIPTION_COLUMNS = ("description", "narrative", "details", "transaction description", "memo", "reference")
+BANK_REFERENCE_COLUMNS = ("bank reference", "transaction id", "fitid", "reference number")
+
+
+class StatementFormatError(ValueError):
+    pass
+
+
+@dataclass
+class StatementLine:
+    line_number: int
+    date: datetime.date
+    amount: Decimal
+    description: str
+    bank_reference: str = ""
+
+
+@dataclass
+class BankImportReport:
+    lines: int = 0
+    matched: int = 0
+    unmatched: int = 0
+    ambiguous: int = 0
+    duplicates: int = 0
+    debits: int = 0
+    errors: list = field(default_factory=list)
+
+    def summary(self):
+        return (
+            f"credit lines: {self.lines}; matched: {self.matched}, unmatched: {self.unmatched}, "
+            f"ambiguous: {self.ambiguous}, already imported: {self.duplicates}; "
+            f"debits skipped: {self.debits}; unreadable lines: {len(self.errors)}"
+        )
+
+
+def extract_references(text):
+    """Contribution references in `text`, normalised to CLN-XXXXXX, in order of appearance."""
+    found = []
+    for match in REFERENCE_RE.finditer(text or ""):
+        reference = f"CLN-{match.group(1).upper()}"
+        if reference not in found:
+            found.append(reference)
+    return found
+
+
+def parse_date(value):
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date '{value}'")
+
+
+def parse_amount(value):
+    """
+    'R1 234.50', '1,234.50', '1.234,50', '1,500', '-50.00', '(50.00)', '50.00 Dr', '1234,5'
+    -> Decimal. With both separators the last one is the decimal point; a lone comma
+    followed by groups of exactly three digits separates thousands, else it is decimal.
+    """
+    text = value.strip().upper().replace(" ", "").replace("\xa0", "")
+    negative = text.endswith("DR")
+    text = text.removesuffix("DR").removesuffix("CR")
+    if text.startswith("(") and text.endswith(")"):
+        negative, text = True, text[1:-1]
+    # -R50 or R-50
+    text = text.removeprefix("R")
+    if text.startswith("-"):
+        negative, text = True, text[1:]
+    text = text.removeprefix("R")
+    if "," in text and "." in text:
+        thousands = "," if text.rfind(",") < text.rfind(".") else "."
+        text = text.replace(thousands, "").replace(",", ".")
+    elif THOUSANDS_RE.match(text):
+        text = text.replace(",", "")
+    elif "," in text:
+        text = text.replace(",", ".")
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"unrecognised amount '{value}'")
+    return -amount if negative else amount
+
+
+def _column(header, names):
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def iter_csv(text):
+    """Yield StatementLine (or ValueError for unreadable rows) from a CSV text stream."""
+    columns = None
+    reader = csv.reader(text)
+    for row in reader:
+        if columns is None:
+            header = [cell.strip().lower() for cell in row]
+            date_col = _column(header, DATE_COLUMNS)
+            amount_col = _column(header, AMOUNT_COLUMNS)
+            credit_col = _column(header, CREDIT_COLUMNS)
+            if date_col is not None and (amount_col is not None or credit_col is not None):
+                columns = (date_col, amount_col, credit_col, _column(header, DESCRIPTION_COLUMNS), _column(header, BANK_REFERENCE_COLUMNS))
+            continue
+        if not any(cell.strip() for cell in row):
+            continue
+        date_col, amount_col, credit_col, description_col, reference_col = columns
+
+        def cell(index):
+            return row[index].strip() if index is not None and index < len(row) else ""
+
+        line_number = reader.line_num
+        try:
+            raw_amount = cell(amount_col) if amount_col is not None else cell(credit_col)
+            yield StatementLine(
+                line_number=line_number,
+                date=parse_date(cell(date_col)),
+                amount=parse_amount(raw_amount) if raw_amount else Decimal("0"),
+                description=cell(description_col)[:255],
+                bank_reference=cell(reference_col)[:100],
+            )
+        except ValueError as e:
+            yield ValueError(f"line {line_number}: {e}")
+    if columns is None:
+        raise StatementFormatError("No header row with a date and an amount or credit column.")
+
+
+def _ofx_value(block, tag):
+    match = re.search(rf"<{tag}>([^<\r\n]*)", block, re.IGNORECASE)
+    return match.group(1).strip() if match else ""
+
+
+def iter_ofx(text, read_size=65536):
+    """Yield StatementLine from an OFX (SGML or XML) text stream, one <STMTTRN> at a time."""
+    buffer, number = "", 0
+    for chunk in iter(lambda: text.read(read_size), ""):
+        buffer += chunk
+        while True:
+            upper = buffer.upper()
+            start = upper.find("<STMTTRN>")
+            if start == -1:
+                buffer = buffer[-len("<STMTTRN>"):]
+                break
+            end = upper.find("</STMTTRN>", start)
+            if end == -1:
+                buffer = buffer[start:]
+                break
+            block, buffer = buffer[start:end], buffer[end + len("</STMTTRN>"):]
+            number += 1
+            try:
+                yield StatementLine(
+                    line_number=number,
+                    date=parse_date(_ofx_value(block, "DTPOSTED")[:8]),
+                    amount=parse_amount(_ofx_value(block, "TRNAMT")),
+                    description=" ".join(filter(None, (_ofx_value(block, "NAME"), _ofx_value(block, "MEMO"))))[:255],
+                    bank_reference=_ofx_value(block, "FITID")[:100],
+                )
+            except ValueError as e:
+                yield ValueError(f"transaction {number}: {e}")
+
+
+def iter_statement(text, name):
+    if posixpath.splitext(name.lower())[1] in (".ofx", ".qfx"):
+        return iter_ofx(text)
+    return iter_csv(text)
+
+
+def fingerprint(line, occurrence):
+    raw = f"{line.date.isoformat()}|{line.amount}|{line.description}|{line.bank_reference}|{occurrence}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _import_chunk(statement_import, lines, occurrences, report):
+    keyed = []
+    for line in lines:
+        key = (line.date, line.amount, line.description, line.bank_reference)
+        occurrences[key] += 1
+        keyed.append((line, fingerprint(line, occurrences[key])))
+
+    existing = set(
+        BankStatementLine.objects.filter(fingerprint__in=[fp for _, fp in keyed]).values_list("fingerprint", flat=True)
+    )
+    fresh = [(line, fp, extract_references(f"{line.description} {line.bank_reference}")) for line, fp in keyed if fp not in existing]
+    report.duplicates += len(keyed) - len(fresh)
+
+    wanted = {reference for _, _, references in fresh for reference in references}
+    contributions = {
+        contribution.reference: contribution
+        for contribution in MemberContribution.objects.filter(reference__in=wanted).only(
+            "id", "reference", "account_id", "contribution_type_id"
+        )
+    }
+
+    payments, rows = [], []
+    for line, fp, references in fresh:
+        found = {contributions[r].pk: contributions[r] for r in references if r in contributions}
+        row = BankStatementLine(
+            statement_import=statement_import,
+            line_number=line.line_number,
+            date=line.date,
+            amount=line.amount,
+            description=line.description,
+            bank_reference=line.bank_reference,
+            references=" ".join(references)[:255],
+            fingerprint=fp,
+        )
+        if len(found) == 1:
+            contribution = next(iter(found.values()))
+            payment = Payment(
+                account_id=contribution.account_id,
+                contribution_type_id=contribution.contribution_type_id,
+                member_contribution=contribution,
+                amount=line.amount,
+                payment_method=PaymentMethod.BANK,
+                reference=contribution.reference,
+                receipt=line.bank_reference or None,
+                recorded_by=statement_import.uploaded_by,
+                is_approved=Payment.LogPaymentStatus.PENDING,
+            )
+            payments.append(payment)
+            row.status, row.member_contribution, row.payment = BankStatementLine.Status.MATCHED, contribution, payment
+            report.matched += 1
+        elif len(found) > 1:
+            row.status = BankStatementLine.Status.AMBIGUOUS
+            report.ambiguous += 1
+        else:
+            row.status = BankStatementLine.Status.UNMATCHED
+            report.unmatched += 1
+        rows.append(row)
+
+    with transaction.atomic():
+        Payment.objects.bulk_create(payments)
+        BankStatementLine.objects.bulk_create(rows)
+        # as when a treasurer logs a deposit by hand (log_payment)
+        MemberContribution.objects.filter(
+            pk__in=[payment.member_contribution_id for payment in payments]
+        ).exclude(is_paid=PaymentStatus.PAID).update(is_paid=PaymentStatus.PENDING)
+
+
+def import_statement(statement_import, chunk_size=CHUNK_SIZE):
+    """Import `statement_import`.file and record the counts on it. Returns a BankImportReport."""
+    report = BankImportReport()
+    occurrences = Counter()
+    try:
+        with statement_import.file.open("rb") as fh:
+            text = io.TextIOWrapper(fh, encoding="utf-8-sig", errors="replace", newline="")
+            credits = _credit_lines(iter_statement(text, statement_import.file.name), report)
+            for chunk in _chunks(credits, chunk_size):
+                report.lines += len(chunk)
+                _import_chunk(statement_import, chunk, occurrences, report)
+    except StatementFormatError as e:
+        statement_import.status, statement_import.error = BankStatementImport.Status.FAILED, str(e)
+    else:
+        statement_import.status = BankStatementImport.Status.IMPORTED
+        statement_import.error = "\n".join(report.errors[:50]) or None
+    statement_import.lines, statement_import.matched = report.lines, report.matched
+    statement_import.unmatched, statement_import.ambiguous = report.unmatched, report.ambiguous
+    statement_import.duplicates = report.duplicates
+    statement_import.save()
+    transaction.on_commit(lambda: bump_version(MemberContribution, Payment))
+    logger.info("Bank statement %s imported: %s", statement_import.pk, report.summary())
+    return report
+
+
+def _credit_lines(lines, report):
+    for line in lines:
+        if isinstance(line, ValueError):
+            report.errors.append(str(line))
+        elif line.amount > 0:
+            yield line
+        else:
+            report.debits += 1
+
+
+def resolve_line(line, contribution, user):
+    """Review queue: record `line` as a PENDING payment for `contribution`."""
+    with transaction.atomic():
+        payment = Payment(
+            account_id=contribution.account_id,
+            contribution_type_id=contribution.contribution_type_id,
+            member_contribution=contribution,
+            amount=line.amount,
+            payment_method=PaymentMethod.BANK,
+            reference=contribution.reference,
+            receipt=line.bank_reference or None,
+            recorded_by=user,
+            is_approved=Payment.LogPaymentStatus.PENDING,
+        )
+        payment.save()
+        payment.update_member_contribution_status(PaymentStatus.PENDING)
+        line.status, line.member_contribution, line.payment = BankStatementLine.Status.RESOLVED, contribution, payment
+        line.save(update_fields=["status", "member_contribution", "payment", "updated"])
+    return payment
@@ -0,0 +1,181 @@
+"""
+PDF invoices (MemberContribution) and receipts (approved Payment).
+
+PDFs are rendered by WeasyPrint in a django-q worker and stored in private storage
+(bakgomong.storage), under a content hash of everything that appears on them:
+
+    pdfs/invoices/<contribution id>/<fingerprint>.pdf
+    pdfs/receipts/<payment id>/<fingerprint>.pdf
+
+A download looks up the file for the current fingerprint. If it exists it is served as is
+and nothing is re-rendered. If the amount, status, payments or the template changed, the
+fingerprint changes too: the old file is no longer found, a render is queued, and the
+superseded file is deleted once the new one is written. The files have no URL: they are
+served only by the permission-checked download views (contributions.views.pdf).
+"""
+import hashlib
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.template.loader import get_template, render_to_string
+from django_q.tasks import async_task
+
+from bakgomong.storage import get_private_storage
+
+logger = logging.getLogger("tasks")
+
+INVOICE_TEMPLATE = "member_inv/invoice_pdf.html"
+RECEIPT_TEMPLATE = "payments/receipt_pdf.html"
+PDF_ROOT = "pdfs"
+# a queued render is not queued again for this long (seconds)
+RENDER_LOCK_TIMEOUT = 120
+
+
+def _template_digest(template_name):
+    # editing the template changes every fingerprint, so old layouts are re-rendered too
+    template = get_template(template_name)
+    origin = getattr(getattr(template, "origin", None), "name", None)
+    try:
+        with open(origin, "rb") as fh:
+            return hashlib.md5(fh.read()).hexdigest()
+    except (OSError, TypeError):
+        return template_name
+
+
+def _digest(parts):
+    return hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _approved_payments(contribution):
+    from contributions.models import Payment
+
+    return list(
+        contribution.payments.filter(is_approved=Payment.LogPaymentStatus.APPROVED)
+        .order_by("created")
+        .values_list("id", "amount", "is_approved", "updated")
+    )
+
+
+def invoice_fingerprint(contribution, payments=None):
+    if payments is None:
+        payments = _approved_payments(contribution)
+    return _digest([
+        "invoice",
+        contribution.pk,
+        contribution.reference,
+        contribution.amount_due,
+        contribution.is_paid,
+        contribution.due_date,
+        contribution.updated.isoformat(),
+        contribution.account_id,
+        contribution.contribution_type_id,
+        *payments,
+        _template_digest(INVOICE_TEMPLATE),
+    ])
+
+
+def receipt_fingerprint(payment):
+    return _digest([
+        "receipt",
+        payment.pk,
+        payment.amount,
+        payment.is_approved,
+        payment.reference,
+        payment.receipt,
+        payment.payment_verified_date,
+        payment.updated.isoformat(),
+        payment.member_contribution_id,
+        _template_digest(RECEIPT_TEMPLATE),
+    ])
+
+
+def invoice_pdf_name(contribution, fingerprint=None):
+    fingerprint = fingerprint or invoice_fingerprint(contribution)
+    return posixpath.join(PDF_ROOT, "invoices", str(contribution.pk), f"{fingerprint}.pdf")
+
+
+def receipt_pdf_name(payment, fingerprint=None):
+    fingerprint = fingerprint or receipt_fingerprint(payment)
+    return posixpath.join(PDF_ROOT, "receipts", str(payment.pk), f"{fingerprint}.pdf")
+
+
+def render_pdf(template_name, context):
+    """HTML template -> PDF bytes. WeasyPrint is imported here: web processes never need it."""
+    from weasyprint import HTML
+
+    html = render_to_string(template_name, context)
+    return HTML(string=html, base_url=str(settings.BASE_DIR)).write_pdf()
+
+
+def _store(name, data):
+    """Write `name` and delete the superseded PDFs of the same object."""
+    storage = get_private_storage()
+    directory = posixpath.dirname(name)
+    if storage.exists(name):
+        storage.delete(name)
+    saved = storage.save(name, ContentFile(data))
+    try:
+        _, files = storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        files = []
+    for filename in files:
+        old = posixpath.join(directory, filename)
+        if old != saved and filename.endswith(".pdf"):
+            storage.delete(old)
+    return saved
+
+
+def invoice_context(contribution):
+    from contributions.models import Payment
+
+    payments = list(
+        contribution.payments.filter(is_approved=Payment.LogPaymentStatus.APPROVED).order_by("created")
+    )
+    total_paid = sum((payment.amount for payment in payments), 0)
+    return {
+        "contribution": contribution,
+        "member": contribution.account,
+        "payments": payments,
+        "total_paid": total_paid,
+        "balance": contribution.amount_due - total_paid,
+        "site_url": settings.SITE_URL,
+    }
+
+
+def receipt_context(payment):
+    return {
+        "payment": payment,
+        "member": payment.account,
+        "contribution": payment.member_contribution,
+        "site_url": settings.SITE_URL,
+    }
+
+
+def write_invoice_pdf(contribution, force=False):
+    """Render the invoice unless the PDF for its current fingerprint exists. Returns the name."""
+    name = invoice_pdf_name(contribution)
+    if not force and get_private_storage().exists(name):
+        return name
+    return _store(name, render_pdf(INVOICE_TEMPLATE, invoice_context(contribution)))
+
+
+def write_receipt_pdf(payment, force=False):
+    name = receipt_pdf_name(payment)
+    if not force and get_private_storage().exists(name):
+        return name
+    return _store(name, render_pdf(RECEIPT_TEMPLATE, receipt_context(payment)))
+
+
+def queue_render(task, name, pk):
+    """Queue `task`(pk) unless a render of `name` is already queued. True when queued."""
+    if not cache.add(f"pdf-render:{name}", 1, RENDER_LOCK_TIMEOUT):
+        return False
+    async_task(task, pk)
+    return True
+
+
+def release_render_lock(name):
+    cache.delete(f"pdf-render:{name}")
@@ -0,0 +1,202 @@
+"""
+Recurring contribution periods.
+
+A MONTHLY or ANNUAL ContributionType gets its first period from the post_save signal
+(contributions.signals). generate_periods() adds the following ones: once a type's
+latest period has fallen due, the next period (anchored on the type's first due date, so
+month ends do not drift) is created for every eligible member who does not have it yet.
+Types whose latest period is still in the future are not touched.
+
+Rows are inserted in batches, and only conflicts on unique_together (account,
+contribution_type, due_date) skip a row: before each insert the rows whose period exists
+by now are dropped, so overlapping or repeated runs never create duplicates, and rows whose
+generated reference is taken get a new one instead of being lost. (A blanket ON CONFLICT DO
+NOTHING would drop those too, and on a partitioned table the keys table's trigger raises on
+a taken reference anyway.) A batch a concurrent run beats to a period or a reference fails
+as a whole, inside a savepoint, and is settled and inserted again.
+"""
+import logging
+
+from dateutil.relativedelta import relativedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from accounts.models import Account
+from accounts.utils.abstracts import PaymentStatus, Role
+from bakgomong.cache import bump_version
+from contributions.models import ContributionType, MemberContribution, SCOPE_CHOICES
+from contributions.utils.sms import generate_reference
+
+logger = logging.getLogger("contributions")
+
+BATCH_SIZE = 1000
+# inserts of one batch that a concurrent run may beat before the error is raised
+INSERT_ATTEMPTS = 3
+# never create more than this many missed periods of one type in a single run
+MAX_CATCH_UP = 12
+RECURRENCE_STEPS = {
+    ContributionType.Recurrence.MONTHLY: relativedelta(months=1),
+    ContributionType.Recurrence.ANNUAL: relativedelta(years=1),
+}
+EXECUTIVE_ROLES = [
+    Role.CLAN_CHAIRPERSON,
+    Role.DEP_CHAIRPERSON,
+    Role.DEP_SECRETARY,
+    Role.KGOSANA,
+    Role.SECRETARY,
+    Role.TREASURER,
+    Role.FAMILY_LEADER,
+]
+
+
+def eligible_members(contribution_type):
+    """Active, approved accounts a contribution type applies to, by its scope."""
+    members = Account.objects.filter(is_active=True, is_approved=True)
+    scope = contribution_type.scope
+    if scope == SCOPE_CHOICES.CLAN:
+        return members
+    if scope == SCOPE_CHOICES.FAMILY and contribution_type.family_id:
+        return members.filter(family_id=contribution_type.family_id)
+    if scope == SCOPE_CHOICES.FAMILY_LEADERS:
+        return members.filter(role=Role.FAMILY_LEADER)
+    if scope == SCOPE_CHOICES.EXECUTIVES:
+        return members.filter(role__in=EXECUTIVE_ROLES)
+    logger.warning("Unknown scope for ContributionType %s: %s", contribution_type.id, scope)
+    return Account.objects.none()
+
+
+def next_due_date(anchor, latest, recurrence):
+    """First date after `latest` in the series anchor, anchor + step, anchor + 2 steps, ..."""
+    step = RECURRENCE_STEPS[recurrence]
+    n = 1
+    while anchor + step * n <= latest:
+        n += 1
+    return anchor + step * n
+
+
+def due_periods(today=None):
+    """
+    (contribution type, due date) pairs to create: for every active recurring type whose
+    latest period is due, the periods after it up to and including the one due next.
+    One grouped query over all types.
+    """
+    today = today or timezone.now().date()
+    types = {
+        t.pk: t for t in ContributionType.objects.filter(is_active=True, recurrence__in=list(RECURRENCE_STEPS))
+    }
+    if not types:
+        return []
+    series = (
+        MemberContribution.objects
+        .filter(contribution_type_id__in=list(types), due_date__isnull=False)
+        .values("contribution_type_id")
+        .annotate(anchor=Min("due_date"), latest=Max("due_date"))
+        .filter(latest__lte=today)
+    )
+    periods = []
+    for row in series:
+        contribution_type = types[row["contribution_type_id"]]
+        latest = row["latest"]
+        for _ in range(MAX_CATCH_UP):
+            latest = next_due_date(row["anchor"], latest, contribution_type.recurrence)
+            periods.append((contribution_type, latest))
+            if latest > today:
+                break
+    return periods
+
+
+def create_period(contribution_type, due_date, notify=True):
+    """Create the `due_date` period of `contribution_type` for the members missing it."""
+    already = MemberContribution.objects.filter(
+        account=OuterRef("pk"), contribution_type=contribution_type, due_date=due_date,
+    )
+    members = eligible_members(contribution_type).filter(~Exists(already)).values_list("pk", flat=True)
+
+    created = 0
+    batch = []
+    for account_id in members.iterator(chunk_size=BATCH_SIZE):
+        batch.append(MemberContribution(
+            account_id=account_id,
+            contribution_type=contribution_type,
+            amount_due=contribution_type.amount,
+            reference=generate_reference(),
+            due_date=due_date,
+            is_paid=PaymentStatus.NOT_PAID,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            created += _insert(batch, notify)
+            batch = []
+    if batch:
+        created += _insert(batch, notify)
+    return created
+
+
+def _settle(batch):
+    """
+    Drop the rows of `batch` whose period exists and give the rows whose reference is taken
+    (in the table or earlier in the batch) a new one. Returns (rows, references regenerated).
+    """
+    existing = set(
+        MemberContribution.objects.filter(
+            account_id__in={mc.account_id for mc in batch},
+            contribution_type_id__in={mc.contribution_type_id for mc in batch},
+            due_date__in={mc.due_date for mc in batch},
+        ).values_list("account_id", "contribution_type_id", "due_date")
+    )
+    rows = [mc for mc in batch if (mc.account_id, mc.contribution_type_id, mc.due_date) not in existing]
+
+    regenerated = 0
+    colliding = rows
+    while colliding:
+        taken = set(
+            MemberContribution.objects.filter(reference__in=[mc.reference for mc in colliding])
+            .values_list("reference", flat=True)
+        )
+        seen = set()
+        colliding = []
+        for mc in rows:
+            if mc.reference in taken or mc.reference in seen:
+                mc.reference = generate_reference()
+                colliding.append(mc)
+            seen.add(mc.reference)
+        regenerated += len(colliding)
+    return rows, regenerated
+
+
+def _insert(batch, notify):
+    regenerated = 0
+    for attempt in range(1, INSERT_ATTEMPTS + 1):
+        batch, fresh = _settle(batch)
+        regenerated += fresh
+        try:
+            with transaction.atomic():
+                MemberContribution.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            break
+        except IntegrityError:
+            # a concurrent run took one of the periods or references since _settle()
+            if attempt == INSERT_ATTEMPTS:
+                raise
+            logger.warning("Contribution batch of %d rows collided, settling it again", len(batch))
+    if regenerated:
+        logger.warning("Regenerated %d colliding contribution references", regenerated)
+    if notify:
+        for mc in batch:
+            async_task("contributions.tasks.send_contribution_created_notification_task", mc.id)
+    return len(batch)
+
+
+def generate_periods(today=None, notify=True):
+    """Create every recurring period that is due. Returns {(type name, due date): rows created}."""
+    results = {}
+    for contribution_type, due_date in due_periods(today):
+        created = create_period(contribution_type, due_date, notify=notify)
+        results[(contribution_type.name, due_date)] = created
+        logger.info(
+            "Recurring period %s of ContributionType %s: %d contributions created",
+            due_date, contribution_type.id, created,
+        )
+    if any(results.values()):
+        bump_version(MemberContribution)
+    return results
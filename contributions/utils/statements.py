@@ -0,0 +1,277 @@
+"""
+Monthly member statements (`manage.py generate_statements --period YYYY-MM`).
+
+Members are processed in chunks of account ids. Each chunk costs two grouped queries
+(every contribution up to the period end with its approved payments summed, and the
+payments made in the period), whatever the chunk size. Rendering is CPU-bound, so the
+PDFs of a chunk are rendered across a process pool; the parent process then stores them
+and mails them over one SMTP connection per chunk.
+
+Every member gets a MemberStatement row whose status records how far it got, so an
+interrupted run can simply be started again: sent statements are skipped and rendered
+but unsent ones are only mailed.
+"""
+import calendar
+import datetime
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.mail import get_connection
+from django.db.models import DecimalField, Exists, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounts.utils import custom_mail
+from accounts.utils.processes import process_pool
+from contributions.models import MemberContribution, MemberStatement, Payment
+from contributions.utils.pdf import render_pdf
+
+logger = logging.getLogger("tasks")
+
+STATEMENT_TEMPLATE = "member_inv/statement_pdf.html"
+STATEMENT_EMAIL_TEMPLATE = "emails/monthly-statement.html"
+CHUNK_SIZE = 200
+# below this many statements in a chunk the pool start-up costs more than it saves
+RENDER_POOL_THRESHOLD = 8
+RENDER_CHUNK_SIZE = 4
+DONE_STATUSES = (MemberStatement.Status.SENT, MemberStatement.Status.SKIPPED)
+
+
+@dataclass
+class StatementReport:
+    period: datetime.date
+    accounts: int = 0
+    already_done: int = 0
+    rendered: int = 0
+    sent: int = 0
+    skipped: int = 0
+    unsent: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def processed(self):
+        return self.already_done + self.sent + self.skipped + self.unsent + self.failed
+
+    def summary(self):
+        return (
+            f"{self.period:%Y-%m}: {self.processed}/{self.accounts} members; "
+            f"rendered: {self.rendered}, sent: {self.sent}, no email: {self.skipped}, "
+            f"not mailed: {self.unsent}, already done: {self.already_done}, failed: {self.failed}"
+        )
+
+
+def parse_period(value):
+    """'YYYY-MM' -> (first day, last day) of that month. Raises ValueError."""
+    start = datetime.datetime.strptime(value, "%Y-%m").date()
+    end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    return start, end
+
+
+def statement_accounts(start, end):
+    """Active members with at least one contribution up to the end of the period."""
+    has_contributions = MemberContribution.objects.filter(account=OuterRef("pk")).filter(
+        Q(due_date__lte=end) | Q(due_date__isnull=True, created__date__lte=end)
+    )
+    return get_user_model().objects.filter(Exists(has_contributions), is_active=True).order_by("pk")
+
+
+def _in_period(row, start, end):
+    day = row["due_date"] or row["created"].date()
+    return start <= day <= end
+
+
+def build_payloads(accounts, start, end):
+    """
+    Plain, picklable statement data for `accounts`, from two grouped queries.
+    Returns {account id: payload}.
+    """
+    ids = [account.pk for account in accounts]
+    zero = Value(Decimal("0"), output_field=DecimalField(max_digits=12, decimal_places=2))
+    contributions = (
+        MemberContribution.objects
+        .filter(account_id__in=ids)
+        .filter(Q(due_date__lte=end) | Q(due_date__isnull=True, created__date__lte=end))
+        .annotate(paid=Coalesce(Sum(
+            "payments__amount",
+            filter=Q(payments__is_approved=Payment.LogPaymentStatus.APPROVED, payments__payment_date__lte=end),
+        ), zero))
+        .order_by("account_id", "due_date", "created")
+        .values("account_id", "reference", "contribution_type__name", "due_date", "created", "amount_due", "is_paid", "paid")
+    )
+    payments = (
+        Payment.objects
+        .paid_between(start, end)
+        .filter(account_id__in=ids, is_approved=Payment.LogPaymentStatus.APPROVED)
+        .order_by("account_id", "payment_date")
+        .values("account_id", "payment_date", "reference", "receipt", "amount", "payment_method",
+                "member_contribution__contribution_type__name")
+    )
+
+    payloads = {
+        account.pk: {
+            "account_id": account.pk,
+            "name": account.get_full_name() or account.username,
+            "email": account.email,
+            "period": start,
+            "period_end": end,
+            "contributions": [],
+            "payments": [],
+            "total_due": Decimal("0"),
+            "total_paid": Decimal("0"),
+            "balance": Decimal("0"),
+            "site_url": settings.SITE_URL,
+        }
+        for account in accounts
+    }
+    for row in contributions:
+        payload = payloads[row["account_id"]]
+        payload["balance"] += row["amount_due"] - row["paid"]
+        if _in_period(row, start, end):
+            payload["contributions"].append({
+                "reference": row["reference"],
+                "name": row["contribution_type__name"],
+                "due_date": row["due_date"],
+                "amount_due": row["amount_due"],
+                "paid": row["paid"],
+                "status": row["is_paid"],
+            })
+            payload["total_due"] += row["amount_due"]
+    for row in payments:
+        payload = payloads[row["account_id"]]
+        payload["payments"].append({
+            "date": row["payment_date"],
+            "reference": row["reference"] or row["receipt"],
+            "amount": row["amount"],
+            "method": row["payment_method"],
+            "name": row["member_contribution__contribution_type__name"],
+        })
+        payload["total_paid"] += row["amount"]
+    return payloads
+
+
+def render_statement_pdf(payload):
+    """Runs in a pool worker: payload -> (account id, PDF bytes or None, error or None)."""
+    try:
+        return payload["account_id"], render_pdf(STATEMENT_TEMPLATE, payload), None
+    except Exception as e:
+        return payload["account_id"], None, f"{type(e).__name__}: {e}"
+
+
+def _render_all(payloads, pool):
+    if pool is None or len(payloads) < RENDER_POOL_THRESHOLD:
+        return [render_statement_pdf(payload) for payload in payloads]
+    return list(pool.map(render_statement_pdf, payloads, chunksize=RENDER_CHUNK_SIZE))
+
+
+def _send(payload, pdf_bytes, connection):
+    html = render_to_string(STATEMENT_EMAIL_TEMPLATE, payload)
+    return custom_mail.send_html_email_with_attachments(
+        to_email=payload["email"],
+        subject=f"BAKGOMONG | Statement for {payload['period']:%B %Y}",
+        html_content=html,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        attachments=[{"filename": f"statement-{payload['period']:%Y-%m}.pdf", "file_content": pdf_bytes}],
+        connection=connection,
+    )
+
+
+def _process_chunk(accounts, start, end, report, pool, send, force):
+    existing = {
+        statement.account_id: statement
+        for statement in MemberStatement.objects.filter(account__in=accounts, period=start).select_related("account")
+    }
+    todo, resend = [], []
+    for account in accounts:
+        statement = existing.get(account.pk)
+        if statement and not force:
+            if statement.status in DONE_STATUSES:
+                report.already_done += 1
+                continue
+            if statement.status == MemberStatement.Status.RENDERED and statement.pdf:
+                resend.append(statement)
+                continue
+        todo.append(account)
+
+    # statements rendered by an earlier, interrupted run only need mailing
+    payloads = build_payloads(todo + [statement.account for statement in resend], start, end)
+
+    results = []
+    for account_id, pdf_bytes, error in _render_all([payloads[account.pk] for account in todo], pool):
+        payload = payloads[account_id]
+        statement = existing.get(account_id) or MemberStatement(account_id=account_id, period=start)
+        statement.total_due, statement.total_paid, statement.balance = (
+            payload["total_due"], payload["total_paid"], payload["balance"],
+        )
+        if error:
+            statement.status, statement.error = MemberStatement.Status.FAILED, error
+            statement.save()
+            report.failed += 1
+            report.errors.append((account_id, error))
+            continue
+        if statement.pdf:
+            statement.pdf.delete(save=False)
+        statement.pdf.save(f"{start:%Y-%m}-{account_id}.pdf", ContentFile(pdf_bytes), save=False)
+        statement.status, statement.error = MemberStatement.Status.RENDERED, None
+        statement.save()
+        report.rendered += 1
+        results.append((statement, pdf_bytes))
+    for statement in resend:
+        with statement.pdf.open("rb") as fh:
+            results.append((statement, fh.read()))
+
+    if not send:
+        report.unsent += len(results)
+        return
+    connection = get_connection()
+    try:
+        connection.open()
+        for statement, pdf_bytes in results:
+            payload = payloads[statement.account_id]
+            if not payload["email"]:
+                statement.status = MemberStatement.Status.SKIPPED
+                report.skipped += 1
+            elif _send(payload, pdf_bytes, connection):
+                statement.status, statement.sent_at = MemberStatement.Status.SENT, timezone.now()
+                report.sent += 1
+            else:
+                # left RENDERED: the next run mails it again
+                report.unsent += 1
+                continue
+            statement.save(update_fields=["status", "sent_at", "updated"])
+    finally:
+        connection.close()
+
+
+def generate_statements(period, workers=None, chunk_size=CHUNK_SIZE, send=True, force=False, progress=None):
+    """
+    Render (and by default mail) every member's statement for `period` ('YYYY-MM').
+    `progress(report)` is called after each chunk. Returns a StatementReport.
+    """
+    start, end = parse_period(period)
+    report = StatementReport(period=start)
+    accounts = statement_accounts(start, end).only("pk", "username", "first_name", "last_name", "email")
+    report.accounts = accounts.count()
+
+    pool = None if workers == 1 else process_pool(workers)
+    try:
+        last_pk = None
+        while True:
+            chunk = accounts if last_pk is None else accounts.filter(pk__gt=last_pk)
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            _process_chunk(chunk, start, end, report, pool, send, force)
+            if progress:
+                progress(report)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    logger.info("generate_statements %s", report.summary())
+    return report
@@ -0,0 +1,185 @@
+"""
+Payment gateway webhooks (Yoco).
+
+The webhook view verifies the signature, stores the raw event in WebhookEvent and
+answers straight away. A retried delivery carries the same event id and is dropped by
+the (provider, event_id) unique constraint. process_events() then applies stored events
+in batches in a django-q task. An event names its payment by the Yoco checkout id that
+contributions.utils.yoco stored in Payment.checkout_id, and by the paymentId metadata of
+that checkout (which still finds the payment when it was retried with a new checkout).
+Each batch resolves its payments with one query, and each event runs in its own
+savepoint, so one bad event only marks itself FAILED. FAILED events are retried by the scheduled sweep, up to MAX_ATTEMPTS.
+
+Yoco signs deliveries the Standard Webhooks way: base64 HMAC-SHA256, keyed with the
+base64 part of the `whsec_` secret, over "<webhook-id>.<webhook-timestamp>.<raw body>".
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from contributions.models import Payment, WebhookEvent
+
+logger = logging.getLogger("tasks")
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+# deliveries signed longer ago than this (seconds) are rejected as replays
+SIGNATURE_TOLERANCE = 300
+# a queued processing task is not queued again for this long (seconds)
+PROCESS_LOCK_TIMEOUT = 60
+PROCESS_LOCK = "webhook-process"
+
+YOCO_SUCCEEDED = "payment.succeeded"
+YOCO_FAILED = "payment.failed"
+
+
+def verify_yoco_signature(secret, headers, body, now=None):
+    """True when `body` (bytes) carries a valid, recent Yoco signature."""
+    webhook_id = headers.get("webhook-id", "")
+    timestamp = headers.get("webhook-timestamp", "")
+    signatures = headers.get("webhook-signature", "")
+    if not (secret and webhook_id and timestamp and signatures):
+        return False
+    try:
+        if abs((now or time.time()) - int(timestamp)) > SIGNATURE_TOLERANCE:
+            return False
+        key = base64.b64decode(secret.split("_", 1)[1] if secret.startswith("whsec_") else secret)
+    except (ValueError, TypeError):
+        return False
+    signed = f"{webhook_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+    # "v1,<sig> v1,<sig>": several while a secret is being rotated
+    return any(
+        hmac.compare_digest(candidate.partition(",")[2], expected)
+        for candidate in signatures.split()
+    )
+
+
+def record_event(provider, event_id, event_type, payload):
+    """Store an event. Returns False when it was already received (a retry)."""
+    try:
+        with transaction.atomic():
+            WebhookEvent.objects.create(provider=provider, event_id=event_id, event_type=event_type, payload=payload)
+    except IntegrityError:
+        return False
+    return True
+
+
+def queue_processing():
+    """Queue process_webhook_events_task unless one is already queued."""
+    if cache.add(PROCESS_LOCK, 1, PROCESS_LOCK_TIMEOUT):
+        async_task("contributions.tasks.process_webhook_events_task")
+
+
+def release_processing_lock():
+    cache.delete(PROCESS_LOCK)
+
+
+def _metadata(event):
+    return (event.payload.get("payload") or {}).get("metadata") or {}
+
+
+def _checkout_id(event):
+    return _metadata(event).get("checkoutId")
+
+
+def _payment_id(event):
+    try:
+        return uuid.UUID(str(_metadata(event).get("paymentId")))
+    except ValueError:
+        return None
+
+
+def resolve_payments(events):
+    """{checkout id or payment id: Payment} for the payments `events` refer to. One query."""
+    checkout_ids = {_checkout_id(event) for event in events} - {None}
+    payment_ids = {_payment_id(event) for event in events} - {None}
+    payments = {}
+    for payment in Payment.objects.filter(Q(checkout_id__in=checkout_ids) | Q(pk__in=payment_ids)).select_related("member_contribution"):
+        payments[payment.pk] = payment
+        if payment.checkout_id:
+            payments[payment.checkout_id] = payment
+    return payments
+
+
+def apply_yoco_event(event, payments):
+    """Apply one Yoco event. `payments` is resolve_payments() of its batch. Returns the new status."""
+    if event.event_type not in (YOCO_SUCCEEDED, YOCO_FAILED):
+        return WebhookEvent.Status.IGNORED
+    data = event.payload.get("payload") or {}
+    transaction_id = data.get("id")
+    payment = payments.get(_checkout_id(event)) or payments.get(_payment_id(event))
+    if payment is None:
+        # the checkout row may not be committed yet: retried by the sweep
+        raise LookupError(f"no payment for checkout {_checkout_id(event)}")
+
+    if event.event_type == YOCO_FAILED:
+        if payment.is_approved == Payment.LogPaymentStatus.APPROVED:
+            return WebhookEvent.Status.IGNORED
+        payment.is_approved = Payment.LogPaymentStatus.REJECTED
+        payment.rejection_reason = (data.get("failureReason") or "Card payment failed")[:500]
+        payment.save()
+        return WebhookEvent.Status.PROCESSED
+
+    if payment.gateway_transaction_id == transaction_id and payment.is_approved == Payment.LogPaymentStatus.APPROVED:
+        return WebhookEvent.Status.IGNORED
+    # Yoco amounts are in cents
+    paid = Decimal(data.get("amount") or 0) / 100
+    if paid != payment.amount:
+        raise ValueError(f"amount {paid} does not match payment {payment.pk} amount {payment.amount}")
+    card = (data.get("paymentMethodDetails") or {}).get("card") or {}
+    payment.gateway_transaction_id = transaction_id
+    payment.payment_method_type = (data.get("paymentMethodDetails") or {}).get("type") or payment.payment_method_type
+    payment.payment_method_masked_card = card.get("maskedCard") or payment.payment_method_masked_card
+    payment.payment_method_scheme = card.get("scheme") or payment.payment_method_scheme
+    payment.is_approved = Payment.LogPaymentStatus.APPROVED
+    payment.payment_verified_date = timezone.now()
+    payment.rejection_reason = None
+    payment.save()
+    return WebhookEvent.Status.PROCESSED
+
+
+def process_events(batch_size=BATCH_SIZE, retry_failed=False):
+    """Apply every pending event (and FAILED ones when `retry_failed`). Returns the count."""
+    pending = Q(status=WebhookEvent.Status.RECEIVED)
+    if retry_failed:
+        pending |= Q(status=WebhookEvent.Status.FAILED, attempts__lt=MAX_ATTEMPTS)
+    events_qs = WebhookEvent.objects.filter(pending, provider=WebhookEvent.Provider.YOCO).order_by("created", "pk")
+
+    processed = 0
+    last = None
+    while True:
+        with transaction.atomic():
+            batch = events_qs
+            if last is not None:
+                batch = batch.filter(Q(created__gt=last[0]) | Q(created=last[0], pk__gt=last[1]))
+            events = list(batch.select_for_update(skip_locked=True)[:batch_size])
+            if not events:
+                break
+            last = (events[-1].created, events[-1].pk)
+            payments = resolve_payments(events)
+            now = timezone.now()
+            for event in events:
+                try:
+                    with transaction.atomic():
+                        event.status, event.error = apply_yoco_event(event, payments), None
+                except Exception as e:
+                    logger.warning("Webhook event %s failed: %s", event.event_id, e)
+                    event.status, event.error = WebhookEvent.Status.FAILED, f"{type(e).__name__}: {e}"
+                event.attempts += 1
+                event.processed_at = now
+            WebhookEvent.objects.bulk_update(events, ["status", "error", "attempts", "processed_at"])
+        processed += len(events)
+    if processed:
+        logger.info("Processed %d webhook events", processed)
+    return processed
@@ -0,0 +1,50 @@
+"""
+Yoco Checkout API: card payments on Yoco's hosted payment page.
+
+create_checkout() opens a checkout for a pending Payment and stores the checkout's id in
+Payment.checkout_id. Yoco puts that id (metadata.checkoutId), next to the checkout's own
+metadata (our paymentId), into the payment.succeeded / payment.failed webhook events;
+contributions.utils.webhooks resolves the events back to the Payment with them.
+"""
+import logging
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger("contributions")
+
+CHECKOUT_URL = "https://payments.yoco.com/api/checkouts"
+
+
+class CheckoutError(Exception):
+    pass
+
+
+def create_checkout(payment, success_url, cancel_url, failure_url):
+    """Open a Yoco checkout for `payment` and remember its id. Returns the URL to send the payer to."""
+    secret_key = getattr(settings, "YOCO_SECRET_KEY", "")
+    if not secret_key:
+        raise CheckoutError("YOCO_SECRET_KEY is not configured")
+    payload = {
+        # Yoco amounts are in cents
+        "amount": int((payment.amount * 100).to_integral_value()),
+        "currency": "ZAR",
+        "successUrl": success_url,
+        "cancelUrl": cancel_url,
+        "failureUrl": failure_url,
+        "metadata": {"paymentId": str(payment.pk), "reference": payment.reference or ""},
+    }
+    headers = {"Authorization": f"Bearer {secret_key}"}
+    try:
+        response = requests.post(CHECKOUT_URL, json=payload, headers=headers, timeout=10)
+        response.raise_for_status()
+        checkout = response.json()
+        checkout_id, redirect_url = checkout["id"], checkout["redirectUrl"]
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        raise CheckoutError(f"Yoco checkout for payment {payment.pk} failed: {e}") from e
+
+    # a new checkout replaces an abandoned one; events of the old one still carry paymentId
+    payment.checkout_id = checkout_id
+    payment.save(update_fields=["checkout_id", "updated"])
+    logger.info("Yoco checkout %s opened for payment %s", checkout_id, payment.pk)
+    return redirect_url
@@ -0,0 +1,92 @@
+import logging
+import posixpath
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.http import FileResponse, HttpResponseForbidden
+from django.shortcuts import get_object_or_404, redirect, render
+from django_q.tasks import async_task
+
+from contributions.forms import BankStatementUploadForm
+from contributions.utils.bank_import import resolve_line
+from .member_contr import is_treasurer_or_admin
+from ..models import BankStatementImport, BankStatementLine, MemberContribution
+
+logger = logging.getLogger("contributions")
+
+REVIEW_STATUSES = (BankStatementLine.Status.UNMATCHED, BankStatementLine.Status.AMBIGUOUS)
+
+
+@login_required
+def bank_imports(request):
+    """Upload a bank statement (imported in the background) and list earlier imports."""
+    if not is_treasurer_or_admin(request.user):
+        return HttpResponseForbidden("Only treasurers can import bank statements.")
+
+    if request.method == "POST":
+        form = BankStatementUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            statement_import = BankStatementImport.objects.create(file=upload, original_name=upload.name[:255], uploaded_by=request.user)
+            async_task("contributions.tasks.import_bank_statement_task", statement_import.pk)
+            logger.info("Bank statement %s uploaded by %s", statement_import.pk, request.user.username)
+            messages.success(request, "Statement uploaded. Matched deposits appear as pending payments once the import completes.")
+            return redirect("contributions:bank-imports")
+        messages.error(request, "Please fix the errors below.")
+    else:
+        form = BankStatementUploadForm()
+
+    imports = BankStatementImport.objects.select_related("uploaded_by")[:20]
+    return render(request, "payments/bank-imports.html", {"form": form, "imports": imports})
+
+
+@login_required
+def bank_import_review(request, id):
+    """
+    Review queue of one import: lines without a single matching contribution. A treasurer
+    assigns a contribution reference (recorded as a pending payment) or ignores the line.
+    """
+    if not is_treasurer_or_admin(request.user):
+        return HttpResponseForbidden("Only treasurers can review bank statements.")
+    statement_import = get_object_or_404(BankStatementImport, id=id)
+
+    if request.method == "POST":
+        line = get_object_or_404(BankStatementLine, id=request.POST.get("line"), statement_import=statement_import, status__in=REVIEW_STATUSES)
+        if request.POST.get("action") == "ignore":
+            line.status = BankStatementLine.Status.IGNORED
+            line.save(update_fields=["status", "updated"])
+            messages.info(request, f"Line {line.line_number} ignored.")
+        else:
+            reference = request.POST.get("reference", "").strip().upper()
+            contribution = MemberContribution.objects.find(reference=reference).first()
+            if contribution is None:
+                messages.error(request, f"No contribution with reference {reference or '(blank)'}.")
+            else:
+                resolve_line(line, contribution, request.user)
+                logger.info("Bank line %s resolved to %s by %s", line.pk, reference, request.user.username)
+                messages.success(request, f"Line {line.line_number} recorded as a pending payment for {reference}.")
+        return redirect(request.get_full_path())
+
+    lines = statement_import.statement_lines.filter(status__in=REVIEW_STATUSES).order_by("line_number")
+    paginator = Paginator(lines, 50)
+    page = request.GET.get("page", 1)
+    try:
+        lines_page = paginator.page(page)
+    except (PageNotAnInteger, EmptyPage):
+        lines_page = paginator.page(1)
+
+    context = {
+        "statement_import": statement_import,
+        "lines": lines_page,
+    }
+    return render(request, "payments/bank-import-review.html", context)
+
+
+@login_required
+def download_bank_statement(request, id):
+    """The uploaded statement file, from private storage."""
+    if not is_treasurer_or_admin(request.user):
+        return HttpResponseForbidden("Only treasurers can download bank statements.")
+    statement_import = get_object_or_404(BankStatementImport, id=id)
+    filename = statement_import.original_name or posixpath.basename(statement_import.file.name)
+    return FileResponse(statement_import.file.open("rb"), as_attachment=True, filename=filename)
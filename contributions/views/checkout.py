@@ -8,6 +8,7 @@ from django_q.tasks import async_task
 from django.conf import settings
 from contributions.forms import LogPaymentForm, PaymentCheckoutForm
 from ..models import ContributionType, MemberContribution, Payment
+from contributions.utils.yoco import CheckoutError, create_checkout
 from accounts.utils.abstracts import PaymentStatus, Role
 
 logger = logging.getLogger("contributions")
@@ -17,7 +18,7 @@ logger = logging.getLogger("contributions")
 def checkout(request, id):
     user = request.user
     
-    member_contribution = get_object_or_404(MemberContribution, id=id)
+    member_contribution = get_object_or_404(MemberContribution.objects.find(id=id))
     contribution_type = member_contribution.contribution_type
 
     # Only allow users to pay their own contributions (or staff/admin)
@@ -104,83 +105,32 @@ def checkout(request, id):
 @login_required
 def yoco_checkout(request, payment_id):
     """
-    Yoco payment page. Build checkout UI and handle Yoco API calls.
-    Yoco will callback to yoco_callback on success/failure.
+    Send the payer to a Yoco hosted checkout for a pending card payment.
+    Yoco reports the outcome to the yoco_webhook endpoint (views/webhooks.py).
     """
-    payment = get_object_or_404(Payment, id=payment_id, account=request.user)
+    payment = get_object_or_404(Payment.objects.find(id=payment_id), account=request.user)
     member_contribution = payment.member_contribution
 
     if not member_contribution:
         messages.error(request, "Invalid payment record.")
         return redirect("contributions:member-contributions")
+    if payment.is_approved != Payment.LogPaymentStatus.PENDING:
+        messages.info(request, "This payment has already been processed.")
+        return redirect("contributions:member-contribution", id=member_contribution.id)
 
-    context = {
-        "payment": payment,
-        "member_contribution": member_contribution,
-        "amount": member_contribution.amount_due,
-        "yoco_public_key": getattr(settings, "YOCO_PUBLIC_KEY", ""),
-        "reference": member_contribution.reference,
-    }
-    return render(request, "payments/yoco-checkout.html", context)
-
-
-@login_required
-def yoco_callback(request):
-    """
-    Yoco callback endpoint. Handle success/failure response from Yoco.
-    Yoco will POST transactionId, status, etc. Verify and update Payment record.
-    """
-    import hmac
-    import hashlib
-
+    contribution_url = request.build_absolute_uri(reverse("contributions:member-contribution", args=[member_contribution.id]))
     try:
-        yoco_transaction_id = request.POST.get("transactionId")
-        yoco_status = request.POST.get("status", "").lower()  # e.g., "success", "failed"
-        yoco_signature = request.POST.get("signature")
-
-        if not yoco_transaction_id or not yoco_status:
-            logger.warning("Yoco callback missing transactionId or status")
-            return render(request, "payments/yoco-callback-error.html", {"error": "Invalid callback data"}, status=400)
-
-        # Verify Yoco signature (optional but recommended)
-        secret = getattr(settings, "YOCO_SECRET_KEY", "")
-        if secret and yoco_signature:
-            expected_sig = hmac.new(
-                secret.encode(),
-                f"{yoco_transaction_id}{yoco_status}".encode(),
-                hashlib.sha256
-            ).hexdigest()
-            if not hmac.compare_digest(yoco_signature, expected_sig):
-                logger.error("Yoco callback signature mismatch for %s", yoco_transaction_id)
-                return render(request, "payments/yoco-callback-error.html", {"error": "Signature verification failed"}, status=403)
-
-        # Find payment by transaction reference (or query Yoco API to confirm)
-        payment = Payment.objects.filter(payment_method_masked_card=yoco_transaction_id).first()
-        if not payment:
-            logger.warning("Yoco callback: no matching payment for transaction %s", yoco_transaction_id)
-            return render(request, "payments/yoco-callback-error.html", {"error": "Payment not found"}, status=404)
-
-        with transaction.atomic():
-            if yoco_status == "success":
-                payment.payment_method_masked_card = yoco_transaction_id
-                payment.save()
-                if payment.member_contribution:
-                    payment.update_member_contribution_status(PaymentStatus.PAID)
-                logger.info("Yoco payment successful for %s (txn: %s)", payment.account.username, yoco_transaction_id)
-                messages.success(request, f"Payment of R{payment.member_contribution.amount_due:.2f} completed successfully!")
-                return redirect("contributions:member-contribution", id=payment.member_contribution.id)
-            else:
-                payment.payment_method_masked_card = yoco_transaction_id
-                if payment.member_contribution:
-                    payment.update_member_contribution_status(PaymentStatus.NOT_PAID)
-                payment.save()
-                logger.warning("Yoco payment failed for %s (txn: %s, status: %s)", payment.account.username, yoco_transaction_id, yoco_status)
-                messages.error(request, "Payment failed. Please try again or contact support.")
-                return redirect("contributions:checkout", id=payment.member_contribution.id)
-
-    except Exception as e:
-        logger.exception("Yoco callback error")
-        return render(request, "payments/yoco-callback-error.html", {"error": "An error occurred"}, status=500)
+        redirect_url = create_checkout(
+            payment,
+            success_url=contribution_url,
+            cancel_url=request.build_absolute_uri(reverse("contributions:checkout", args=[member_contribution.id])),
+            failure_url=contribution_url,
+        )
+    except CheckoutError:
+        logger.exception("Could not open a Yoco checkout for payment %s", payment.id)
+        messages.error(request, "The card payment page is unavailable. Please try again later.")
+        return redirect("contributions:member-contribution", id=member_contribution.id)
+    return redirect(redirect_url)
 
 
 from ..forms import LogPaymentForm
@@ -196,7 +146,7 @@ def log_payment(request, id):
         messages.error(request, "Only treasurers can log payments.")
         return redirect("contributions:member-contributions")
 
-    member_contribution = get_object_or_404(MemberContribution, id=id)
+    member_contribution = get_object_or_404(MemberContribution.objects.find(id=id))
     contribution_type = member_contribution.contribution_type
 
     if request.method == "POST":
@@ -9,6 +9,7 @@ from django_q.tasks import async_task
 from contributions.models import ContributionType, MemberContribution, Payment
 from contributions.forms import ContributionTypeForm
 from accounts.utils.abstracts import PaymentStatus, Role
+from bakgomong.db_router import read_from_replica
 
 logger = logging.getLogger("contributions")
 
@@ -19,6 +20,7 @@ def is_treasurer_or_admin(user):
 
 
 @login_required
+@read_from_replica()
 def get_contributions(request):
     """List all active contributions."""
     contributions = ContributionType.objects.all().order_by("-created")
@@ -26,6 +28,7 @@ def get_contributions(request):
 
 
 @login_required
+@read_from_replica()
 def get_contribution(request, contribution_slug):
     """
     Display contribution details: total collected, outstanding, by family.
@@ -1,6 +1,8 @@
 # contributions/views.py
+import asyncio
 import logging
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
@@ -9,9 +11,11 @@ from django_q.tasks import async_task
 
 from accounts.models import Family
 from accounts.utils.abstracts import Role, PaymentStatus
-from ..models import MemberContribution
+from ..models import MemberContribution, Payment
 from ..forms import MemberContributionForm
 from django.db.models import Sum, Q
+from bakgomong.aio import in_thread
+from bakgomong.db_router import read_from_replica
 
 logger = logging.getLogger("contributions.views")
 
@@ -21,6 +25,7 @@ def is_treasurer_or_admin(user):
 
 
 @login_required
+@read_from_replica()
 def member_contributions_list(request, family_slug=None):
     """
     List member contributions with role-aware filtering, pagination and totals.
@@ -61,6 +66,7 @@ def member_contributions_list(request, family_slug=None):
 
 
 @login_required
+@read_from_replica()
 def my_member_contributions_list(request):
     """
     Shortcut for the logged-in user's contributions.
@@ -77,14 +83,18 @@ def my_member_contributions_list(request):
 
 
 @login_required
-def member_contribution(request, id):
-    qs = MemberContribution.objects.select_related("account", "contribution_type")
-    contribution = get_object_or_404(qs, id=id)
+@read_from_replica()
+async def member_contribution(request, id):
+    user = await request.auser()
+    qs = await MemberContribution.objects.select_related("account", "contribution_type").afind(id=id)
+    approved = Payment.objects.filter(member_contribution_id=id, is_approved=Payment.LogPaymentStatus.APPROVED).order_by("created")
+    # the payments do not depend on the contribution row: fetch both at once
+    contribution, approved_payments = await asyncio.gather(aget_object_or_404(qs), in_thread(list, approved))
     # ensure non-admins may only view their own records
-    if not request.user.is_staff and contribution.account != request.user and not is_treasurer_or_admin(request.user):
+    if not user.is_staff and contribution.account_id != user.pk and not is_treasurer_or_admin(user):
         messages.error(request, "You do not have permission to view this contribution.")
         return redirect("contributions:member-contributions-list")
-    return render(request, "member_inv/invoice.html", {"contribution": contribution})
+    return await sync_to_async(render)(request, "member_inv/invoice.html", {"contribution": contribution, "approved_payments": approved_payments})
 
 
 # Add new member contribution
@@ -123,7 +133,7 @@ def add_member_contribution(request):
 # Update member contribution
 @login_required
 def update_member_contribution(request, id):
-    contribution = get_object_or_404(MemberContribution, id=id)
+    contribution = get_object_or_404(MemberContribution.objects.find(id=id))
     # Only treasurer/admin or owner can update
     if not (is_treasurer_or_admin(request.user) or contribution.account == request.user or request.user.is_staff):
         messages.error(request, "You are not authorized to edit this contribution.")
@@ -151,7 +161,7 @@ def update_member_contribution(request, id):
 # Delete member contribution
 @login_required
 def delete_member_contribution(request, id):
-    contribution = get_object_or_404(MemberContribution, id=id)
+    contribution = get_object_or_404(MemberContribution.objects.find(id=id))
     # Only treasurer/admin or staff can delete
     if not (is_treasurer_or_admin(request.user) or request.user.is_staff):
         messages.error(request, "You are not authorized to delete this contribution.")
@@ -0,0 +1,57 @@
+import logging
+from django.shortcuts import get_object_or_404, redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import FileResponse, HttpResponseForbidden
+
+from bakgomong.storage import get_private_storage
+from contributions.utils.pdf import invoice_pdf_name, queue_render, receipt_pdf_name
+from .member_contr import is_treasurer_or_admin
+from ..models import MemberContribution, Payment
+
+logger = logging.getLogger("contributions")
+
+
+def _pdf_response(name, filename):
+    response = FileResponse(get_private_storage().open(name, "rb"), as_attachment=True, filename=filename, content_type="application/pdf")
+    # the file for a fingerprint never changes; the URL does not carry it, so keep it private
+    response["Cache-Control"] = "private, max-age=300"
+    return response
+
+
+def _can_view(user, account):
+    return user.is_staff or account == user or is_treasurer_or_admin(user)
+
+
+@login_required
+def download_invoice_pdf(request, id):
+    qs = MemberContribution.objects.select_related("account", "contribution_type")
+    contribution = get_object_or_404(qs.find(id=id))
+    if not _can_view(request.user, contribution.account):
+        return HttpResponseForbidden("You do not have permission to view this contribution.")
+
+    name = invoice_pdf_name(contribution)
+    if get_private_storage().exists(name):
+        return _pdf_response(name, f"invoice-{contribution.reference or contribution.id}.pdf")
+
+    queue_render("contributions.tasks.render_invoice_pdf_task", name, contribution.id)
+    messages.info(request, "Your PDF invoice is being prepared. Please try the download again in a moment.")
+    return redirect(contribution.get_absolute_url())
+
+
+@login_required
+def download_receipt_pdf(request, id):
+    qs = Payment.objects.select_related("account", "member_contribution")
+    payment = get_object_or_404(qs.find(id=id), is_approved=Payment.LogPaymentStatus.APPROVED)
+    if not _can_view(request.user, payment.account):
+        return HttpResponseForbidden("You do not have permission to view this receipt.")
+
+    name = receipt_pdf_name(payment)
+    if get_private_storage().exists(name):
+        return _pdf_response(name, f"receipt-{payment.reference or payment.id}.pdf")
+
+    queue_render("contributions.tasks.render_receipt_pdf_task", name, payment.id)
+    messages.info(request, "Your PDF receipt is being prepared. Please try the download again in a moment.")
+    if payment.member_contribution_id:
+        return redirect(payment.member_contribution.get_absolute_url())
+    return redirect("contributions:my-contributions")
@@ -0,0 +1,39 @@
+import json
+import logging
+
+from django.conf import settings
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from contributions.utils.webhooks import queue_processing, record_event, verify_yoco_signature
+from ..models import WebhookEvent
+
+logger = logging.getLogger("contributions")
+
+
+@csrf_exempt
+@require_POST
+def yoco_webhook(request):
+    """
+    Yoco webhook endpoint: verify, store and acknowledge. The event is applied later by
+    process_webhook_events_task, so Yoco never waits on our processing.
+    """
+    secret = getattr(settings, "YOCO_WEBHOOK_SECRET", "")
+    if not verify_yoco_signature(secret, request.headers, request.body):
+        logger.warning("Yoco webhook rejected: bad or missing signature (webhook-id %s)", request.headers.get("webhook-id"))
+        return HttpResponseForbidden("Invalid signature")
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid JSON")
+    event_id = payload.get("id") or request.headers.get("webhook-id")
+    if not event_id:
+        return HttpResponseBadRequest("Missing event id")
+
+    if record_event(WebhookEvent.Provider.YOCO, event_id, payload.get("type", ""), payload):
+        queue_processing()
+    else:
+        logger.info("Yoco webhook %s already received", event_id)
+    return JsonResponse({"received": True})
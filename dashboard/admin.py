@@ -2,10 +2,11 @@ from django.contrib import admin
 from dashboard.models import ClanDocument, Meeting
 from django.db import models
 from accounts.utils.abstracts import Role
+from bakgomong.search import IndexedSearchAdminMixin
 
 # Register your models here.
 @admin.register(ClanDocument)
-class ClanDocumentAdmin(admin.ModelAdmin):
+class ClanDocumentAdmin(IndexedSearchAdminMixin, admin.ModelAdmin):
     list_display = ("title", "category", "visibility", "family", "uploaded_by", "created")
     list_filter = ("visibility", "category", "family")
     search_fields = ("title", "description")
@@ -30,7 +31,7 @@ class ClanDocumentAdmin(admin.ModelAdmin):
         )
 
 @admin.register(Meeting)
-class MeetingAdmin(admin.ModelAdmin):
+class MeetingAdmin(IndexedSearchAdminMixin, admin.ModelAdmin):
     list_display = ("title", "meeting_type", "audience", "meeting_date", "created_by", "family")
     list_filter = ("meeting_type", "audience", "meeting_date", "family")
     search_fields = ("title", "description")
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from bakgomong.cache import connect_version_signals
+        connect_version_signals()
+
+        from bakgomong.logging import connect_task_signals
+        connect_task_signals()
+
+        from django.db.backends.signals import connection_created
+        from bakgomong.db_pool import count_connection
+        connection_created.connect(count_connection, dispatch_uid="count_connection")
@@ -0,0 +1,192 @@
+"""
+Static asset bundles.
+
+ASSET_GROUPS lists the CSS/JS files of each group. `manage.py build_assets` concatenates
+every group into one content-hashed file per type under settings.ASSETS_ROOT, writes
+precompressed .br and .gz siblings and a manifest.json mapping "group.type" to the
+built file name. Pages pick groups with {% asset_bundle %} (dashboard.templatetags.assets);
+dashboard.views.assets.serve_asset serves the bundles with the best encoding and
+immutable cache headers. A build deletes older bundles but keeps the previous build's,
+which HTML cached before the deploy (for up to a page cache TTL) still links.
+
+Without a manifest (e.g. local development before a build) the template tag falls back
+to one {% static %} tag per source file.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+logger = logging.getLogger("events")
+
+ASSET_GROUPS = {
+    # needed by every page extending _base.html
+    "core": {
+        "css": ["css/remixicon.css"],
+        "js": ["js/lib/jquery-3.7.1.min.js", "js/lib/iconify-icon.min.js", "js/flowbite.min.js", "js/app.js"],
+    },
+    # loaded after the page's groups so the theme keeps overriding library styles
+    "theme": {
+        "css": ["css/style.css"],
+        "js": [],
+    },
+    "charts": {
+        "css": ["css/lib/apexcharts.css"],
+        "js": ["js/lib/apexcharts.min.js"],
+    },
+    "datatables": {
+        "css": ["css/lib/dataTables.min.css"],
+        "js": ["js/lib/simple-datatables.min.js"],
+    },
+    "datepicker": {
+        "css": ["css/lib/flatpickr.min.css"],
+        "js": ["js/flatpickr.js"],
+    },
+    "calendar": {
+        "css": ["css/lib/full-calendar.css"],
+        "js": ["js/lib/jquery-ui.min.js", "js/full-calendar.js"],
+    },
+    "slider": {
+        "css": ["css/lib/slick.css"],
+        "js": ["js/lib/slick.min.js"],
+    },
+    "popup": {
+        "css": ["css/lib/magnific-popup.css"],
+        "js": ["js/lib/magnifc-popup.min.js"],
+    },
+    "maps": {
+        "css": ["css/lib/jquery-jvectormap-2.0.5.css"],
+        "js": ["js/lib/jquery-jvectormap-2.0.5.min.js", "js/lib/jquery-jvectormap-world-mill-en.js"],
+    },
+    "editor": {
+        "css": ["css/lib/editor-katex.min.css", "css/lib/editor.atom-one-dark.min.css", "css/lib/editor.quill.snow.css"],
+        "js": [],
+    },
+    "code": {
+        "css": ["css/lib/prism.css"],
+        "js": ["js/lib/prism.js"],
+    },
+    "uploads": {
+        "css": ["css/lib/file-upload.css"],
+        "js": ["js/lib/file-upload.js"],
+    },
+    "audio": {
+        "css": ["css/lib/audioplayer.css"],
+        "js": ["js/lib/audioplayer.js"],
+    },
+}
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+_manifest_cache = {"mtime": None, "data": None}
+
+
+def assets_root():
+    return str(settings.ASSETS_ROOT)
+
+
+def rewrite_css_urls(css, source_path):
+    """Relative url()s in a bundled stylesheet point at the original static location."""
+    base = posixpath.dirname(source_path)
+
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        split = min((i for i in (url.find("?"), url.find("#")) if i >= 0), default=len(url))
+        path, suffix = url[:split], url[split:]
+        resolved = posixpath.normpath(posixpath.join(base, path))
+        rewritten = static(resolved) + suffix
+        return f"url({quote}{rewritten}{quote})"
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def find_source(path):
+    found = finders.find(path)
+    if not found and settings.STATIC_ROOT:
+        # production serves straight from STATIC_ROOT without STATICFILES_DIRS
+        candidate = os.path.join(settings.STATIC_ROOT, path)
+        found = candidate if os.path.exists(candidate) else None
+    return found
+
+
+def bundle_source(group, kind):
+    parts = []
+    for path in ASSET_GROUPS[group][kind]:
+        found = find_source(path)
+        if not found:
+            raise FileNotFoundError(f"Asset '{path}' of group '{group}' not found in static files")
+        with open(found, encoding="utf-8") as fh:
+            content = fh.read()
+        if kind == "css":
+            content = rewrite_css_urls(content, path)
+        # ';' guards against a previous script without a trailing semicolon
+        separator = "\n" if kind == "css" else "\n;\n"
+        parts.append(f"/* {path} */\n{content}{separator}")
+    return "".join(parts).encode("utf-8")
+
+
+def write_bundle(group, kind, brotli_quality=11, gzip_level=9):
+    """Build one bundle (plus .br/.gz) and return its file name, or None for empty groups."""
+    if not ASSET_GROUPS[group][kind]:
+        return None
+    data = bundle_source(group, kind)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    name = f"{group}.{digest}.{kind}"
+    root = assets_root()
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, name)
+    with open(path, "wb") as fh:
+        fh.write(data)
+    with open(path + ".br", "wb") as fh:
+        fh.write(brotli.compress(data, quality=brotli_quality))
+    with open(path + ".gz", "wb") as fh:
+        fh.write(gzip.compress(data, compresslevel=gzip_level, mtime=0))
+    return name
+
+
+def write_manifest(entries):
+    path = os.path.join(assets_root(), MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(entries, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_manifest():
+    """manifest.json contents, re-read only when the file changes ({} when not built)."""
+    path = os.path.join(assets_root(), MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _manifest_cache["mtime"] != mtime:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                _manifest_cache["data"] = json.load(fh)
+            _manifest_cache["mtime"] = mtime
+        except (OSError, ValueError) as e:
+            logger.error("Unreadable asset manifest %s: %s", path, e)
+            return {}
+    return _manifest_cache["data"]
+
+
+def asset_urls(group, kind):
+    """URLs to include for a group: the built bundle, or the source files when not built."""
+    if group not in ASSET_GROUPS:
+        raise KeyError(f"Unknown asset group '{group}'")
+    name = load_manifest().get(f"{group}.{kind}")
+    if name:
+        return [settings.ASSETS_URL + name]
+    return [static(path) for path in ASSET_GROUPS[group][kind]]
@@ -0,0 +1,86 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+
+DEFAULT_PATHS = ["/", "/api/meetings"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency of views through the WSGI handler (a thread per concurrent client) and the "
+        "ASGI handler (concurrent requests on one event loop), in process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username to log in as")
+        parser.add_argument("--path", action="append", help="Path to request (repeatable, default: dashboard and meetings API)")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per path")
+        parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight at once")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user {options['user']!r}")
+        self.stdout.write(f"{'handler':<7} {'path':<28}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'errors':>8}")
+        for path in options["path"] or DEFAULT_PATHS:
+            self.report("wsgi", path, *self.run_wsgi(user, path, options["requests"], options["concurrency"]))
+            self.report("asgi", path, *async_to_sync(self.run_asgi)(user, path, options["requests"], options["concurrency"]))
+
+    def run_wsgi(self, user, path, total, concurrency):
+        latencies, errors, lock = [], [0], threading.Lock()
+        remaining = [total]
+
+        def worker():
+            client = Client()
+            client.force_login(user)
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        return
+                    remaining[0] -= 1
+                started = time.perf_counter()
+                response = client.get(path, secure=True)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    errors[0] += response.status_code != 200
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0], time.perf_counter() - started
+
+    async def run_asgi(self, user, path, total, concurrency):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        latencies, errors = [], [0]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, secure=True)
+                latencies.append(time.perf_counter() - started)
+                errors[0] += response.status_code != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return latencies, errors[0], time.perf_counter() - started
+
+    def report(self, handler, path, latencies, errors, elapsed):
+        ms = sorted(latency * 1000 for latency in latencies) or [0]
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        self.stdout.write(
+            f"{handler:<7} {path[:27]:<28}{len(latencies) / elapsed:>8.0f}{statistics.median(ms):>9.1f}"
+            f"{p95:>9.1f}{ms[-1]:>9.1f}{errors:>8}"
+        )
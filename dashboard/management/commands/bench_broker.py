@@ -0,0 +1,87 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django_q.brokers.orm import ORM
+from django_q.conf import Conf
+
+from bakgomong.broker import PostgresBroker
+
+BROKERS = {"orm": ORM, "postgres": PostgresBroker}
+
+
+class Command(BaseCommand):
+    help = "Throughput and pickup latency of the ORM broker vs. PostgresBroker under a task burst."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=2000, help="Tasks in the burst")
+        parser.add_argument("--consumers", type=int, default=4, help="Consumer threads (one broker each)")
+        parser.add_argument("--bulk", type=int, default=Conf.BULK, help="Tasks claimed per dequeue")
+        parser.add_argument("--broker", action="append", choices=list(BROKERS), help="Broker to run (repeatable, default: both)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Run this against PostgreSQL: on other databases PostgresBroker is the ORM broker.")
+        bulk, Conf.BULK = Conf.BULK, options["bulk"]
+        try:
+            self.stdout.write(f"{'broker':<10}{'enqueue/s':>11}{'tasks/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'dequeues':>10}")
+            for name in options["broker"] or list(BROKERS):
+                self.run(name, BROKERS[name], options["tasks"], options["consumers"])
+        finally:
+            Conf.BULK = bulk
+
+    def run(self, name, broker_class, total, consumers):
+        list_key = f"bench-{uuid.uuid4().hex[:8]}"
+        latencies, lock, done = [], threading.Lock(), threading.Event()
+        dequeues = [0]
+
+        def consume():
+            broker = broker_class(list_key=list_key)
+            try:
+                while not done.is_set():
+                    tasks = broker.dequeue() or []
+                    now = time.perf_counter()
+                    with lock:
+                        dequeues[0] += 1
+                    for task_id, payload in tasks:
+                        broker.acknowledge(task_id)
+                        with lock:
+                            latencies.append(now - float(payload))
+                            if len(latencies) >= total:
+                                done.set()
+            finally:
+                if hasattr(broker, "close"):
+                    broker.close()
+                connections.close_all()
+
+        threads = [threading.Thread(target=consume, daemon=True) for _ in range(consumers)]
+        for thread in threads:
+            thread.start()
+        # let idle consumers settle into their wait before the burst
+        time.sleep(0.5)
+
+        producer = broker_class(list_key=list_key)
+        started = time.perf_counter()
+        for _ in range(total):
+            producer.enqueue(repr(time.perf_counter()))
+        enqueued = time.perf_counter() - started
+        finished = done.wait(timeout=max(60, total / 10))
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in threads:
+            thread.join(timeout=10)
+        producer.purge_queue()
+        if hasattr(producer, "close"):
+            producer.close()
+
+        if not finished:
+            self.stderr.write(f"{name}: only {len(latencies)} of {total} tasks consumed before the timeout")
+        ms = sorted(latency * 1000 for latency in latencies) or [0]
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        self.stdout.write(
+            f"{name:<10}{total / enqueued:>11.0f}{len(latencies) / elapsed:>10.0f}"
+            f"{statistics.median(ms):>9.1f}{p95:>9.1f}{ms[-1]:>9.1f}{dequeues[0]:>10}"
+        )
@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from bakgomong.middleware import compress, get_config
+
+LEVELS = [("gzip", 1), ("gzip", 6), ("gzip", 9), ("br", 1), ("br", 4), ("br", 5), ("br", 8), ("br", 11)]
+
+
+class Command(BaseCommand):
+    help = "CPU cost vs. bytes saved of gzip/Brotli levels on real responses or files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", action="append", default=[], help="Path to fetch (repeatable)")
+        parser.add_argument("--file", action="append", default=[], help="File to compress (repeatable)")
+        parser.add_argument("--username", help="Log in as this user when fetching URLs")
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def handle(self, *args, **options):
+        payloads = self.fetch(options["url"] or ["/", "/api/meetings"], options["username"])
+        for path in options["file"]:
+            with open(path, "rb") as fh:
+                payloads.append((path, fh.read()))
+        if not payloads:
+            raise CommandError("Nothing to compress.")
+
+        base = get_config()
+        for name, data in payloads:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}: {len(data):,} B"))
+            self.stdout.write(f"{'codec':<10}{'size':>10}{'ratio':>8}{'saved':>10}{'ms/resp':>10}{'MB/s':>9}")
+            for encoding, level in LEVELS:
+                config = {**base, "BROTLI_QUALITY": level, "GZIP_LEVEL": level}
+                started = time.perf_counter()
+                for _ in range(options["iterations"]):
+                    out = compress(data, encoding, config)
+                elapsed = (time.perf_counter() - started) / options["iterations"]
+                self.stdout.write(
+                    f"{encoding + '-' + str(level):<10}{len(out):>10,}{len(out) / len(data):>8.2f}"
+                    f"{len(data) - len(out):>10,}{elapsed * 1000:>10.2f}{len(data) / elapsed / 1e6:>9.1f}"
+                )
+
+    def fetch(self, urls, username):
+        client = Client()
+        if username:
+            try:
+                client.force_login(get_user_model().objects.get(username=username))
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user '{username}'")
+        payloads = []
+        for url in urls:
+            response = client.get(url, secure=True)
+            body = b"".join(response.streaming_content) if response.streaming else response.content
+            if response.status_code != 200 or not body:
+                self.stderr.write(f"Skipping {url}: HTTP {response.status_code}")
+                continue
+            payloads.append((url, body))
+        return payloads
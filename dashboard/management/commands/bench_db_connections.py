@@ -0,0 +1,110 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+
+from bakgomong.db_pool import CONN_MAX_AGE, pool_available, pool_stats
+
+MODES = ["per-request", "persistent", "pool"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request latency with a new database connection per request, persistent connections "
+        "and a psycopg 3 pool. Each simulated request runs Django's request_started/"
+        "request_finished connection handling around one small query."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Requests per thread")
+        parser.add_argument("--threads", type=int, default=4, help="Concurrent request threads")
+        parser.add_argument("--pool-size", type=int, default=4, help="max_size of the pool")
+        parser.add_argument("--mode", action="append", choices=MODES, help="Mode to run (repeatable, default: all)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Run this against PostgreSQL.")
+        modes = options["mode"] or MODES
+        if "pool" in modes and not pool_available():
+            self.stderr.write("pool: skipped, psycopg 3 and psycopg_pool are not installed")
+            modes = [mode for mode in modes if mode != "pool"]
+
+        saved = dict(connection.settings_dict)
+        saved_options = dict(saved.get("OPTIONS", {}))
+        self.stdout.write(f"{'mode':<13}{'req/s':>8}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'connects':>10}")
+        try:
+            for mode in modes:
+                self.configure(mode, saved, saved_options, options["pool_size"])
+                self.run(mode, options["requests"], options["threads"])
+        finally:
+            self.reset()
+            connection.settings_dict.update(saved)
+            connection.settings_dict["OPTIONS"] = saved_options
+
+    def reset(self):
+        connections.close_all()
+        if getattr(connection, "pool", None) is not None:
+            connection.close_pool()
+
+    def configure(self, mode, saved, saved_options, pool_size):
+        self.reset()
+        options = {key: value for key, value in saved_options.items() if key != "pool"}
+        settings_dict = connection.settings_dict
+        settings_dict["CONN_HEALTH_CHECKS"] = True
+        if mode == "pool":
+            settings_dict["CONN_MAX_AGE"] = 0
+            options["pool"] = {"min_size": min(2, pool_size), "max_size": pool_size, "timeout": 30}
+        else:
+            settings_dict["CONN_MAX_AGE"] = CONN_MAX_AGE if mode == "persistent" else 0
+        settings_dict["OPTIONS"] = options
+
+    def run(self, mode, per_thread, threads):
+        latencies, lock = [], threading.Lock()
+        connects = [0]
+
+        def counted(sender, **kwargs):
+            with lock:
+                connects[0] += 1
+
+        def worker():
+            try:
+                for _ in range(per_thread):
+                    started = time.perf_counter()
+                    request_started.send(sender=self.__class__)
+                    with connections["default"].cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    request_finished.send(sender=self.__class__)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+            finally:
+                connections["default"].close()
+
+        connection_created.connect(counted)
+        try:
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(counted)
+
+        ms = sorted(latency * 1000 for latency in latencies) or [0]
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        self.stdout.write(
+            f"{mode:<13}{len(latencies) / elapsed:>8.0f}{statistics.mean(ms):>9.2f}{statistics.median(ms):>9.2f}"
+            f"{p95:>9.2f}{ms[-1]:>9.2f}{connects[0]:>10}"
+        )
+        if mode == "pool":
+            stats = pool_stats()["default"]
+            self.stdout.write(
+                f"{'':<13}pool opened {stats['connections_opened']} connections, "
+                f"avg wait {stats['avg_wait_ms']} ms, {stats['timeouts']} timeouts"
+            )
@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.assets import ASSET_GROUPS, MANIFEST_NAME, assets_root, load_manifest, write_bundle, write_manifest
+
+
+class Command(BaseCommand):
+    help = (
+        "Bundle, fingerprint and precompress (.br/.gz) the static asset groups. Bundles of the "
+        "previous build are kept for one more build: pages cached before the deploy still link them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--brotli-quality", type=int, default=11)
+        parser.add_argument("--gzip-level", type=int, default=9)
+        parser.add_argument("--keep-stale", action="store_true", help="Keep every bundle from earlier builds")
+
+    def handle(self, *args, **options):
+        previous = load_manifest()
+        manifest = {}
+        try:
+            for group, kinds in ASSET_GROUPS.items():
+                for kind in kinds:
+                    name = write_bundle(group, kind, options["brotli_quality"], options["gzip_level"])
+                    if name:
+                        manifest[f"{group}.{kind}"] = name
+                        self.report(name)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        write_manifest(manifest)
+        if not options["keep_stale"]:
+            self.remove_stale(set(manifest.values()) | set(previous.values()))
+        self.stdout.write(self.style.SUCCESS(f"Built {len(manifest)} bundles into {assets_root()}"))
+
+    def report(self, name):
+        path = os.path.join(assets_root(), name)
+        sizes = [os.path.getsize(p) for p in (path, path + ".gz", path + ".br")]
+        self.stdout.write(f"{name}: {sizes[0]:,} B, gzip {sizes[1]:,} B, br {sizes[2]:,} B")
+
+    def remove_stale(self, current):
+        """Delete every file under ASSETS_ROOT that does not belong to a bundle in `current`."""
+        for entry in os.listdir(assets_root()):
+            base = entry.removesuffix(".br").removesuffix(".gz")
+            if entry != MANIFEST_NAME and base not in current:
+                os.remove(os.path.join(assets_root(), entry))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from bakgomong import partitioning
+
+
+class Command(BaseCommand):
+    help = "Create the coming years' partitions of the partitioned ledger tables (PostgreSQL); --convert partitions them first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--convert", action="store_true", help="Partition MemberContribution and Payment by year if they are not yet")
+        parser.add_argument("--years-ahead", type=int, default=partitioning.YEARS_AHEAD, help="Future years to create partitions for")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Table partitioning needs PostgreSQL.")
+        if options["convert"]:
+            for table, years in partitioning.convert_all().items():
+                self.stdout.write(f"Partitioned {table}: {', '.join(map(str, years))}")
+        created = partitioning.create_future_partitions(years_ahead=options["years_ahead"])
+        self.stdout.write(self.style.SUCCESS(f"Created {', '.join(created)}" if created else "All partitions exist"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from bakgomong import retention
+
+
+class Command(BaseCommand):
+    help = "Delete (optionally archive) django-q and Celery task results older than settings.TASK_RETENTION allows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be deleted")
+        parser.add_argument("--archive", action="store_true", help="Write deleted rows to archives/tasks/ in private storage first")
+        parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) the pruned tables (PostgreSQL)")
+
+    def handle(self, *args, **options):
+        report = retention.prune(dry_run=options["dry_run"], archive=options["archive"] or None)
+        if options["vacuum"] and not options["dry_run"]:
+            retention.vacuum(report)
+        self.stdout.write(self.style.SUCCESS(report.summary() or "No task tables installed"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from bakgomong.schedules import sync_schedules
+
+
+class Command(BaseCommand):
+    help = "Create or update the django-q schedules listed in bakgomong.schedules."
+
+    def handle(self, *args, **options):
+        created, updated = sync_schedules()
+        for name in created:
+            self.stdout.write(f"created {name}")
+        for name in updated:
+            self.stdout.write(f"updated {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(created) + len(updated)} schedules in sync"))
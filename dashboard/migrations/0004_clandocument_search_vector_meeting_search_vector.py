@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from bakgomong.search import search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_alter_clandocument_id_alter_meeting_id'),
+        # pg_trgm
+        ('accounts', '0009_account_search_vector_family_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clandocument',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(*search_triggers('dashboard_clandocument', 'dashboard_meeting')),
+    ]
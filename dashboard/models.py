@@ -2,6 +2,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from django.core.exceptions import PermissionDenied
+from django.contrib.postgres.search import SearchVectorField
 from accounts.utils.abstracts import Role, AbstractCreate
 from accounts.models import Family
 from django.contrib.auth import get_user_model
@@ -47,6 +48,8 @@ class ClanDocument(AbstractCreate):
         default=Visibility.CLAN,
         help_text=_("Who can access this document"),
     )
+    # filled by a database trigger on PostgreSQL (bakgomong/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = _("Clan Document")
@@ -153,7 +156,8 @@ class Meeting(AbstractCreate):
         related_name="meetings",
         help_text=_("Optional: assign this meeting to a specific family if needed."),
     )
-    
+    # filled by a database trigger on PostgreSQL (bakgomong/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = _("Meeting")
@@ -0,0 +1,33 @@
+import logging
+
+logger = logging.getLogger('tasks')
+
+
+def prune_task_history_task():
+    """
+    Scheduled task (see bakgomong.schedules): delete task results past their retention
+    period in primary-key batches (bakgomong.retention) and log what was reclaimed.
+    """
+    from bakgomong import retention
+
+    try:
+        report = retention.prune()
+        retention.vacuum(report)
+        return report.summary()
+    except Exception:
+        logger.exception("prune_task_history_task failed")
+        return None
+
+
+def create_partitions_task():
+    """
+    Scheduled task (see bakgomong.schedules): create the coming years' partitions of the
+    partitioned ledger tables (bakgomong.partitioning). Does nothing when not partitioned.
+    """
+    from bakgomong import partitioning
+
+    try:
+        return partitioning.create_future_partitions()
+    except Exception:
+        logger.exception("create_partitions_task failed")
+        return None
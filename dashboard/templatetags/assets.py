@@ -0,0 +1,21 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from dashboard.assets import asset_urls
+
+register = template.Library()
+
+TAGS = {
+    "css": '<link rel="stylesheet" href="{}" />',
+    "js": '<script src="{}"></script>',
+}
+
+
+@register.simple_tag
+def asset_bundle(kind, *groups):
+    """
+    {% asset_bundle "css" "core" "datatables" %}
+    Emits the built bundle of each group, or its individual files when assets are not built.
+    """
+    urls = [(url,) for group in groups for url in asset_urls(group, kind)]
+    return format_html_join("\n", TAGS[kind], urls)
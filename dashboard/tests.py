@@ -1,3 +1,115 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django_q.models import Task
+
+from accounts.models import Account
+
+from bakgomong import retention
+from bakgomong.storage import get_private_storage
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PRIVATE_MEDIA_ROOT=tempfile.mkdtemp())
+class TaskRetentionTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - datetime.timedelta(days=30)
+        for i in range(5):
+            Task.objects.create(
+                id=f"task-{i}", name=f"task-{i}", func="accounts.tasks.import_members_task",
+                args=("imports/members.csv",), started=old, stopped=old, success=True,
+            )
+
+    def prune(self):
+        with override_settings(TASK_RETENTION={"BATCH_SIZE": 2, "PAUSE": 0}):
+            return retention.prune(archive=True)
+
+    def test_archives_are_private_and_hold_every_row(self):
+        table = next(table for table in self.prune().tables if table.label == "django_q.Task")
+        self.assertEqual(table.successes, 5)
+        self.assertEqual(len(table.archives), 3)
+        rows = []
+        for name in table.archives:
+            self.assertTrue(get_private_storage().exists(name))
+            self.assertFalse(default_storage.exists(name))
+            with get_private_storage().open(name) as fh:
+                rows += [json.loads(line) for line in gzip.open(fh)]
+        self.assertEqual(sorted(row["id"] for row in rows), [f"task-{i}" for i in range(5)])
+
+    def test_batch_is_kept_when_its_archive_cannot_be_stored(self):
+        storage = get_private_storage()
+        save = storage.save
+        calls = []
+
+        def fail_second(name, content):
+            calls.append(name)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            return save(name, content)
+
+        with mock.patch.object(storage, "save", side_effect=fail_second), self.assertRaises(OSError):
+            self.prune()
+        # the first batch was archived and deleted, the second one is still there
+        self.assertEqual(Task.objects.count(), 3)
+
+
+class BuildAssetsTests(TestCase):
+    def setUp(self):
+        self.static_dir, self.assets_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.static_dir, "css"))
+        settings = override_settings(STATICFILES_DIRS=[self.static_dir], ASSETS_ROOT=self.assets_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        groups = mock.patch.dict("dashboard.assets.ASSET_GROUPS", {"site": {"css": ["css/site.css"], "js": []}}, clear=True)
+        groups.start()
+        self.addCleanup(groups.stop)
+
+    def build(self, css):
+        with open(os.path.join(self.static_dir, "css", "site.css"), "w") as fh:
+            fh.write(css)
+        call_command("build_assets", stdout=mock.Mock())
+        with open(os.path.join(self.assets_dir, "manifest.json")) as fh:
+            return json.load(fh)["site.css"]
+
+    def test_previous_build_is_kept_for_one_build(self):
+        first = self.build("body { color: red; }")
+        second = self.build("body { color: blue; }")
+        self.assertTrue(os.path.exists(os.path.join(self.assets_dir, first)))
+
+        third = self.build("body { color: green; }")
+        files = set(os.listdir(self.assets_dir))
+        self.assertNotIn(first, files)
+        self.assertNotIn(first + ".br", files)
+        self.assertTrue({second, second + ".gz", third, third + ".br"} <= files)
+
+
+class GlobalSearchTests(TestCase):
+    def setUp(self):
+        Account.objects.create_user(
+            username="zwelethu", first_name="Zwelethu", email="zwelethu.private@example.com",
+            phone="0829876543", password="secret", is_approved=True,
+        )
+
+    def found(self, user, term):
+        self.client.force_login(user)
+        response = self.client.get(reverse("dashboard:search"), {"q": term}, secure=True)
+        return [member["username"] for member in response.json()["results"]["members"]]
+
+    def test_members_search_names_but_not_contact_details(self):
+        member = Account.objects.create_user(username="searcher", password="secret", is_approved=True)
+        self.assertIn("zwelethu", self.found(member, "Zwelethu"))
+        self.assertNotIn("zwelethu", self.found(member, "zwelethu.private"))
+        self.assertNotIn("zwelethu", self.found(member, "0829876543"))
+
+    def test_staff_search_contact_details(self):
+        staff = Account.objects.create_user(username="staffer", password="secret", is_approved=True, is_staff=True)
+        self.assertIn("zwelethu", self.found(staff, "zwelethu.private"))
+        self.assertIn("zwelethu", self.found(staff, "0829876543"))
@@ -1,5 +1,8 @@
 from django.urls import path
 from dashboard.views.home import download_file, index, clan_meetings, clan_documents, get_clan_meetings_api
+from dashboard.views.metrics import metrics
+from dashboard.views.aging import arrears_aging
+from dashboard.views.search import global_search
 
 app_name = 'dashboard'
 
@@ -9,4 +12,7 @@ urlpatterns = [
     path('documents', clan_documents, name='clan-documents'),
     path('api/meetings', get_clan_meetings_api, name='get-meetings-api'),
     path('documents/<file_id>', download_file, name='download-file'),
+    path('metrics', metrics, name='metrics'),
+    path('reports/arrears-aging', arrears_aging, name='arrears-aging'),
+    path('search', global_search, name='search'),
 ]
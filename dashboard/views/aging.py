@@ -0,0 +1,34 @@
+from django.contrib.auth.decorators import login_required
+from django.db.models import Sum
+from django.http import HttpResponseForbidden
+from django.shortcuts import render
+
+from accounts.views.family import EXECUTIVE_ROLES
+from contributions.models import ArrearsAgingSnapshot
+from contributions.utils.aging import BUCKETS, bucket_totals
+from bakgomong.db_router import read_from_replica
+
+BUCKET_FIELDS = [field for name, _, _ in BUCKETS for field in (f"count_{name}", f"amount_{name}")]
+
+
+@login_required
+@read_from_replica()
+def arrears_aging(request):
+    """Who is overdue by how long, per family and per contribution type. Reads only the snapshot table."""
+    if not request.user.is_staff and request.user.role not in EXECUTIVE_ROLES:
+        return HttpResponseForbidden("You do not have permission to view this report.")
+
+    snapshot = ArrearsAgingSnapshot.objects.all()
+    sums = {field: Sum(field) for field in BUCKET_FIELDS}
+    by_family = snapshot.values("family__name", "family__slug").annotate(**sums).order_by("family__name")
+    by_type = snapshot.values("contribution_type__name").annotate(**sums).order_by("contribution_type__name")
+    latest = snapshot.order_by("-refreshed_at").values("as_of", "refreshed_at").first()
+
+    context = {
+        "by_family": by_family,
+        "by_type": by_type,
+        "totals": bucket_totals(snapshot),
+        "as_of": latest and latest["as_of"],
+        "refreshed_at": latest and latest["refreshed_at"],
+    }
+    return render(request, "home/aging.html", context)
@@ -0,0 +1,39 @@
+import mimetypes
+import os
+
+from django.http import FileResponse, Http404
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from bakgomong.middleware import accepted_encodings
+from dashboard.assets import assets_root, load_manifest
+
+# preferred first; each entry is (content-coding, file suffix)
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@require_safe
+def serve_asset(request, path):
+    """Serve a built bundle, precompressed when the client allows, with immutable caching."""
+    if path not in set(load_manifest().values()):
+        raise Http404("Unknown asset")
+
+    base = os.path.join(assets_root(), path)
+    accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    file_path, encoding = base, None
+    for coding, suffix in ENCODINGS:
+        if (coding in accepted or "*" in accepted) and os.path.exists(base + suffix):
+            file_path, encoding = base + suffix, coding
+            break
+
+    try:
+        response = FileResponse(open(file_path, "rb"))
+    except FileNotFoundError:
+        raise Http404("Asset not built")
+    response["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Cache-Control"] = IMMUTABLE
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
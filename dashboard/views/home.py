@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import mimetypes
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 from django.db.models import Sum, Count, Q
@@ -11,61 +13,91 @@ from dashboard.models import ClanDocument, Meeting
 from contributions.models import ContributionType, MemberContribution, Payment
 from accounts.models import Account, Family
 from accounts.utils.abstracts import PaymentStatus
+from bakgomong.aio import in_thread
+from bakgomong.cache import cache_view, cached_query
+from bakgomong.db_router import read_from_replica
 
 logger = logging.getLogger("events")
 
 
-@login_required
-def index(request):
-    user = request.user
-    context = {}
-
-    # Common overview
-    context["upcoming_meeting"] = Meeting.objects.filter(
-        meeting_date__gte=timezone.now()
-    ).order_by("meeting_date").first()
-    context["total_members"] = Account.objects.count()
-    context["total_families"] = Family.objects.count()
-    context["family"] = getattr(user, "family", None)
-    member_contribs_qs = MemberContribution.objects.all().order_by("-created")
-
-    # Clan-wide aggregates (safe to compute for everyone)
-    # Use MemberContribution totals as source of truth
-    clan_paid_agg =member_contribs_qs.filter(
-        is_paid__in=[PaymentStatus.PAID, 'PAID']
-    ).aggregate(total_paid=Sum("amount_due"))
-    clan_total_paid = clan_paid_agg.get("total_paid") or 0
-    
+UNPAID_STATUSES = [PaymentStatus.NOT_PAID, 'NOT PAID', PaymentStatus.PENDING, 'PENDING']
+CONTRIBUTION_DEPS = ["contributions.MemberContribution"]
 
-    # Everyone can see a simple clan balance (paid amount). Detailed unpaid shown only to staff.
-    context["clan_total_paid"] = clan_total_paid
-    if user.is_staff:
-        clan_unpaid_agg = member_contribs_qs.filter(
-        is_paid__in=[PaymentStatus.NOT_PAID, 'NOT PAID', PaymentStatus.PENDING, 'PENDING']
-        )
-        clan_total_unpaid = clan_unpaid_agg.aggregate(total_unpaid=Sum("amount_due")).get("total_unpaid") or 0
-        context["clan_total_unpaid"] = clan_total_unpaid
-        context["clan_total_unpaid_count"] = clan_unpaid_agg.count()
-        context["payments"] =member_contribs_qs.select_related(
-            "account"
-        ).order_by("-created")[:5]
-        
-    else:
+
+def _clan_overview():
+    paid = MemberContribution.objects.filter(is_paid__in=[PaymentStatus.PAID, 'PAID'])
+    unpaid = MemberContribution.objects.filter(is_paid__in=UNPAID_STATUSES)
+    return {
+        "clan_total_paid": paid.aggregate(total=Sum("amount_due"))["total"] or 0,
+        **unpaid.aggregate(
+            clan_total_unpaid=Sum("amount_due"),
+            clan_total_unpaid_count=Count("id"),
+        ),
+    }
+
+
+def _member_overview(user):
+    return MemberContribution.objects.filter(account=user).aggregate(
+        member_total_paid=Sum("amount_due", filter=Q(is_paid=PaymentStatus.PAID)),
+        member_total_unpaid=Sum("amount_due", filter=Q(is_paid__in=UNPAID_STATUSES)),
+        member_total_unpaid_count=Count("id", filter=Q(is_paid__in=UNPAID_STATUSES)),
+    )
+
+
+async def _recent_contributions(user):
+    qs = MemberContribution.objects.select_related("account").order_by("-created")
+    if not user.is_staff:
         # Member view: only personal contributions/payments (MemberContribution)
-        
-        context["payments"] = member_contribs_qs.select_related(
-            "account"
-        ).filter(account=user)[:5]
+        qs = qs.filter(account=user)
+    return [contribution async for contribution in qs[:5]]
+
+
+async def _family(user):
+    if not user.family_id:
+        return None
+    return await Family.objects.filter(pk=user.family_id).afirst()
+
 
-        
-    member_paid_agg = member_contribs_qs.filter(account=user, is_paid=PaymentStatus.PAID).aggregate(total=Sum("amount_due"))
-    member_unpaid_agg = member_contribs_qs.filter(account=user, is_paid__in=[PaymentStatus.NOT_PAID, 'NOT PAID', PaymentStatus.PENDING, 'PENDING'])
+@login_required
+@read_from_replica()
+async def index(request):
+    user = await request.auser()
+
+    # The cached aggregates are independent: in a pooled ASGI worker each runs on its own
+    # thread and connection, at the same time as the rest (bakgomong.aio.in_thread).
+    upcoming_meeting, counts, clan, member, payments, family = await asyncio.gather(
+        in_thread(
+            cached_query,
+            "upcoming-meeting",
+            lambda: Meeting.objects.filter(meeting_date__gte=timezone.now()).order_by("meeting_date").first(),
+            deps=["dashboard.Meeting"],
+            timeout=60,
+        ),
+        in_thread(
+            cached_query,
+            "clan-counts",
+            lambda: {"total_members": Account.objects.count(), "total_families": Family.objects.count()},
+            deps=["accounts.Account", "accounts.Family"],
+        ),
+        # Clan-wide aggregates, cached until a member contribution changes.
+        in_thread(cached_query, "clan-overview", _clan_overview, deps=CONTRIBUTION_DEPS),
+        in_thread(cached_query, f"member-overview:{user.pk}", lambda: _member_overview(user), deps=CONTRIBUTION_DEPS),
+        _recent_contributions(user),
+        _family(user),
+    )
+
+    context = {"upcoming_meeting": upcoming_meeting, **counts, "family": family, "payments": payments}
+    # Everyone can see a simple clan balance (paid amount). Detailed unpaid shown only to staff.
+    context["clan_total_paid"] = clan["clan_total_paid"]
+    if user.is_staff:
+        context["clan_total_unpaid"] = clan["clan_total_unpaid"] or 0
+        context["clan_total_unpaid_count"] = clan["clan_total_unpaid_count"]
+    context["member_total_paid"] = member["member_total_paid"] or 0
+    context["member_total_unpaid"] = member["member_total_unpaid"] or 0
+    context["member_total_unpaid_count"] = member["member_total_unpaid_count"]
 
-    context["member_total_paid"] = member_paid_agg.get("total") or 0
-    context["member_total_unpaid"] = member_unpaid_agg.aggregate(total=Sum("amount_due")).get("total") or 0
-    context["member_total_unpaid_count"] = member_unpaid_agg.count()
-    
-    return render(request, "home/index.html", context)
+    # templates may still touch lazy relations: render off the event loop
+    return await sync_to_async(render)(request, "home/index.html", context)
 
 
 @login_required
@@ -81,9 +113,10 @@ def clan_meetings(request):
     return render(request, 'home/meetings.html', {'meetings': meetings})
 
 
-def get_clan_meetings_api(request):
+@cache_view(deps=["dashboard.Meeting"], per_user=False)
+async def get_clan_meetings_api(request):
     try:
-        meetings = Meeting.objects.all()
+        meetings = [meeting async for meeting in Meeting.objects.all()]
         data = serializers.serialize("json", meetings)
         return JsonResponse({"success": True, "meetings": data}, status=200)
     except Exception as ex:
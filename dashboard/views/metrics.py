@@ -0,0 +1,13 @@
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseForbidden, JsonResponse
+
+from bakgomong import metrics as counters
+from bakgomong.db_pool import pool_stats
+
+
+@login_required
+def metrics(request):
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    # pool figures are for the process that serves this request
+    return JsonResponse({"counters": counters.snapshot(), "database": pool_stats()})
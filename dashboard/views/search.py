@@ -0,0 +1,69 @@
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import JsonResponse
+
+from accounts.models import Account, Family
+from accounts.utils.abstracts import Role
+from accounts.views.family import EXECUTIVE_ROLES
+from bakgomong.db_router import read_from_replica
+from bakgomong.search import search
+from dashboard.models import ClanDocument, Meeting
+
+RESULTS_PER_KIND = 10
+MIN_TERM_LENGTH = 2
+# members find each other by name and username only; email and phone are searched by staff and executives
+MEMBER_SEARCH_WEIGHTS = "A"
+
+
+def _visible_documents(user):
+    # the same rules as ClanDocument.user_has_access(), as a filter so the limit applies after them
+    documents = ClanDocument.objects.all()
+    if user.is_superuser or user.role == Role.CLAN_CHAIRPERSON:
+        return documents
+    visible = Q(visibility=ClanDocument.Visibility.CLAN)
+    if user.family_id:
+        visible |= Q(visibility=ClanDocument.Visibility.FAMILY, family_id=user.family_id)
+    return documents.filter(visible)
+
+
+@login_required
+@read_from_replica()
+def global_search(request):
+    """Members, families, documents and meetings matching ?q=, best matches first."""
+    term = request.GET.get("q", "").strip()
+    if len(term) < MIN_TERM_LENGTH:
+        return JsonResponse({"success": True, "query": term, "results": {}}, status=200)
+
+    user = request.user
+    members = Account.objects.filter(is_active=True).select_related("family")
+    families = Family.objects.all()
+    member_weights = ""
+    if not user.is_staff and user.role not in EXECUTIVE_ROLES:
+        members = members.filter(is_approved=True)
+        families = families.filter(is_approved=True)
+        member_weights = MEMBER_SEARCH_WEIGHTS
+
+    results = {
+        "members": [
+            {
+                "id": str(member.id),
+                "name": member.get_full_name() or member.username,
+                "username": member.username,
+                "family": member.family.name if member.family else None,
+            }
+            for member in search(members, term, RESULTS_PER_KIND, weights=member_weights)
+        ],
+        "families": [
+            {"id": str(family.id), "name": family.name, "url": family.get_absolute_url()}
+            for family in search(families, term, RESULTS_PER_KIND)
+        ],
+        "documents": [
+            {"id": str(document.id), "title": document.title, "category": document.category}
+            for document in search(_visible_documents(user), term, RESULTS_PER_KIND)
+        ],
+        "meetings": [
+            {"id": str(meeting.id), "title": meeting.title, "meeting_date": meeting.meeting_date}
+            for meeting in search(Meeting.objects.all(), term, RESULTS_PER_KIND)
+        ],
+    }
+    return JsonResponse({"success": True, "query": term, "results": results}, status=200)